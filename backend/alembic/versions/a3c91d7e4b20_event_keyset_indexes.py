@@ -0,0 +1,36 @@
+"""event keyset pagination indexes
+
+Revision ID: a3c91d7e4b20
+Revises: 6ef5dfe106ab
+Create Date: 2026-10-16 09:12:04.512733
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+revision = 'a3c91d7e4b20'
+down_revision = '6ef5dfe106ab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_events_timestamp_id",
+        "events",
+        ["timestamp", "id"],
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_events_recipient_timestamp_id",
+        "events",
+        ["recipient_id", "timestamp", "id"],
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_recipient_timestamp_id", table_name="events", if_exists=True)
+    op.drop_index("ix_events_timestamp_id", table_name="events", if_exists=True)
@@ -0,0 +1,107 @@
+"""daily event counts replace rollups
+
+Revision ID: a6d2e9c4f871
+Revises: f4a8c2d6b913
+Create Date: 2026-10-17 11:08:52.774160
+"""
+
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = 'a6d2e9c4f871'
+down_revision = 'f4a8c2d6b913'
+branch_labels = None
+depends_on = None
+
+EVENT_AMOUNT_SQL = (
+    "CASE WHEN jsonb_typeof(event_data->'amount_ml') = 'number' "
+    "THEN (event_data->>'amount_ml')::float8 ELSE 0 END"
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "amount_ml" not in {column["name"] for column in inspector.get_columns("event_daily_counts")}:
+        op.add_column(
+            "event_daily_counts",
+            sa.Column("amount_ml", sa.Float(), server_default=sa.text("0"), nullable=False)
+        )
+    if "event_rollups" in inspector.get_table_names():
+        op.drop_table("event_rollups")
+
+    # Rebucket the daily counts by the configured timezone's days
+    zone_name = bind.execute(sa.text("SELECT value FROM app_settings WHERE key = 'timezone'")).scalar()
+    try:
+        ZoneInfo(zone_name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        zone_name = "UTC"
+    bind.execute(
+        sa.text(
+            """
+            INSERT INTO app_settings (key, value, version, updated_at)
+            VALUES ('event_counts_timezone', :zone, 1, timezone('utc', now()))
+            ON CONFLICT (key) DO UPDATE SET value = :zone, version = app_settings.version + 1
+            """
+        ),
+        {"zone": zone_name}
+    )
+    op.execute("DELETE FROM event_daily_counts")
+    bind.execute(
+        sa.text(
+            f"""
+            INSERT INTO event_daily_counts (recipient_id, type, day, count, amount_ml)
+            SELECT recipient_id, type, CAST(timezone(:zone, timezone('UTC', timestamp)) AS DATE), COUNT(*), SUM({EVENT_AMOUNT_SQL})
+            FROM events
+            GROUP BY 1, 2, 3
+            """
+        ),
+        {"zone": zone_name}
+    )
+
+
+def downgrade() -> None:
+    op.create_table(
+        "event_rollups",
+        sa.Column("recipient_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("care_recipients.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("type", sa.String(50), primary_key=True),
+        sa.Column("bucket_start", sa.DateTime(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("amount_ml", sa.Float(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_event_rollups_bucket_start", "event_rollups", ["bucket_start"])
+    op.execute(
+        """
+        INSERT INTO event_rollups (recipient_id, type, bucket_start, count, amount_ml)
+        SELECT
+            recipient_id,
+            type,
+            date_trunc('hour', timestamp) + floor(extract(minute FROM timestamp) / 15) * interval '15 minutes',
+            COUNT(*),
+            COALESCE(SUM(COALESCE(
+                CASE WHEN jsonb_typeof(event_data->'pump_total_ml') = 'number'
+                    THEN (event_data->>'pump_total_ml')::float8 END,
+                CASE WHEN jsonb_typeof(event_data->'amount_ml') = 'number'
+                    THEN (event_data->>'amount_ml')::float8 END,
+                0
+            )), 0)
+        FROM events
+        WHERE recipient_id IS NOT NULL
+        GROUP BY 1, 2, 3
+        """
+    )
+    op.execute("DELETE FROM event_daily_counts")
+    op.execute(
+        """
+        INSERT INTO event_daily_counts (recipient_id, type, day, count)
+        SELECT recipient_id, type, CAST(timestamp AS DATE), COUNT(*)
+        FROM events
+        GROUP BY recipient_id, type, CAST(timestamp AS DATE)
+        """
+    )
+    op.execute("DELETE FROM app_settings WHERE key = 'event_counts_timezone'")
+    op.drop_column("event_daily_counts", "amount_ml")
@@ -0,0 +1,37 @@
+"""pubsub payloads
+
+Revision ID: a9d2f4c6e813
+Revises: e5c19a8b3f27
+Create Date: 2026-10-16 18:32:41.205317
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'a9d2f4c6e813'
+down_revision = 'e5c19a8b3f27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if 'pubsub_payloads' not in inspector.get_table_names():
+        op.create_table(
+            'pubsub_payloads',
+            sa.Column('id', sa.BigInteger(), sa.Identity(), primary_key=True),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        )
+    op.create_index(
+        'ix_pubsub_payloads_created_at',
+        'pubsub_payloads',
+        ['created_at'],
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_pubsub_payloads_created_at', table_name='pubsub_payloads', if_exists=True)
+    op.drop_table('pubsub_payloads')
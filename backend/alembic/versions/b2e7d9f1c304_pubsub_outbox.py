@@ -0,0 +1,50 @@
+"""pubsub outbox
+
+Revision ID: b2e7d9f1c304
+Revises: a9d2f4c6e813
+Create Date: 2026-10-16 19:05:17.448210
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b2e7d9f1c304'
+down_revision = 'a9d2f4c6e813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    # Spilled messages are now kept in the outbox
+    if 'pubsub_payloads' in tables:
+        op.drop_table('pubsub_payloads')
+
+    if 'pubsub_outbox' not in tables:
+        op.create_table(
+            'pubsub_outbox',
+            sa.Column('id', sa.BigInteger(), server_default=sa.text("nextval('sse_message_seq')"), primary_key=True),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        )
+    op.create_index(
+        'ix_pubsub_outbox_created_at',
+        'pubsub_outbox',
+        ['created_at'],
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_pubsub_outbox_created_at', table_name='pubsub_outbox', if_exists=True)
+    op.drop_table('pubsub_outbox')
+    op.create_table(
+        'pubsub_payloads',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), primary_key=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+    )
+    op.create_index('ix_pubsub_payloads_created_at', 'pubsub_payloads', ['created_at'])
@@ -0,0 +1,63 @@
+"""event change feed
+
+Revision ID: b84e2f7c1d95
+Revises: f1d6b3e9a7c4
+Create Date: 2026-10-16 14:05:12.518204
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = 'b84e2f7c1d95'
+down_revision = 'f1d6b3e9a7c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE IF NOT EXISTS event_change_seq")
+
+    inspector = sa.inspect(op.get_bind())
+    event_columns = {column["name"] for column in inspector.get_columns("events")}
+    if "change_seq" not in event_columns:
+        # The nextval default numbers existing rows as the column is added
+        op.add_column(
+            "events",
+            sa.Column(
+                "change_seq",
+                sa.BigInteger(),
+                server_default=sa.text("nextval('event_change_seq')"),
+                nullable=False
+            )
+        )
+    op.create_index("ix_events_change_seq", "events", ["change_seq"], if_not_exists=True)
+
+    # init_db() may already have created this table via create_all
+    if "event_tombstones" not in inspector.get_table_names():
+        op.create_table(
+            "event_tombstones",
+            sa.Column(
+                "change_seq",
+                sa.BigInteger(),
+                server_default=sa.text("nextval('event_change_seq')"),
+                primary_key=True
+            ),
+            sa.Column("event_id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("recipient_id", postgresql.UUID(as_uuid=True), nullable=True),
+            sa.Column("deleted_at", sa.DateTime(), nullable=False),
+        )
+    op.create_index("ix_event_tombstones_event_id", "event_tombstones", ["event_id"], if_not_exists=True)
+    op.create_index("ix_event_tombstones_recipient_id", "event_tombstones", ["recipient_id"], if_not_exists=True)
+    op.create_index("ix_event_tombstones_deleted_at", "event_tombstones", ["deleted_at"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_event_tombstones_deleted_at", table_name="event_tombstones")
+    op.drop_index("ix_event_tombstones_recipient_id", table_name="event_tombstones")
+    op.drop_index("ix_event_tombstones_event_id", table_name="event_tombstones")
+    op.drop_table("event_tombstones")
+    op.drop_index("ix_events_change_seq", table_name="events")
+    op.drop_column("events", "change_seq")
+    op.execute("DROP SEQUENCE IF EXISTS event_change_seq")
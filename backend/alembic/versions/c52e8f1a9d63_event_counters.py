@@ -0,0 +1,64 @@
+"""event counter tables
+
+Revision ID: c52e8f1a9d63
+Revises: a3c91d7e4b20
+Create Date: 2026-10-16 10:02:41.118204
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = 'c52e8f1a9d63'
+down_revision = 'a3c91d7e4b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # init_db() may already have created these tables via create_all
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "event_type_counts" not in existing_tables:
+        op.create_table(
+            "event_type_counts",
+            sa.Column("recipient_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("care_recipients.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("type", sa.String(50), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        )
+    if "event_daily_counts" not in existing_tables:
+        op.create_table(
+            "event_daily_counts",
+            sa.Column("recipient_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("care_recipients.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("type", sa.String(50), primary_key=True),
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+    # Backfill from existing events
+    op.execute("DELETE FROM event_type_counts")
+    op.execute("DELETE FROM event_daily_counts")
+    op.execute(
+        """
+        INSERT INTO event_type_counts (recipient_id, type, count)
+        SELECT recipient_id, type, COUNT(*)
+        FROM events
+        WHERE recipient_id IS NOT NULL
+        GROUP BY recipient_id, type
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO event_daily_counts (recipient_id, type, day, count)
+        SELECT recipient_id, type, CAST(timestamp AS DATE), COUNT(*)
+        FROM events
+        WHERE recipient_id IS NOT NULL
+        GROUP BY recipient_id, type, CAST(timestamp AS DATE)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("event_daily_counts")
+    op.drop_table("event_type_counts")
@@ -0,0 +1,29 @@
+"""user authz version
+
+Revision ID: c6f3a8d2e417
+Revises: b2e7d9f1c304
+Create Date: 2026-10-16 23:40:26.193847
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'c6f3a8d2e417'
+down_revision = 'b2e7d9f1c304'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    user_columns = {column["name"] for column in inspector.get_columns("users")}
+    if "authz_version" not in user_columns:
+        op.add_column(
+            "users",
+            sa.Column("authz_version", sa.Integer(), server_default=sa.text("1"), nullable=False)
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "authz_version")
@@ -0,0 +1,59 @@
+"""event rollups
+
+Revision ID: d3a7c5e91b48
+Revises: b84e2f7c1d95
+Create Date: 2026-10-16 15:22:37.904151
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = 'd3a7c5e91b48'
+down_revision = 'b84e2f7c1d95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # init_db() may already have created this table via create_all
+    if "event_rollups" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "event_rollups",
+            sa.Column("recipient_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("care_recipients.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("type", sa.String(50), primary_key=True),
+            sa.Column("bucket_start", sa.DateTime(), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("amount_ml", sa.Float(), nullable=False, server_default="0"),
+        )
+    op.create_index("ix_event_rollups_bucket_start", "event_rollups", ["bucket_start"], if_not_exists=True)
+
+    # Backfill from existing events
+    op.execute("DELETE FROM event_rollups")
+    op.execute(
+        """
+        INSERT INTO event_rollups (recipient_id, type, bucket_start, count, amount_ml)
+        SELECT
+            recipient_id,
+            type,
+            date_trunc('hour', timestamp)
+                + floor(extract(minute FROM timestamp) / 15) * interval '15 minutes',
+            COUNT(*),
+            COALESCE(SUM(COALESCE(
+                CASE WHEN jsonb_typeof(event_data->'pump_total_ml') = 'number'
+                    THEN (event_data->>'pump_total_ml')::float8 END,
+                CASE WHEN jsonb_typeof(event_data->'amount_ml') = 'number'
+                    THEN (event_data->>'amount_ml')::float8 END,
+                0
+            )), 0)
+        FROM events
+        WHERE recipient_id IS NOT NULL
+        GROUP BY 1, 2, 3
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_event_rollups_bucket_start", table_name="event_rollups")
+    op.drop_table("event_rollups")
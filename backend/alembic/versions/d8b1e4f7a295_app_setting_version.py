@@ -0,0 +1,29 @@
+"""app setting version
+
+Revision ID: d8b1e4f7a295
+Revises: c6f3a8d2e417
+Create Date: 2026-10-17 00:12:48.305611
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd8b1e4f7a295'
+down_revision = 'c6f3a8d2e417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    setting_columns = {column["name"] for column in inspector.get_columns("app_settings")}
+    if "version" not in setting_columns:
+        op.add_column(
+            "app_settings",
+            sa.Column("version", sa.Integer(), server_default=sa.text("1"), nullable=False)
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("app_settings", "version")
@@ -0,0 +1,23 @@
+"""sse message sequence
+
+Revision ID: e5c19a8b3f27
+Revises: d3a7c5e91b48
+Create Date: 2026-10-16 17:48:03.662915
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'e5c19a8b3f27'
+down_revision = 'd3a7c5e91b48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE IF NOT EXISTS sse_message_seq")
+
+
+def downgrade() -> None:
+    op.execute("DROP SEQUENCE IF EXISTS sse_message_seq")
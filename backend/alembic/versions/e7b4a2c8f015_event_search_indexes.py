@@ -0,0 +1,50 @@
+"""event full-text and trigram search
+
+Revision ID: e7b4a2c8f015
+Revises: c52e8f1a9d63
+Create Date: 2026-10-16 11:20:13.604551
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+revision = 'e7b4a2c8f015'
+down_revision = 'c52e8f1a9d63'
+branch_labels = None
+depends_on = None
+
+SEARCH_TEXT_SQL = (
+    "coalesce(notes, '') || ' ' || "
+    "coalesce(event_data->>'med_name', '') || ' ' || "
+    "coalesce(event_data->>'formula_type', '') || ' ' || "
+    "coalesce(event_data->>'oral_notes', '')"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        f"ALTER TABLE events ADD COLUMN IF NOT EXISTS search_text TEXT "
+        f"GENERATED ALWAYS AS ({SEARCH_TEXT_SQL}) STORED"
+    )
+    op.execute(
+        f"ALTER TABLE events ADD COLUMN IF NOT EXISTS search_vector TSVECTOR "
+        f"GENERATED ALWAYS AS (to_tsvector('simple', {SEARCH_TEXT_SQL})) STORED"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_events_search_vector "
+        "ON events USING gin (search_vector)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_events_search_text_trgm "
+        "ON events USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_events_search_text_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_events_search_vector")
+    op.execute("ALTER TABLE events DROP COLUMN IF EXISTS search_vector")
+    op.execute("ALTER TABLE events DROP COLUMN IF EXISTS search_text")
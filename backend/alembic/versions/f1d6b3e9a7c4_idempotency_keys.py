@@ -0,0 +1,39 @@
+"""idempotency keys
+
+Revision ID: f1d6b3e9a7c4
+Revises: e7b4a2c8f015
+Create Date: 2026-10-16 12:41:55.270318
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = 'f1d6b3e9a7c4'
+down_revision = 'e7b4a2c8f015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # init_db() may already have created this table via create_all
+    if "idempotency_keys" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("key", sa.String(255), primary_key=True),
+        sa.Column("request_hash", sa.String(64), nullable=False),
+        sa.Column("status_code", sa.Integer(), nullable=False),
+        sa.Column("response_body", postgresql.JSONB(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_idempotency_keys_expires_at", "idempotency_keys", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_idempotency_keys_expires_at", table_name="idempotency_keys")
+    op.drop_table("idempotency_keys")
@@ -0,0 +1,62 @@
+"""count events without a recipient
+
+Revision ID: f4a8c2d6b913
+Revises: d8b1e4f7a295
+Create Date: 2026-10-17 09:41:27.530914
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'f4a8c2d6b913'
+down_revision = 'd8b1e4f7a295'
+branch_labels = None
+depends_on = None
+
+COUNTER_KEYS = {
+    "event_type_counts": ("recipient_id", "type"),
+    "event_daily_counts": ("recipient_id", "type", "day"),
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table, key in COUNTER_KEYS.items():
+        # init_db() may already have created the table in its new form
+        if "id" in {column["name"] for column in inspector.get_columns(table)}:
+            continue
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {table}_pkey")
+        op.execute(f"ALTER TABLE {table} ADD COLUMN id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN recipient_id DROP NOT NULL")
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT uq_{table}_key UNIQUE NULLS NOT DISTINCT ({', '.join(key)})")
+
+    # Backfill the counters for events without a recipient
+    op.execute(
+        """
+        INSERT INTO event_type_counts (recipient_id, type, count)
+        SELECT NULL, type, COUNT(*)
+        FROM events
+        WHERE recipient_id IS NULL
+        GROUP BY type
+        ON CONFLICT (recipient_id, type) DO UPDATE SET count = EXCLUDED.count
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO event_daily_counts (recipient_id, type, day, count)
+        SELECT NULL, type, CAST(timestamp AS DATE), COUNT(*)
+        FROM events
+        WHERE recipient_id IS NULL
+        GROUP BY type, CAST(timestamp AS DATE)
+        ON CONFLICT (recipient_id, type, day) DO UPDATE SET count = EXCLUDED.count
+        """
+    )
+
+
+def downgrade() -> None:
+    for table, key in COUNTER_KEYS.items():
+        op.execute(f"DELETE FROM {table} WHERE recipient_id IS NULL")
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT uq_{table}_key")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN id")
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({', '.join(key)})")
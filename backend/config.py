@@ -8,6 +8,22 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "postgresql://careapp:careapp@db:5432/caredb"
 
+    # Database connections. With every pool full, a worker holds
+    # db_connections_per_worker() of them, and all WEB_CONCURRENCY workers
+    # together must leave DB_RESERVED_CONNECTIONS of the server's
+    # DB_MAX_CONNECTIONS free for migrations, scripts and psql; startup
+    # warns otherwise. docker-compose.prod.yml runs 2 workers against
+    # max_connections=50, so the defaults use 2 x 18 = 36 of the 40 left.
+    # Change them together.
+    DB_POOL_SIZE: int = 3
+    DB_MAX_OVERFLOW: int = 2
+    ASYNC_DB_POOL_SIZE: int = 5
+    ASYNC_DB_MAX_OVERFLOW: int = 5
+    DB_MAX_CONNECTIONS: int = 50
+    DB_RESERVED_CONNECTIONS: int = 10
+    # Uvicorn worker processes; uvicorn reads the same variable
+    WEB_CONCURRENCY: int = 1
+
     # JWT - REQUIRED: Set JWT_SECRET_KEY in environment or .env file
     # Generate with: openssl rand -hex 32
     JWT_SECRET_KEY: str
@@ -37,6 +53,68 @@ class Settings(BaseSettings):
     SCHEDULER_ENABLED: bool = True
     REMINDER_SCAN_INTERVAL_SECONDS: int = 60
 
+    # Idempotency-Key responses are replayable for this long
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+
+    # Deleted-event tombstones are kept this long for delta sync clients
+    EVENT_TOMBSTONE_RETENTION_DAYS: int = 30
+
+    # SSE messages kept per worker for Last-Event-ID replay on reconnect
+    SSE_REPLAY_BUFFER_SIZE: int = 1000
+    # Messages waiting per SSE connection before it counts as fallen behind
+    SSE_QUEUE_SIZE: int = 100
+    # When a connection's queue is full: "resync" discards what is queued,
+    # "drop_oldest" evicts only the oldest message. Either way the client is
+    # told to resync, since it missed messages, and access.changed and
+    # user.changed are kept.
+    SSE_QUEUE_OVERFLOW: str = "resync"
+
+    # Pub/sub transport between workers: "postgres" (any deployment), "memory"
+    # (a single worker) or "unix" (several workers on one host)
+    PUBSUB_BACKEND: str = "postgres"
+    # Broker socket for the unix backend
+    PUBSUB_SOCKET_PATH: str = "/tmp/care-docs-pubsub.sock"
+
+    # Published messages stay in the outbox this long for listeners catching up after a reconnect
+    PUBSUB_OUTBOX_RETENTION_MINUTES: int = 60
+    # Outbox ids can commit out of order. A worker holds a message whose
+    # predecessor has not arrived this long, then takes that one as rolled back.
+    PUBSUB_GAP_SETTLE_MS: int = 500
+
+    # Connections per worker for publishing pub/sub messages outside a request transaction
+    PUBSUB_PUBLISH_POOL_SIZE: int = 2
+
+    # Users and their recipient access are cached per worker for this long.
+    # Changes are pushed over pub/sub, so this only bounds staleness if a
+    # message is lost.
+    IDENTITY_CACHE_TTL_SECONDS: int = 300
+    # Users kept in each worker's identity cache
+    IDENTITY_CACHE_SIZE: int = 10000
+
+    # AppSetting values are cached per worker for this long. Changes are
+    # pushed over pub/sub, so this only bounds staleness if a message is lost.
+    APP_SETTINGS_CACHE_TTL_SECONDS: int = 300
+
+    # Time each request's SQL statements and warn when one runs repeatedly,
+    # as an N+1 query does. Always on with DEBUG, which also reports the
+    # figures in X-SQL-* response headers.
+    SQL_PROFILING: bool = False
+    # Runs of the same statement in one request that count as repeated
+    SQL_REPEATED_STATEMENT_THRESHOLD: int = 5
+    # Log statements slower than this; 0 turns it off
+    SQL_SLOW_QUERY_MS: int = 0
+    # Log slow statements' EXPLAIN plans too (costs another round trip each)
+    SQL_EXPLAIN_SLOW_QUERIES: bool = False
+
+    # Bearer token Prometheus sends to scrape GET /api/metrics. The endpoint
+    # answers 404 while it is empty.
+    METRICS_SCRAPE_TOKEN: str = ""
+    # Directory where each worker writes its metrics for the others to merge
+    # into a scrape, every METRICS_SNAPSHOT_SECONDS. Empty reports only the
+    # worker that answers.
+    METRICS_DIR: str = ""
+    METRICS_SNAPSHOT_SECONDS: int = 5
+
     # Email (SMTP) for password reset
     SMTP_HOST: str = ""
     SMTP_PORT: int = 587
@@ -71,6 +149,14 @@ class Settings(BaseSettings):
             sys.exit(1)
         return v
 
+    def db_connections_per_worker(self) -> int:
+        """Most database connections one worker opens: both engines' pools, the pub/sub publishing pool and listener."""
+        return (
+            self.DB_POOL_SIZE + self.DB_MAX_OVERFLOW
+            + self.ASYNC_DB_POOL_SIZE + self.ASYNC_DB_MAX_OVERFLOW
+            + self.PUBSUB_PUBLISH_POOL_SIZE + 1
+        )
+
     def get_cors_origins(self) -> List[str]:
         """Parse CORS_ORIGINS string into a list"""
         if isinstance(self.CORS_ORIGINS, str):
@@ -1,24 +1,80 @@
-from sqlalchemy import create_engine
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, create_engine, text
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import get_settings
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
-# Create database engine
+# Create database engine. The request path uses the async engine below; this
+# one serves the remaining routers, the scheduler, scripts and Alembic.
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW
 )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with the asyncpg driver."""
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+# Async engine for the request path, so queries wait without blocking the event loop
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    pool_size=settings.ASYNC_DB_POOL_SIZE,
+    max_overflow=settings.ASYNC_DB_MAX_OVERFLOW
+)
+
+
+def check_connection_budget() -> None:
+    """Warn if the workers' pools could together exhaust the database's connections."""
+    needed = settings.WEB_CONCURRENCY * settings.db_connections_per_worker()
+    available = settings.DB_MAX_CONNECTIONS - settings.DB_RESERVED_CONNECTIONS
+    if needed > available:
+        logger.warning(
+            "%s workers may open %s database connections, more than the %s of DB_MAX_CONNECTIONS "
+            "not reserved; reduce the pool sizes",
+            settings.WEB_CONCURRENCY, needed, available
+        )
+
+
+# Objects stay loaded after commit; reloading them would need an await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Base class for models
 Base = declarative_base()
 
+
+class UTCDateTime(TypeDecorator):
+    """
+    TIMESTAMP WITHOUT TIME ZONE holding UTC, like the columns' utcnow defaults.
+
+    Aware datetimes are stored as naive UTC: asyncpg refuses them for this
+    type, and psycopg2 leaves the conversion to the session's timezone.
+    """
+
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
@@ -27,7 +83,15 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Initialize database tables
 def init_db():
     """Create all tables in the database"""
+    # Required by the trigram index on events.search_text
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
     Base.metadata.create_all(bind=engine)
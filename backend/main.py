@@ -1,16 +1,20 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 
 # Import database initialization
-from database import init_db
+from database import async_engine, check_connection_budget, init_db
 
 # Import routes
-from routes import auth, events, setup, quick_templates, settings as settings_routes, feeds, stream, recipients, photos, medications, med_reminders, notifications, invites
+from routes import auth, events, setup, quick_templates, settings as settings_routes, feeds, stream, recipients, photos, medications, med_reminders, notifications, invites, metrics as metrics_routes
+from middleware.metrics_middleware import MetricsMiddleware
+from middleware.query_profile_middleware import QueryProfileMiddleware
 
 # Import pub/sub service
-from services import pubsub
+from services import access_control, app_settings, identity_cache, metrics, pubsub
 from services.reminder_scheduler import start_scheduler, stop_scheduler
 
 # Import settings
@@ -32,6 +36,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Latency and status per route, for GET /api/metrics
+app.add_middleware(MetricsMiddleware)
+metrics.add_collector(metrics_routes.stream_lines)
+# SQL statements per request: counts for metrics, N+1 warnings and debug headers
+app.add_middleware(QueryProfileMiddleware)
 
 # Create uploads directories if they don't exist
 os.makedirs("photos", exist_ok=True)
@@ -46,18 +55,27 @@ app.mount("/avatars", StaticFiles(directory=settings.AVATAR_UPLOAD_DIR), name="a
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and start pub/sub listener on application startup"""
+    check_connection_budget()
     init_db()
+    # Drop stale identities and settings first, so streams reloading access on access.changed see the change
+    pubsub.register_handler(identity_cache.handle_message)
+    pubsub.register_handler(app_settings.handle_message)
     # Register local broadcast handler and start listening for cross-worker events
     pubsub.register_handler(stream.local_broadcast)
     await pubsub.start_listener()
+    # Once listening, so no access change falls between the load and its message
+    await asyncio.to_thread(access_control.load_authz_versions)
     start_scheduler()
+    await metrics.start_snapshots()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up pub/sub listener on application shutdown"""
+    await metrics.stop_snapshots()
     await pubsub.stop_listener()
     stop_scheduler()
+    await async_engine.dispose()
 
 # Health check endpoint
 @app.get("/api/health")
@@ -102,6 +120,7 @@ app.include_router(medications.router, prefix="/api/medications", tags=["medicat
 app.include_router(med_reminders.router, prefix="/api/med-reminders", tags=["med-reminders"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["notifications"])
 app.include_router(invites.router, prefix="/api/invites", tags=["invites"])
+app.include_router(metrics_routes.router, prefix="/api", tags=["metrics"])
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,50 @@
+"""
+Request metrics: latency and status for each route.
+
+A plain ASGI middleware rather than BaseHTTPMiddleware, so it adds no task
+or response wrapping, and streaming responses pass straight through.
+Latency is taken when the response headers go out, so an hour-long event
+stream counts as the time it took to open.
+"""
+
+import time
+
+from services import metrics
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = None
+        failed = False
+
+        async def send_with_metrics(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                metrics.REQUEST_DURATION.observe(time.perf_counter() - started, scope["method"], metrics.route_label(scope))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            failed = True
+            if status_code is None:
+                # ServerErrorMiddleware, outside this one, answers 500
+                status_code = 500
+                metrics.REQUEST_DURATION.observe(time.perf_counter() - started, scope["method"], metrics.route_label(scope))
+            raise
+        finally:
+            method = scope["method"]
+            route = metrics.route_label(scope)
+            # No status if the client went away before the response started
+            metrics.REQUESTS.inc(method, route, str(status_code) if status_code is not None else "none")
+            if failed or (status_code is not None and status_code >= 500):
+                metrics.REQUEST_ERRORS.inc(method, route)
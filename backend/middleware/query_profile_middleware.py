@@ -0,0 +1,59 @@
+"""
+Profiles each request's SQL statements (services/query_profile.py).
+
+Records db_queries_per_request, and with SQL_PROFILING or DEBUG logs
+statements the request ran SQL_REPEATED_STATEMENT_THRESHOLD times or more,
+the usual sign of an N+1 query. In DEBUG the response also carries:
+
+    X-SQL-Queries: statements run before the response started
+    X-SQL-Time-Ms: their total database time
+    X-SQL-Duplicates: runs of a statement beyond its first
+"""
+
+import logging
+
+from starlette.datastructures import MutableHeaders
+
+from config import get_settings
+from services import metrics, query_profile
+
+logger = logging.getLogger(__name__)
+
+# Longest statement text quoted in repeated-statement warnings
+MAX_LOGGED_STATEMENT = 500
+
+
+class QueryProfileMiddleware:
+    def __init__(self, app):
+        self.app = app
+        settings = get_settings()
+        self.add_headers = settings.DEBUG
+        self.threshold = settings.SQL_REPEATED_STATEMENT_THRESHOLD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile, token = query_profile.start()
+
+        async def send_with_profile(message):
+            if self.add_headers and message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-SQL-Queries", str(profile.count))
+                headers.append("X-SQL-Time-Ms", f"{profile.seconds * 1000:.1f}")
+                headers.append("X-SQL-Duplicates", str(profile.duplicates))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            query_profile.stop(token)
+            method = scope["method"]
+            route = metrics.route_label(scope)
+            metrics.QUERIES_PER_REQUEST.observe(profile.count, method, route)
+            for statement, runs in profile.repeated(self.threshold):
+                logger.warning(
+                    "%s %s ran one statement %s times, possibly an N+1 query: %s",
+                    method, route, runs, " ".join(statement.split())[:MAX_LOGGED_STATEMENT]
+                )
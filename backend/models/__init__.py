@@ -12,6 +12,10 @@ from .push_subscription import PushSubscription
 from .user_invite import UserInvite
 from .user_recipient_access import UserRecipientAccess
 from .password_reset_token import PasswordResetToken
+from .event_count import EventTypeCount, EventDailyCount
+from .idempotency_key import IdempotencyKey
+from .event_tombstone import EventTombstone
+from .pubsub_outbox import PubSubOutboxMessage
 # from .reminder import Reminder
 
 __all__ = [
@@ -28,4 +32,9 @@ __all__ = [
     "UserInvite",
     "UserRecipientAccess",
     "PasswordResetToken",
+    "EventTypeCount",
+    "EventDailyCount",
+    "IdempotencyKey",
+    "EventTombstone",
+    "PubSubOutboxMessage",
 ]
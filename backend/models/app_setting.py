@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, DateTime, Text
+from sqlalchemy import Column, String, Integer, Text
 from datetime import datetime
-from database import Base
+from database import Base, UTCDateTime
 
 
 class AppSetting(Base):
@@ -8,7 +8,10 @@ class AppSetting(Base):
 
     key = Column(String(100), primary_key=True, index=True)
     value = Column(Text, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Bumped by services.app_settings on every change, so workers can tell
+    # newer cached values from older ones
+    version = Column(Integer, default=1, server_default="1", nullable=False)
+    updated_at = Column(UTCDateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     def __repr__(self):
         return f"<AppSetting {self.key}={self.value}>"
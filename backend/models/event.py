@@ -1,12 +1,38 @@
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Text
-from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Boolean, ForeignKey, Text, Index, Computed, BigInteger, Sequence
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 import uuid
-from database import Base
+from database import Base, UTCDateTime
+
+# Text covered by the `q` search filter: notes plus selected metadata fields
+SEARCH_TEXT_SQL = (
+    "coalesce(notes, '') || ' ' || "
+    "coalesce(event_data->>'med_name', '') || ' ' || "
+    "coalesce(event_data->>'formula_type', '') || ' ' || "
+    "coalesce(event_data->>'oral_notes', '')"
+)
+SEARCH_TS_CONFIG = "simple"
+
+# Shared by events and event_tombstones so every change gets a unique, ordered number
+event_change_seq = Sequence("event_change_seq", metadata=Base.metadata)
+
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Keyset pagination walks (timestamp, id) in descending order
+        Index("ix_events_timestamp_id", "timestamp", "id"),
+        Index("ix_events_recipient_timestamp_id", "recipient_id", "timestamp", "id"),
+        # Search: full-text for word/prefix matches, trigram for substring ILIKE
+        Index("ix_events_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_events_search_text_trgm",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"}
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
 
@@ -14,7 +40,7 @@ class Event(Base):
     type = Column(String(50), nullable=False, index=True)
 
     # Timestamp when the event occurred
-    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    timestamp = Column(UTCDateTime, default=datetime.utcnow, nullable=False, index=True)
 
     # User who created the entry
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -35,13 +61,29 @@ class Event(Base):
     # - Demeanor: {"mood": "happy", "activity_level": "active", "concerns": ""}
     event_data = Column(JSONB, nullable=True, default={})
 
+    # Generated search columns (deferred so list queries don't load them)
+    search_text = deferred(Column(Text, Computed(SEARCH_TEXT_SQL, persisted=True)))
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{SEARCH_TS_CONFIG}', {SEARCH_TEXT_SQL})", persisted=True)
+    ))
+
+    # Position in the change feed; bumped on every insert and update
+    change_seq = Column(
+        BigInteger,
+        event_change_seq,
+        server_default=event_change_seq.next_value(),
+        nullable=False,
+        index=True
+    )
+
     # Sync tracking for offline support (Phase 4)
     synced = Column(Boolean, default=True, nullable=False)
     created_offline = Column(Boolean, default=False, nullable=False)
 
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at = Column(UTCDateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(UTCDateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     def __repr__(self):
         return f"<Event {self.type} at {self.timestamp} by {self.user_id}>"
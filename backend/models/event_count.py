@@ -0,0 +1,44 @@
+from sqlalchemy import Column, String, Date, Integer, BigInteger, Float, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from database import Base
+
+
+class EventTypeCount(Base):
+    """Running count of events per recipient and type."""
+    __tablename__ = "event_type_counts"
+    # Rows without a recipient count events recorded before recipients
+    # existed; NULLS NOT DISTINCT (Postgres 15+) keeps one row per key for them
+    __table_args__ = (
+        UniqueConstraint("recipient_id", "type", name="uq_event_type_counts_key", postgresql_nulls_not_distinct=True),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    recipient_id = Column(UUID(as_uuid=True), ForeignKey("care_recipients.id", ondelete="CASCADE"), nullable=True)
+    type = Column(String(50), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<EventTypeCount {self.recipient_id} {self.type}={self.count}>"
+
+
+class EventDailyCount(Base):
+    """
+    Count of events and their summed amount_ml per recipient, type and day.
+
+    Days are local to the event_counts_timezone setting. Used for windowed
+    stats and day or week rollups.
+    """
+    __tablename__ = "event_daily_counts"
+    __table_args__ = (
+        UniqueConstraint("recipient_id", "type", "day", name="uq_event_daily_counts_key", postgresql_nulls_not_distinct=True),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    recipient_id = Column(UUID(as_uuid=True), ForeignKey("care_recipients.id", ondelete="CASCADE"), nullable=True)
+    type = Column(String(50), nullable=False)
+    day = Column(Date, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    amount_ml = Column(Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<EventDailyCount {self.recipient_id} {self.type} {self.day}={self.count}>"
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, BigInteger
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from database import Base, UTCDateTime
+from models.event import event_change_seq
+
+
+class EventTombstone(Base):
+    """
+    Marks an event as gone from a recipient's change feed.
+
+    Written when an event is deleted or moved to another recipient. An event
+    can collect several tombstones, so the change sequence is the key.
+    """
+    __tablename__ = "event_tombstones"
+
+    change_seq = Column(
+        BigInteger,
+        event_change_seq,
+        server_default=event_change_seq.next_value(),
+        primary_key=True
+    )
+    event_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    recipient_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    deleted_at = Column(UTCDateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<EventTombstone {self.event_id} at {self.change_seq}>"
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from datetime import datetime
+from database import Base, UTCDateTime
+
+
+class IdempotencyKey(Base):
+    """Stored response for a write made with an Idempotency-Key header."""
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+
+    # SHA-256 of the route and request body, to reject key reuse for a different request
+    request_hash = Column(String(64), nullable=False)
+
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(JSONB, nullable=True)
+
+    created_at = Column(UTCDateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(UTCDateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.key} for {self.user_id}>"
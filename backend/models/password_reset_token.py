@@ -1,10 +1,10 @@
 from datetime import datetime
 import uuid
 
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 
-from database import Base
+from database import Base, UTCDateTime
 
 
 class PasswordResetToken(Base):
@@ -13,6 +13,6 @@ class PasswordResetToken(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     token_hash = Column(String(64), nullable=False, index=True, unique=True)
-    expires_at = Column(DateTime, nullable=False, index=True)
-    used_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(UTCDateTime, nullable=False, index=True)
+    used_at = Column(UTCDateTime, nullable=True)
+    created_at = Column(UTCDateTime, default=datetime.utcnow, nullable=False)
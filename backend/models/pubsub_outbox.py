@@ -0,0 +1,27 @@
+from sqlalchemy import Column, BigInteger, Text, Sequence, text
+from database import Base, UTCDateTime
+
+# Numbers every published message, so all workers see the same SSE ids
+stream_message_seq = Sequence("sse_message_seq", metadata=Base.metadata)
+
+
+class PubSubOutboxMessage(Base):
+    """
+    A pub/sub message, written in the same transaction as the change it announces.
+
+    The id is the message's SSE id. Listeners that missed notifications
+    catch up from here after reconnecting.
+    """
+    __tablename__ = "pubsub_outbox"
+
+    id = Column(
+        BigInteger,
+        stream_message_seq,
+        server_default=stream_message_seq.next_value(),
+        primary_key=True
+    )
+    payload = Column(Text, nullable=False)
+    created_at = Column(UTCDateTime, server_default=text("timezone('utc', now())"), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<PubSubOutboxMessage {self.id}>"
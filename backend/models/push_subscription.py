@@ -1,11 +1,11 @@
 from datetime import datetime
 import uuid
 
-from sqlalchemy import Column, DateTime, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
-from database import Base
+from database import Base, UTCDateTime
 
 
 class PushSubscription(Base):
@@ -18,10 +18,10 @@ class PushSubscription(Base):
     endpoint = Column(String(2048), unique=True, nullable=False)
     p256dh = Column(String(255), nullable=False)
     auth = Column(String(255), nullable=False)
-    expiration_time = Column(DateTime, nullable=True)
+    expiration_time = Column(UTCDateTime, nullable=True)
 
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at = Column(UTCDateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(UTCDateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     def __repr__(self):
         return f"<PushSubscription {self.user_id} {self.endpoint[:30]}>"
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, String, DateTime, Boolean
+from sqlalchemy import Column, String, Boolean, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
-from database import Base
+from database import Base, UTCDateTime
 
 class User(Base):
     __tablename__ = "users"
@@ -15,8 +15,11 @@ class User(Base):
     avatar_filename = Column(String(255), nullable=True)
     role = Column(String(20), nullable=False, default="caregiver")  # admin or caregiver
     is_active = Column(Boolean, default=True, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Bumped whenever role, status or recipient access changes; access tokens
+    # carry the version they were issued at
+    authz_version = Column(Integer, default=1, server_default="1", nullable=False)
+    created_at = Column(UTCDateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(UTCDateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     def __repr__(self):
         return f"<User {self.username} ({self.role})>"
@@ -1,11 +1,11 @@
 from datetime import datetime
 import uuid
 
-from sqlalchemy import Column, DateTime, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 
-from database import Base
+from database import Base, UTCDateTime
 
 
 class UserInvite(Base):
@@ -19,13 +19,13 @@ class UserInvite(Base):
     role = Column(String(20), nullable=False, default="caregiver")
     recipient_ids = Column(JSONB, nullable=False, default=list)
 
-    expires_at = Column(DateTime, nullable=False)
-    used_at = Column(DateTime, nullable=True)
+    expires_at = Column(UTCDateTime, nullable=False)
+    used_at = Column(UTCDateTime, nullable=True)
 
     created_by_user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     created_by = relationship("User", foreign_keys=[created_by_user_id])
 
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(UTCDateTime, default=datetime.utcnow, nullable=False)
 
     def __repr__(self):
         return f"<UserInvite {self.email} {self.username}>"
@@ -1,15 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Response, Request, status, UploadFile, File
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, select
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
 from datetime import timedelta, datetime
+import asyncio
 import os
 import uuid
 import secrets
 import hashlib
 
-from database import get_db
+from database import AsyncSessionLocal, get_async_db
 from models.user import User
 from models.user_recipient_access import UserRecipientAccess
 from models.password_reset_token import PasswordResetToken
@@ -26,6 +27,8 @@ from services.auth_service import (
 )
 from config import get_settings
 from services.email_service import send_email
+from services import identity_cache
+from services.access_control import get_allowed_recipient_ids, stage_access_changed, stage_user_changed
 
 settings = get_settings()
 router = APIRouter()
@@ -128,13 +131,45 @@ def _hash_reset_token(token: str) -> str:
     return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 
+def _parse_user_id(value: Optional[str]) -> Optional[uuid.UUID]:
+    """A user id from a token's sub claim, or None if it is not a UUID."""
+    try:
+        return uuid.UUID(value) if value else None
+    except ValueError:
+        return None
+
+
+async def _create_scoped_access_token(db: AsyncSession, user: User) -> str:
+    """
+    An access token carrying the user's identity, role, status and recipient scope.
+
+    The claims hold as long as the token's authz_version matches the user's;
+    get_current_user then uses them instead of loading the user.
+    """
+    allowed = await db.run_sync(get_allowed_recipient_ids, user)
+    return create_access_token(data={
+        "sub": str(user.id),
+        "username": user.username,
+        "role": user.role,
+        "active": user.is_active,
+        "recipient_ids": allowed,
+        "authz_version": user.authz_version
+    })
+
+
 # Helper function to get current user from token
 async def get_current_user(
-    token: str = Depends(get_token_from_request),
-    db: Session = Depends(get_db)
+    token: str = Depends(get_token_from_request)
 ) -> User:
     """
     Dependency to get the current authenticated user from JWT token in cookie
+
+    Returns a detached user. A cache miss trusts the token's claims if they
+    are at the user's current authz_version, building a user with only the
+    claimed columns (see get_current_user_profile), and otherwise loads it on
+    its own session, whose connection goes back to the pool before the
+    handler runs, so handlers on the sync engine do not hold an async
+    connection as well.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -149,13 +184,18 @@ async def get_current_user(
     if not verify_token_type(payload, "access"):
         raise credentials_exception
 
-    user_id: str = payload.get("sub")
+    user_id = _parse_user_id(payload.get("sub"))
     if user_id is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == user_id).first()
+    loaded_at = identity_cache.generation(user_id)
+    user = identity_cache.get_user(user_id) or identity_cache.user_from_claims(user_id, payload)
     if user is None:
-        raise credentials_exception
+        async with AsyncSessionLocal() as db:
+            user = await db.scalar(select(User).where(User.id == user_id))
+        if user is None:
+            raise credentials_exception
+        identity_cache.store_user(user, loaded_at)
 
     if not user.is_active:
         raise HTTPException(
@@ -163,6 +203,37 @@ async def get_current_user(
             detail="User account is inactive"
         )
 
+    # A token issued at the user's current authz_version has current scope
+    # claims; older tokens, and tokens without claims, fall back to the database
+    if (
+        payload.get("authz_version") == user.authz_version
+        and "recipient_ids" in payload
+        and identity_cache.get_allowed_recipient_ids(user) is identity_cache.MISSING
+    ):
+        identity_cache.store_allowed_recipient_ids(user, payload["recipient_ids"], loaded_at)
+
+    return user
+
+
+async def get_current_user_profile(
+    current_user: User = Depends(get_current_user)
+) -> User:
+    """
+    Dependency to get the current user with the whole profile loaded, for
+    routes that show or change it
+    """
+    if not identity_cache.is_from_claims(current_user):
+        return current_user
+    loaded_at = identity_cache.generation(current_user.id)
+    async with AsyncSessionLocal() as db:
+        user = await db.scalar(select(User).where(User.id == current_user.id))
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    identity_cache.store_user(user, loaded_at)
     return user
 
 
@@ -184,7 +255,7 @@ async def get_current_active_admin(
 async def register_user(
     user_data: UserCreate,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: User = Depends(get_current_active_admin)
 ):
     """
@@ -207,9 +278,9 @@ async def register_user(
         )
 
     # Check if username already exists (case-insensitive)
-    existing_user = db.query(User).filter(
+    existing_user = await db.scalar(select(User).where(
         func.lower(User.username) == normalized_username
-    ).first()
+    ))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -217,7 +288,7 @@ async def register_user(
         )
 
     # Check if email already exists
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
+    existing_email = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -235,13 +306,13 @@ async def register_user(
     new_user = User(
         username=normalized_username,
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await asyncio.to_thread(get_password_hash, user_data.password),
         role=user_data.role
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return UserResponse(
         id=str(new_user.id),
@@ -260,7 +331,7 @@ async def login(
     response: Response,
     login_data: LoginRequest,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Authenticate user and return JWT tokens
@@ -270,11 +341,11 @@ async def login(
     """
     # Find user by username
     normalized_username = normalize_username(login_data.username)
-    user = db.query(User).filter(
+    user = await db.scalar(select(User).where(
         func.lower(User.username) == normalized_username
-    ).first()
+    ))
 
-    if not user or not verify_password(login_data.password, user.password_hash):
+    if not user or not await asyncio.to_thread(verify_password, login_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -288,7 +359,7 @@ async def login(
         )
 
     # Create tokens
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = await _create_scoped_access_token(db, user)
     refresh_token = create_refresh_token(data={"sub": str(user.id)})
 
     # Set HTTP-only cookies for security
@@ -346,7 +417,7 @@ async def logout(response: Response):
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
     request: Request,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_profile)
 ):
     """
     Get current authenticated user's information
@@ -367,15 +438,16 @@ async def get_current_user_info(
 async def update_current_user(
     payload: UserProfileUpdate,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_profile)
 ):
     if payload.display_name is not None:
         current_user.display_name = payload.display_name.strip() or None
 
     db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
+    await db.run_sync(stage_user_changed, current_user.id)
+    await db.commit()
+    await db.refresh(current_user)
 
     return UserResponse(
         id=str(current_user.id),
@@ -389,28 +461,35 @@ async def update_current_user(
     )
 
 
+async def _verify_current_password(db: AsyncSession, user: User, password: str) -> bool:
+    """Check password against the user's stored hash, which the identity cache does not keep."""
+    password_hash = await db.scalar(select(User.password_hash).where(User.id == user.id))
+    return password_hash is not None and await asyncio.to_thread(verify_password, password, password_hash)
+
+
 @router.patch("/me/email", response_model=UserResponse)
 async def update_current_user_email(
     payload: EmailUpdateRequest,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_profile)
 ):
-    if not verify_password(payload.current_password, current_user.password_hash):
+    if not await _verify_current_password(db, current_user, payload.current_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
 
     next_email = payload.email.strip().lower()
-    existing = db.query(User).filter(
+    existing = await db.scalar(select(User).where(
         func.lower(User.email) == func.lower(next_email),
         User.id != current_user.id
-    ).first()
+    ))
     if existing:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already in use")
 
     current_user.email = next_email
     db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
+    await db.run_sync(stage_user_changed, current_user.id)
+    await db.commit()
+    await db.refresh(current_user)
 
     return UserResponse(
         id=str(current_user.id),
@@ -427,10 +506,10 @@ async def update_current_user_email(
 @router.patch("/me/password")
 async def update_current_user_password(
     payload: PasswordUpdateRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_profile)
 ):
-    if not verify_password(payload.current_password, current_user.password_hash):
+    if not await _verify_current_password(db, current_user, payload.current_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
     if payload.new_password != payload.confirm_password:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Passwords do not match")
@@ -438,9 +517,10 @@ async def update_current_user_password(
     if errors:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=" ".join(errors))
 
-    current_user.password_hash = get_password_hash(payload.new_password)
+    current_user.password_hash = await asyncio.to_thread(get_password_hash, payload.new_password)
     db.add(current_user)
-    db.commit()
+    await db.run_sync(stage_user_changed, current_user.id)
+    await db.commit()
     return {"message": "Password updated"}
 
 
@@ -448,8 +528,8 @@ async def update_current_user_password(
 async def upload_avatar(
     request: Request,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_profile)
 ):
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image file")
@@ -465,8 +545,9 @@ async def upload_avatar(
 
     current_user.avatar_filename = filename
     db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
+    await db.run_sync(stage_user_changed, current_user.id)
+    await db.commit()
+    await db.refresh(current_user)
 
     return UserResponse(
         id=str(current_user.id),
@@ -485,7 +566,7 @@ async def refresh_access_token(
     response: Response,
     request_body: RefreshRequest,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Generate a new access token using a valid refresh token
@@ -503,16 +584,16 @@ async def refresh_access_token(
     if not verify_token_type(payload, "refresh"):
         raise credentials_exception
 
-    user_id: str = payload.get("sub")
+    user_id = _parse_user_id(payload.get("sub"))
     if user_id is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if user is None or not user.is_active:
         raise credentials_exception
 
     # Create new tokens
-    new_access_token = create_access_token(data={"sub": str(user.id)})
+    new_access_token = await _create_scoped_access_token(db, user)
     new_refresh_token = create_refresh_token(data={"sub": str(user.id)})
 
     # Update cookies with secure flag in production
@@ -561,7 +642,7 @@ async def refresh_access_token(
 @router.post("/password-reset/request")
 async def request_password_reset(
     payload: PasswordResetRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not settings.SMTP_HOST or not settings.SMTP_FROM:
         raise HTTPException(
@@ -569,12 +650,14 @@ async def request_password_reset(
             detail="Email service is not configured"
         )
 
-    user = db.query(User).filter(func.lower(User.email) == func.lower(payload.email.strip())).first()
+    user = await db.scalar(select(User).where(func.lower(User.email) == func.lower(payload.email.strip())))
     if user and user.is_active:
-        db.query(PasswordResetToken).filter(
-            PasswordResetToken.user_id == user.id,
-            PasswordResetToken.used_at.is_(None)
-        ).delete(synchronize_session=False)
+        await db.execute(
+            delete(PasswordResetToken).where(
+                PasswordResetToken.user_id == user.id,
+                PasswordResetToken.used_at.is_(None)
+            ).execution_options(synchronize_session=False)
+        )
 
         raw_token = secrets.token_urlsafe(32)
         token_hash = _hash_reset_token(raw_token)
@@ -586,7 +669,7 @@ async def request_password_reset(
             expires_at=expires_at
         )
         db.add(reset_token)
-        db.commit()
+        await db.commit()
 
         base_url = settings.FRONTEND_BASE_URL.rstrip("/")
         reset_link = f"{base_url}/reset-password?token={raw_token}"
@@ -597,7 +680,7 @@ async def request_password_reset(
             "If you did not request this, you can ignore this email."
         )
         try:
-            send_email(user.email, subject, body)
+            await asyncio.to_thread(send_email, user.email, subject, body)
         except RuntimeError as exc:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -610,7 +693,7 @@ async def request_password_reset(
 @router.post("/password-reset/confirm")
 async def confirm_password_reset(
     payload: PasswordResetConfirm,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if payload.new_password != payload.confirm_password:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Passwords do not match")
@@ -619,23 +702,24 @@ async def confirm_password_reset(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=" ".join(errors))
 
     token_hash = _hash_reset_token(payload.token.strip())
-    reset_token = db.query(PasswordResetToken).filter(
+    reset_token = await db.scalar(select(PasswordResetToken).where(
         PasswordResetToken.token_hash == token_hash,
         PasswordResetToken.used_at.is_(None),
         PasswordResetToken.expires_at > datetime.utcnow()
-    ).first()
+    ))
     if not reset_token:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired reset token")
 
-    user = db.query(User).filter(User.id == reset_token.user_id).first()
+    user = await db.scalar(select(User).where(User.id == reset_token.user_id))
     if not user or not user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired reset token")
 
-    user.password_hash = get_password_hash(payload.new_password)
+    user.password_hash = await asyncio.to_thread(get_password_hash, payload.new_password)
     reset_token.used_at = datetime.utcnow()
     db.add(user)
     db.add(reset_token)
-    db.commit()
+    await db.run_sync(stage_user_changed, user.id)
+    await db.commit()
     return {"message": "Password reset successful"}
 
 # ============================================================================
@@ -654,13 +738,13 @@ class UserRecipientAccessUpdate(BaseModel):
 @router.get("/users", response_model=List[UserResponse])
 async def list_users(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: User = Depends(get_current_active_admin)
 ):
     """
     List all users (admin only)
     """
-    users = db.query(User).order_by(User.created_at.desc()).all()
+    users = (await db.scalars(select(User).order_by(User.created_at.desc()))).all()
     
     return [
         UserResponse(
@@ -682,13 +766,14 @@ async def update_user(
     user_id: str,
     user_update: UserUpdate,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: User = Depends(get_current_active_admin)
 ):
     """
     Update user (admin only)
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    # Locked, so concurrent changes each get their own authz_version
+    user = await db.scalar(select(User).where(User.id == _parse_user_id(user_id)).with_for_update())
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -707,8 +792,10 @@ async def update_user(
             )
         user.role = user_update.role
 
-    db.commit()
-    db.refresh(user)
+    user.authz_version += 1
+    await db.run_sync(stage_access_changed, user.id, user.authz_version)
+    await db.commit()
+    await db.refresh(user)
 
     return UserResponse(
         id=str(user.id),
@@ -725,7 +812,7 @@ async def update_user(
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: User = Depends(get_current_active_admin)
 ):
     """
@@ -738,19 +825,22 @@ async def delete_user(
             detail="Cannot delete your own account"
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == _parse_user_id(user_id)))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
-    db.query(UserRecipientAccess).filter(
-        UserRecipientAccess.user_id == user_id
-    ).delete(synchronize_session=False)
+    await db.execute(
+        delete(UserRecipientAccess).where(
+            UserRecipientAccess.user_id == user.id
+        ).execution_options(synchronize_session=False)
+    )
 
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.run_sync(stage_access_changed, user_id)
+    await db.commit()
 
     return {"message": "User deleted successfully"}
 
@@ -758,20 +848,20 @@ async def delete_user(
 @router.get("/users/{user_id}/recipients")
 async def get_user_recipients(
     user_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: User = Depends(get_current_active_admin)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == _parse_user_id(user_id)))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     if user.role == "admin":
-        recipients = db.query(CareRecipient).filter(CareRecipient.is_active.is_(True)).all()
+        recipients = (await db.scalars(select(CareRecipient).where(CareRecipient.is_active.is_(True)))).all()
         return {"recipient_ids": [str(rec.id) for rec in recipients]}
 
-    access_rows = db.query(UserRecipientAccess).filter(
-        UserRecipientAccess.user_id == user_id
-    ).all()
+    access_rows = (await db.scalars(select(UserRecipientAccess).where(
+        UserRecipientAccess.user_id == user.id
+    ))).all()
     return {"recipient_ids": [str(row.recipient_id) for row in access_rows]}
 
 
@@ -779,28 +869,30 @@ async def get_user_recipients(
 async def update_user_recipients(
     user_id: str,
     payload: UserRecipientAccessUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: User = Depends(get_current_active_admin)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == _parse_user_id(user_id)).with_for_update())
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    recipients = db.query(CareRecipient).filter(
+    recipients = (await db.scalars(select(CareRecipient).where(
         CareRecipient.id.in_(payload.recipient_ids)
-    ).all()
+    ))).all()
     if len(recipients) != len(set(payload.recipient_ids)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="One or more recipients are invalid"
         )
 
-    db.query(UserRecipientAccess).filter(
-        UserRecipientAccess.user_id == user_id
-    ).delete()
+    await db.execute(
+        delete(UserRecipientAccess).where(UserRecipientAccess.user_id == user.id)
+    )
 
     for recipient in recipients:
-        db.add(UserRecipientAccess(user_id=user_id, recipient_id=recipient.id))
+        db.add(UserRecipientAccess(user_id=user.id, recipient_id=recipient.id))
 
-    db.commit()
+    user.authz_version += 1
+    await db.run_sync(stage_access_changed, user_id, user.authz_version)
+    await db.commit()
     return {"recipient_ids": [str(rec.id) for rec in recipients]}
@@ -1,29 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc, or_
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from sqlalchemy import desc, func, inspect, or_, text, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timezone
+import base64
+import binascii
+import csv
+import io
 import json
+import re
+import orjson
 from uuid import UUID
 
-from database import get_db
+from database import SessionLocal, get_async_db
 from models.user import User
-from models.app_setting import AppSetting
-from models.event import Event
+from models.event import Event, SEARCH_TS_CONFIG
 from models.care_recipient import CareRecipient
 from routes.auth import get_current_user
-from routes.stream import broadcast_event
+from routes.stream import stage_broadcast
 from services.med_reminder_service import record_medication_dose, update_reminder_after_event_delete
 from services.access_control import (
+    check_recipient_allowed,
     ensure_recipient_access,
     get_allowed_recipient_ids,
     require_write_access,
 )
-from services.utils import to_utc_iso
+from services.app_settings import decode_json, get_setting, set_json_setting
+from services.change_feed import (
+    get_change_feed_position,
+    get_tombstone_watermark,
+    list_changes,
+    mark_event_changed,
+    record_event_tombstone,
+)
+from services.event_rollups import get_event_rollups, get_rollup_timezone
+from services.event_stats import (
+    empty_stats,
+    get_event_counts,
+    record_event_changed,
+    record_event_created,
+    record_event_deleted,
+)
+from services.idempotency import (
+    commit_or_replay,
+    find_idempotent_response,
+    request_fingerprint,
+    store_idempotent_response,
+)
+from services.utils import FastJSONResponse, to_utc_iso
 
 router = APIRouter()
 ACTIVE_FEED_KEY_PREFIX = "active_continuous_feed"
+VALID_EVENT_TYPES = ["medication", "feeding", "diaper", "demeanor", "observation"]
+MAX_BATCH_OPERATIONS = 500
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_CSV_FIELDS = [
+    "id", "timestamp", "type", "recipient_id", "recipient_name", "user_id", "user_name",
+    "notes", "metadata", "synced", "created_offline", "created_at", "updated_at",
+]
 
 
 def feed_setting_key(recipient_id: str) -> str:
@@ -31,17 +70,10 @@ def feed_setting_key(recipient_id: str) -> str:
 
 
 def update_active_feed_started_at(db: Session, recipient_id: str, started_at: datetime) -> None:
-    setting = db.query(AppSetting).filter(AppSetting.key == feed_setting_key(recipient_id)).first()
-    if not setting:
+    data = get_setting(db, feed_setting_key(recipient_id), decode_json, for_update=True)
+    if not isinstance(data, dict):
         return
-    try:
-        payload = setting.value
-        data = payload if isinstance(payload, dict) else json.loads(payload)
-    except Exception:
-        return
-    data["started_at"] = to_utc_iso(started_at)
-    setting.value = json.dumps(data)
-    db.commit()
+    set_json_setting(db, feed_setting_key(recipient_id), {**data, "started_at": to_utc_iso(started_at)})
 
 
 # Pydantic models for request/response
@@ -80,7 +112,196 @@ class EventResponse(BaseModel):
         from_attributes = True
 
 
-def resolve_recipient(db: Session, recipient_id: Optional[str]) -> CareRecipient:
+class EventBatchOperation(BaseModel):
+    op: str = Field(..., pattern="^(create|update|delete)$")
+    client_id: Optional[str] = Field(default=None, max_length=100, description="Client temp ID, echoed back for creates")
+    event_id: Optional[str] = Field(default=None, description="Target event ID or the client_id of an earlier create")
+    data: Optional[Dict[str, Any]] = None
+
+
+class EventBatchRequest(BaseModel):
+    operations: List[EventBatchOperation] = Field(..., max_length=MAX_BATCH_OPERATIONS)
+
+
+class EventBatchResult(BaseModel):
+    index: int
+    op: str
+    status: int
+    client_id: Optional[str] = None
+    event_id: Optional[str] = None
+    event: Optional[EventResponse] = None
+    error: Optional[str] = None
+
+
+class EventBatchResponse(BaseModel):
+    results: List[EventBatchResult]
+    id_map: Dict[str, str]
+
+
+class EventPage(BaseModel):
+    events: List[EventResponse]
+    next_cursor: Optional[str]
+
+
+class EventRollupBucket(BaseModel):
+    start: str
+    counts: Dict[str, int]
+    total: int
+    amount_ml: float
+
+
+class EventRollups(BaseModel):
+    bucket: str
+    timezone: str
+    buckets: List[EventRollupBucket]
+
+
+class DeletedEvent(BaseModel):
+    id: str
+    recipient_id: Optional[str]
+
+
+class EventChanges(BaseModel):
+    events: List[EventResponse]
+    deleted: List[DeletedEvent]
+    next_since: int
+    has_more: bool
+    resync_required: bool = False
+
+
+def encode_event_cursor(event: Event) -> str:
+    """Encode the (timestamp, id) position of an event as an opaque cursor."""
+    raw = json.dumps({"ts": event.timestamp.isoformat(), "id": str(event.id)})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_event_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Decode a cursor produced by encode_event_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["ts"]), UUID(data["id"])
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def check_recipient_filter(
+    recipient_id: Optional[str],
+    allowed: Optional[List[str]]
+) -> None:
+    if allowed is not None and recipient_id and recipient_id not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have access to this recipient"
+        )
+
+
+def build_search_tsquery(q: str):
+    """Build a prefix-matching tsquery (every word must match) for a search term."""
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    return func.to_tsquery(SEARCH_TS_CONFIG, " & ".join(f"{word}:*" for word in words))
+
+
+# Whether the database has pg_trgm, looked up once per worker
+_has_trigrams: Optional[bool] = None
+
+
+def has_trigrams(db: Session) -> bool:
+    """Whether pg_trgm is installed; init_db and the search migration add it where the server ships it."""
+    global _has_trigrams
+    if _has_trigrams is None:
+        _has_trigrams = db.scalar(text("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'")) > 0
+    return _has_trigrams
+
+
+def apply_event_filters(
+    query,
+    type: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    q: Optional[str],
+    recipient_id: Optional[str],
+    allowed: Optional[List[str]]
+):
+    """Apply the shared list filters used by the event list endpoints."""
+    if type:
+        query = query.filter(Event.type == type)
+
+    if start:
+        query = query.filter(Event.timestamp >= start)
+    if end:
+        query = query.filter(Event.timestamp <= end)
+    if recipient_id:
+        query = query.filter(Event.recipient_id == recipient_id)
+    elif allowed is not None:
+        query = query.filter(Event.recipient_id.in_(allowed))
+
+    if q and q.strip():
+        # Word-prefix matches use the tsvector GIN index; substring matches
+        # use the trigram GIN index on the same generated text.
+        conditions = [Event.search_text.ilike(f"%{q.strip()}%")]
+        tsquery = build_search_tsquery(q)
+        if tsquery is not None:
+            conditions.append(Event.search_vector.op("@@")(tsquery))
+        query = query.filter(or_(*conditions))
+    return query
+
+
+def event_to_response(event: Event) -> EventResponse:
+    return EventResponse(
+        id=str(event.id),
+        type=event.type,
+        timestamp=to_utc_iso(event.timestamp),
+        user_id=str(event.user_id),
+        user_name=event.user.username if event.user else "Unknown",
+        recipient_id=str(event.recipient.id) if event.recipient else None,
+        recipient_name=event.recipient.name if event.recipient else None,
+        notes=event.notes,
+        metadata=event.event_data,
+        synced=event.synced,
+        created_offline=event.created_offline,
+        created_at=to_utc_iso(event.created_at),
+        updated_at=to_utc_iso(event.updated_at)
+    )
+
+
+def event_row_query(db: Session):
+    """
+    Query events as plain rows shaped like EventResponse.
+
+    Skips ORM objects and the identity map; UUIDs and datetimes are left for
+    FastJSONResponse to serialize, so each row needs only _asdict().
+    """
+    return db.query(
+        Event.id,
+        Event.type,
+        Event.timestamp,
+        Event.user_id,
+        func.coalesce(User.username, "Unknown").label("user_name"),
+        CareRecipient.id.label("recipient_id"),
+        CareRecipient.name.label("recipient_name"),
+        Event.notes,
+        func.coalesce(Event.event_data, text("'{}'::jsonb")).label("metadata"),
+        Event.synced,
+        Event.created_offline,
+        Event.created_at,
+        Event.updated_at
+    ).outerjoin(User, User.id == Event.user_id).outerjoin(CareRecipient, CareRecipient.id == Event.recipient_id)
+
+
+def resolve_recipient(
+    db: Session,
+    recipient_id: Optional[str],
+    cache: Optional[Dict[Optional[str], CareRecipient]] = None
+) -> CareRecipient:
+    if cache is not None and recipient_id in cache:
+        return cache[recipient_id]
+
     if recipient_id:
         recipient = db.query(CareRecipient).filter(CareRecipient.id == recipient_id).first()
         if not recipient:
@@ -93,48 +314,57 @@ def resolve_recipient(db: Session, recipient_id: Optional[str]) -> CareRecipient
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Recipient is inactive"
             )
-        return recipient
-
-    active_recipients = db.query(CareRecipient).filter(CareRecipient.is_active.is_(True)).all()
-    if len(active_recipients) == 1:
-        return active_recipients[0]
+    else:
+        active_recipients = db.query(CareRecipient).filter(CareRecipient.is_active.is_(True)).all()
+        if len(active_recipients) != 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="recipient_id is required"
+            )
+        recipient = active_recipients[0]
 
-    raise HTTPException(
-        status_code=status.HTTP_400_BAD_REQUEST,
-        detail="recipient_id is required"
-    )
+    if cache is not None:
+        cache[recipient_id] = recipient
+    return recipient
 
 
-@router.post("/", response_model=EventResponse, status_code=status.HTTP_201_CREATED)
-async def create_event(
-    event_data: EventCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """
-    Create a new care event
-
-    Supported event types:
-    - medication: Track medication administration
-    - feeding: Log feeding sessions
-    - diaper: Record diaper changes
-    - demeanor: Document mood and behavior
-    - observation: General notes and observations
-    """
+def validate_event_type(event_type: str) -> None:
+    if event_type not in VALID_EVENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid event type. Must be one of: {', '.join(VALID_EVENT_TYPES)}"
+        )
 
-    require_write_access(current_user)
 
-    # Validate event type
-    valid_types = ["medication", "feeding", "diaper", "demeanor", "observation"]
-    if event_data.type not in valid_types:
+def get_event_or_404(db: Session, event_id: UUID, with_relations: bool = False) -> Event:
+    query = db.query(Event)
+    if with_relations:
+        query = query.options(
+            joinedload(Event.user),
+            joinedload(Event.recipient)
+        )
+    event = query.filter(Event.id == event_id).first()
+    if not event:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid event type. Must be one of: {', '.join(valid_types)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
         )
+    return event
 
-    # Create event
-    recipient = resolve_recipient(db, event_data.recipient_id)
-    ensure_recipient_access(db, current_user, str(recipient.id))
+
+def apply_event_create(
+    db: Session,
+    current_user: User,
+    allowed: Optional[List[str]],
+    event_data: EventCreate,
+    created_offline: bool = False,
+    recipient_cache: Optional[Dict[Optional[str], CareRecipient]] = None
+) -> Tuple[Event, CareRecipient]:
+    """Stage a new event and its counter/reminder side effects. Caller commits."""
+    validate_event_type(event_data.type)
+
+    recipient = resolve_recipient(db, event_data.recipient_id, recipient_cache)
+    check_recipient_allowed(allowed, str(recipient.id))
 
     new_event = Event(
         type=event_data.type,
@@ -143,22 +373,101 @@ async def create_event(
         recipient_id=recipient.id,
         notes=event_data.notes,
         event_data=event_data.metadata or {},
-        synced=True,  # Created online, so already synced
-        created_offline=False
+        synced=True,
+        created_offline=created_offline
     )
 
     db.add(new_event)
-    db.commit()
-    db.refresh(new_event)
+    mark_event_changed(db, new_event)
+    record_event_created(db, new_event)
 
     if new_event.type == "medication":
         med_name = (event_data.metadata or {}).get("med_name")
-        reminder = record_medication_dose(db, recipient.id, med_name, new_event.timestamp, current_user.id)
-        if reminder:
-            db.commit()
-    await broadcast_event({"type": "event.created", "id": str(new_event.id), "recipient_id": str(recipient.id)})
+        record_medication_dose(db, recipient.id, med_name, new_event.timestamp, current_user.id)
 
-    return EventResponse(
+    return new_event, recipient
+
+
+def apply_event_update(
+    db: Session,
+    allowed: Optional[List[str]],
+    event: Event,
+    event_update: EventUpdate,
+    recipient_cache: Optional[Dict[Optional[str], CareRecipient]] = None
+) -> None:
+    """Stage changes to an existing event. Caller commits."""
+    if event.recipient_id:
+        check_recipient_allowed(allowed, str(event.recipient_id))
+
+    old_recipient_id = event.recipient_id
+    old_type = event.type
+    old_timestamp = event.timestamp
+    old_event_data = event.event_data
+
+    # Update fields if provided
+    if event_update.type is not None:
+        validate_event_type(event_update.type)
+        event.type = event_update.type
+
+    if event_update.timestamp is not None:
+        event.timestamp = event_update.timestamp
+
+    if event_update.notes is not None:
+        event.notes = event_update.notes
+
+    if event_update.metadata is not None:
+        event.event_data = event_update.metadata
+    if event_update.recipient_id is not None:
+        recipient = resolve_recipient(db, event_update.recipient_id, recipient_cache)
+        check_recipient_allowed(allowed, str(recipient.id))
+        event.recipient_id = recipient.id
+
+    event.updated_at = datetime.now(timezone.utc)
+    mark_event_changed(db, event)
+    if old_recipient_id is not None and old_recipient_id != event.recipient_id:
+        record_event_tombstone(db, event.id, old_recipient_id)
+    record_event_changed(db, event, old_recipient_id, old_type, old_timestamp, old_event_data)
+
+    if event.type == "feeding":
+        metadata = event.event_data or {}
+        if metadata.get("mode") == "continuous" and metadata.get("status") == "started" and event.recipient_id:
+            update_active_feed_started_at(db, str(event.recipient_id), event.timestamp)
+
+
+def apply_event_delete(
+    db: Session,
+    allowed: Optional[List[str]],
+    event: Event
+) -> None:
+    """Stage deletion of an event and its counter/reminder side effects. Caller commits."""
+    if event.recipient_id:
+        check_recipient_allowed(allowed, str(event.recipient_id))
+
+    db.delete(event)
+    record_event_tombstone(db, event.id, event.recipient_id)
+    record_event_deleted(db, event)
+
+    if event.type == "medication" and event.recipient_id:
+        med_name = (event.event_data or {}).get("med_name")
+        update_reminder_after_event_delete(db, str(event.recipient_id), med_name, str(event.id))
+
+
+def _create_event(
+    db: Session,
+    event_data: EventCreate,
+    idempotency_key: Optional[str],
+    current_user: User,
+    fingerprint: str
+):
+    replay = find_idempotent_response(db, current_user.id, idempotency_key, fingerprint)
+    if replay:
+        return replay
+
+    allowed = get_allowed_recipient_ids(db, current_user)
+    new_event, recipient = apply_event_create(db, current_user, allowed, event_data)
+    db.flush()
+
+    response = EventResponse(
         id=str(new_event.id),
         type=new_event.type,
         timestamp=to_utc_iso(new_event.timestamp),
@@ -173,6 +482,211 @@ async def create_event(
         created_at=to_utc_iso(new_event.created_at),
         updated_at=to_utc_iso(new_event.updated_at)
     )
+    store_idempotent_response(db, current_user.id, idempotency_key, fingerprint, status.HTTP_201_CREATED, response)
+    stage_broadcast(db, {
+        "type": "event.created",
+        "id": response.id,
+        "recipient_id": response.recipient_id,
+        "event": response.model_dump()
+    })
+    replay = commit_or_replay(db, current_user.id, idempotency_key, fingerprint)
+    if replay:
+        return replay
+
+    return response
+
+
+@router.post("/", response_model=EventResponse, status_code=status.HTTP_201_CREATED)
+async def create_event(
+    event_data: EventCreate,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Create a new care event
+
+    Supported event types:
+    - medication: Track medication administration
+    - feeding: Log feeding sessions
+    - diaper: Record diaper changes
+    - demeanor: Document mood and behavior
+    - observation: General notes and observations
+
+    Send an Idempotency-Key header to make retries safe: a repeated key
+    returns the original response without creating another event.
+    """
+
+    require_write_access(current_user)
+
+    fingerprint = request_fingerprint("POST /events", event_data.model_dump_json())
+
+    return await db.run_sync(_create_event, event_data, idempotency_key, current_user, fingerprint)
+
+
+def resolve_batch_event_id(event_id: Optional[str], id_map: Dict[str, str]) -> UUID:
+    if not event_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="event_id is required"
+        )
+    try:
+        return UUID(id_map.get(event_id, event_id))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid event_id"
+        )
+
+
+def _apply_event_batch(
+    db: Session,
+    batch: EventBatchRequest,
+    idempotency_key: Optional[str],
+    current_user: User,
+    fingerprint: str
+):
+    replay = find_idempotent_response(db, current_user.id, idempotency_key, fingerprint)
+    if replay:
+        return replay
+
+    allowed = get_allowed_recipient_ids(db, current_user)
+    recipient_cache: Dict[Optional[str], CareRecipient] = {}
+    id_map: Dict[str, str] = {}
+    results: List[EventBatchResult] = []
+    applied: List[Tuple[EventBatchResult, Optional[Event]]] = []
+    changes: Dict[str, Dict[str, List[str]]] = {}
+
+    for index, item in enumerate(batch.operations):
+        result = EventBatchResult(index=index, op=item.op, status=status.HTTP_200_OK, client_id=item.client_id)
+        results.append(result)
+        savepoint = db.begin_nested()
+        try:
+            event: Optional[Event] = None
+            if item.op == "create":
+                event, _ = apply_event_create(
+                    db,
+                    current_user,
+                    allowed,
+                    EventCreate(**(item.data or {})),
+                    created_offline=True,
+                    recipient_cache=recipient_cache
+                )
+                result.status = status.HTTP_201_CREATED
+                change_key = "created"
+            elif item.op == "update":
+                event = get_event_or_404(db, resolve_batch_event_id(item.event_id, id_map))
+                apply_event_update(db, allowed, event, EventUpdate(**(item.data or {})), recipient_cache)
+                change_key = "updated"
+            else:
+                event = get_event_or_404(db, resolve_batch_event_id(item.event_id, id_map))
+                apply_event_delete(db, allowed, event)
+                result.status = status.HTTP_204_NO_CONTENT
+                change_key = "deleted"
+            db.flush()
+            savepoint.commit()
+        except HTTPException as exc:
+            savepoint.rollback()
+            result.status = exc.status_code
+            result.error = str(exc.detail)
+            continue
+        except ValidationError:
+            savepoint.rollback()
+            result.status = status.HTTP_422_UNPROCESSABLE_ENTITY
+            result.error = "Invalid event data"
+            continue
+        except SQLAlchemyError:
+            savepoint.rollback()
+            result.status = status.HTTP_500_INTERNAL_SERVER_ERROR
+            result.error = "Failed to apply operation"
+            continue
+
+        result.event_id = str(event.id)
+        if item.op == "create" and item.client_id:
+            id_map[item.client_id] = result.event_id
+        recipient_key = str(event.recipient_id) if event.recipient_id else None
+        changes.setdefault(recipient_key, {"created": [], "updated": [], "deleted": [], "events": []})[change_key].append(result.event_id)
+        applied.append((result, event if item.op != "delete" else None))
+
+    for result, event in applied:
+        if event is not None and inspect(event).persistent:
+            result.event = event_to_response(event)
+            recipient_key = str(event.recipient_id) if event.recipient_id else None
+            changes.setdefault(recipient_key, {"created": [], "updated": [], "deleted": [], "events": []})["events"].append(
+                result.event.model_dump()
+            )
+
+    response = EventBatchResponse(results=results, id_map=id_map)
+    store_idempotent_response(db, current_user.id, idempotency_key, fingerprint, status.HTTP_200_OK, response)
+    for recipient_key, recipient_changes in changes.items():
+        stage_broadcast(db, {"type": "event.batch", "recipient_id": recipient_key, **recipient_changes})
+    replay = commit_or_replay(db, current_user.id, idempotency_key, fingerprint)
+    if replay:
+        return replay
+
+    return response
+
+
+@router.post("/batch", response_model=EventBatchResponse)
+async def apply_event_batch(
+    batch: EventBatchRequest,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Apply many create/update/delete operations in one transaction
+
+    Used to replay the offline queue in a single round trip. Each operation
+    runs in its own savepoint, so a failing item is reported in its result
+    without undoing the others. Updates and deletes may target the client_id
+    of a create earlier in the same batch. One SSE message is broadcast per
+    affected recipient once the batch is committed. An Idempotency-Key
+    header makes a retried batch return the original results.
+    """
+
+    require_write_access(current_user)
+
+    fingerprint = request_fingerprint("POST /events/batch", batch.model_dump_json())
+
+    return await db.run_sync(_apply_event_batch, batch, idempotency_key, current_user, fingerprint)
+
+
+def _get_events(
+    db: Session,
+    type: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    q: Optional[str],
+    recipient_id: Optional[str],
+    limit: int,
+    offset: int,
+    sort: str,
+    current_user: User
+):
+    allowed = get_allowed_recipient_ids(db, current_user)
+    check_recipient_filter(recipient_id, allowed)
+    if allowed is not None and not allowed:
+        return []
+
+    # Column-only query joined to user and recipient names (no N+1, no ORM objects)
+    query = apply_event_filters(event_row_query(db), type, start, end, q, recipient_id, allowed)
+
+    tsquery = build_search_tsquery(q) if q else None
+    if sort == "relevance" and tsquery is not None:
+        ordering = [desc(func.ts_rank_cd(Event.search_vector, tsquery))]
+        # Without pg_trgm, ties on rank go straight to the most recent
+        if has_trigrams(db):
+            ordering.append(desc(func.similarity(Event.search_text, q.strip())))
+        query = query.order_by(*ordering, desc(Event.timestamp))
+    else:
+        # Order by timestamp descending (most recent first)
+        query = query.order_by(desc(Event.timestamp))
+
+    # Apply pagination
+    rows = query.offset(offset).limit(limit).all()
+
+    return FastJSONResponse([row._asdict() for row in rows])
 
 
 @router.get("/", response_model=List[EventResponse])
@@ -184,272 +698,419 @@ async def get_events(
     recipient_id: Optional[str] = Query(None, description="Filter by care recipient"),
     limit: int = Query(50, ge=1, le=1000, description="Number of events to return"),
     offset: int = Query(0, ge=0, description="Number of events to skip"),
-    db: Session = Depends(get_db),
+    sort: str = Query("recent", pattern="^(recent|relevance)$", description="Sort order: recent or relevance"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get list of care events
 
-    Returns events ordered by timestamp (most recent first)
+    Returns events ordered by timestamp (most recent first), or by search
+    relevance when sort=relevance and q is given.
     """
 
-    allowed = get_allowed_recipient_ids(db, current_user)
-    if allowed is not None:
-        if recipient_id and recipient_id not in allowed:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You do not have access to this recipient"
-            )
-        if not allowed:
-            return []
+    return await db.run_sync(_get_events, type, start, end, q, recipient_id, limit, offset, sort, current_user)
+
+
+def export_row(row) -> Dict[str, Any]:
+    """Convert an event row to CSV cells."""
+    data = row._asdict()
+    for key in ("id", "user_id", "recipient_id"):
+        data[key] = str(data[key]) if data[key] else None
+    for key in ("timestamp", "created_at", "updated_at"):
+        data[key] = to_utc_iso(data[key])
+    data["metadata"] = json.dumps(data["metadata"], separators=(",", ":"))
+    return data
 
-    # Use joinedload to eagerly fetch related User and CareRecipient (fixes N+1 query)
-    query = db.query(Event).options(
-        joinedload(Event.user),
-        joinedload(Event.recipient)
+
+def csv_cell(value: Any) -> Any:
+    """Stop spreadsheet apps from treating free text as a formula."""
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@", "\t", "\r"):
+        return "'" + value
+    return value
+
+
+def iter_event_export(
+    format: str,
+    type: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    q: Optional[str],
+    recipient_id: Optional[str],
+    allowed: Optional[List[str]]
+):
+    """
+    Yield the export body in chunks.
+
+    Runs in its own session because the request session is closed before a
+    streaming body is sent. Rows are plain column tuples fetched through a
+    server-side cursor, so memory use does not depend on the export size.
+    """
+    db = SessionLocal()
+    try:
+        query = event_row_query(db)
+        query = apply_event_filters(query, type, start, end, q, recipient_id, allowed)
+        query = query.order_by(Event.timestamp, Event.id).yield_per(EXPORT_BATCH_SIZE)
+
+        buffer = io.StringIO()
+        writer = None
+        if format == "csv":
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_CSV_FIELDS)
+            writer.writeheader()
+
+        for row in query:
+            if writer:
+                writer.writerow({key: csv_cell(value) for key, value in export_row(row).items()})
+            else:
+                buffer.write(orjson.dumps(row._asdict(), option=orjson.OPT_NAIVE_UTC).decode())
+                buffer.write("\n")
+
+            if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+def _export_events(
+    db: Session,
+    format: str,
+    type: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    q: Optional[str],
+    recipient_id: Optional[str],
+    current_user: User
+):
+    allowed = get_allowed_recipient_ids(db, current_user)
+    check_recipient_filter(recipient_id, allowed)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"care-events-{datetime.now(timezone.utc).strftime('%Y%m%d')}.{format}"
+    return StreamingResponse(
+        iter_event_export(format, type, start, end, q, recipient_id, allowed),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
-    # Filter by type if specified
-    if type:
-        query = query.filter(Event.type == type)
 
-    if start:
-        query = query.filter(Event.timestamp >= start)
-    if end:
-        query = query.filter(Event.timestamp <= end)
-    if recipient_id:
-        query = query.filter(Event.recipient_id == recipient_id)
-    elif allowed is not None:
-        query = query.filter(Event.recipient_id.in_(allowed))
+@router.get("/export")
+async def export_events(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Export format: csv or ndjson"),
+    type: Optional[str] = Query(None, description="Filter by event type"),
+    start: Optional[datetime] = Query(None, description="Start datetime (inclusive)"),
+    end: Optional[datetime] = Query(None, description="End datetime (inclusive)"),
+    q: Optional[str] = Query(None, description="Search term"),
+    recipient_id: Optional[str] = Query(None, description="Filter by care recipient"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Export care events as CSV or NDJSON
 
-    if q:
-        search = f"%{q.strip()}%"
-        query = query.filter(
-            or_(
-                Event.notes.ilike(search),
-                Event.event_data["med_name"].astext.ilike(search),
-                Event.event_data["formula_type"].astext.ilike(search),
-                Event.event_data["oral_notes"].astext.ilike(search),
-            )
+    Takes the same filters as the event list, without a limit. Events are
+    ordered oldest first and streamed as they are read, so a five-year
+    history uses no more memory than a week.
+    """
+
+    return await db.run_sync(_export_events, format, type, start, end, q, recipient_id, current_user)
+
+
+def _get_events_page(
+    db: Session,
+    type: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    q: Optional[str],
+    recipient_id: Optional[str],
+    limit: int,
+    cursor: Optional[str],
+    current_user: User
+):
+    allowed = get_allowed_recipient_ids(db, current_user)
+    check_recipient_filter(recipient_id, allowed)
+    if allowed is not None and not allowed:
+        return EventPage(events=[], next_cursor=None)
+
+    query = apply_event_filters(event_row_query(db), type, start, end, q, recipient_id, allowed)
+
+    if cursor:
+        cursor_ts, cursor_id = decode_event_cursor(cursor)
+        query = query.filter(tuple_(Event.timestamp, Event.id) < tuple_(cursor_ts, cursor_id))
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(desc(Event.timestamp), desc(Event.id)).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_event_cursor(rows[-1])
+
+    return FastJSONResponse({
+        "events": [row._asdict() for row in rows],
+        "next_cursor": next_cursor
+    })
+
+
+@router.get("/page", response_model=EventPage)
+async def get_events_page(
+    type: Optional[str] = Query(None, description="Filter by event type"),
+    start: Optional[datetime] = Query(None, description="Start datetime (inclusive)"),
+    end: Optional[datetime] = Query(None, description="End datetime (inclusive)"),
+    q: Optional[str] = Query(None, description="Search term"),
+    recipient_id: Optional[str] = Query(None, description="Filter by care recipient"),
+    limit: int = Query(50, ge=1, le=1000, description="Number of events to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get a page of care events using keyset pagination
+
+    Events are ordered by (timestamp, id) descending. Pass the returned
+    next_cursor to fetch the following page; it is null on the last page.
+    Unlike offset pagination, the cost of a page does not grow with depth.
+    """
+
+    return await db.run_sync(_get_events_page, type, start, end, q, recipient_id, limit, cursor, current_user)
+
+
+def _get_event_changes(
+    db: Session,
+    since: Optional[int],
+    recipient_id: Optional[str],
+    limit: int,
+    current_user: User
+):
+    allowed = get_allowed_recipient_ids(db, current_user)
+    check_recipient_filter(recipient_id, allowed)
+
+    if since is None:
+        return EventChanges(events=[], deleted=[], next_since=get_change_feed_position(db), has_more=False)
+
+    if since < get_tombstone_watermark(db):
+        return EventChanges(
+            events=[],
+            deleted=[],
+            next_since=get_change_feed_position(db),
+            has_more=False,
+            resync_required=True
         )
-    # Order by timestamp descending (most recent first)
-    query = query.order_by(desc(Event.timestamp))
 
-    # Apply pagination
-    events = query.offset(offset).limit(limit).all()
-
-    # Build response using eager-loaded relationships
-    response = []
-    for event in events:
-        response.append(EventResponse(
-            id=str(event.id),
-            type=event.type,
-            timestamp=to_utc_iso(event.timestamp),
-            user_id=str(event.user_id),
-            user_name=event.user.username if event.user else "Unknown",
-            recipient_id=str(event.recipient.id) if event.recipient else None,
-            recipient_name=event.recipient.name if event.recipient else None,
-            notes=event.notes,
-            metadata=event.event_data,
-            synced=event.synced,
-            created_offline=event.created_offline,
-            created_at=to_utc_iso(event.created_at),
-            updated_at=to_utc_iso(event.updated_at)
-        ))
+    if allowed is not None and not allowed:
+        return EventChanges(events=[], deleted=[], next_since=since, has_more=False)
+
+    recipient_ids = [recipient_id] if recipient_id else allowed
+    changes = list_changes(db, since, recipient_ids, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    event_ids = [change["event_id"] for change in changes if change["kind"] == "event"]
+    events = []
+    if event_ids:
+        rows = event_row_query(db).filter(Event.id.in_(event_ids)).all()
+        # Keep change feed order; an event deleted since the scan is covered by a later tombstone
+        by_id = {row.id: row._asdict() for row in rows}
+        events = [by_id[event_id] for event_id in event_ids if event_id in by_id]
+
+    return FastJSONResponse({
+        "events": events,
+        "deleted": [
+            {"id": change["event_id"], "recipient_id": change["recipient_id"]}
+            for change in changes if change["kind"] == "deleted"
+        ],
+        "next_since": changes[-1]["seq"] if changes else since,
+        "has_more": has_more,
+        "resync_required": False
+    })
+
+
+@router.get("/changes", response_model=EventChanges)
+async def get_event_changes(
+    since: Optional[int] = Query(None, ge=0, description="next_since from the previous call; omit to get the current position"),
+    recipient_id: Optional[str] = Query(None, description="Filter by care recipient"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum number of changes to return"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get events created, updated or deleted since a change feed position
 
-    return response
+    Call without since to get the current position, then load the event list
+    and poll with since=next_since to receive only what changed. Deleted
+    events are returned as tombstones. If has_more is true, call again right
+    away. If resync_required is true the tombstones for that range have been
+    purged: reload the full list and continue from next_since.
+    """
+
+    return await db.run_sync(_get_event_changes, since, recipient_id, limit, current_user)
+
+
+def _get_event_rollup_buckets(
+    db: Session,
+    bucket: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    tz: Optional[str],
+    recipient_id: Optional[str],
+    current_user: User
+):
+    allowed = get_allowed_recipient_ids(db, current_user)
+    check_recipient_filter(recipient_id, allowed)
+
+    zone_name, zone = get_rollup_timezone(db, tz)
+    recipient_ids = [recipient_id] if recipient_id else allowed
+    buckets = get_event_rollups(db, recipient_ids, bucket, zone_name, zone, start, end)
+
+    return EventRollups(bucket=bucket, timezone=zone_name, buckets=buckets)
+
+
+@router.get("/rollups", response_model=EventRollups)
+async def get_event_rollup_buckets(
+    bucket: str = Query("day", pattern="^(hour|day|week)$", description="Bucket size: hour, day or week"),
+    start: Optional[datetime] = Query(None, description="Start datetime; its bucket is included whole"),
+    end: Optional[datetime] = Query(None, description="End datetime; its bucket is included whole"),
+    tz: Optional[str] = Query(None, max_length=100, description="IANA timezone; defaults to the timezone setting"),
+    recipient_id: Optional[str] = Query(None, description="Filter by care recipient"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get event counts and feed volume per hour, day or week
+
+    Buckets are aligned to the configured timezone (weeks start on Monday).
+    Day and week buckets are read from the incrementally maintained daily
+    counters. Each bucket has per-type counts, the total, and amount_ml,
+    the summed amount_ml of its events.
+    Empty buckets are included. Without start/end the last 48 hours, 30
+    days or 12 weeks are returned.
+    """
+
+    return await db.run_sync(_get_event_rollup_buckets, bucket, start, end, tz, recipient_id, current_user)
+
+
+def _get_event(
+    db: Session,
+    event_id: UUID,
+    current_user: User
+):
+    event = get_event_or_404(db, event_id, with_relations=True)
+    if event.recipient_id:
+        ensure_recipient_access(db, current_user, str(event.recipient_id))
+
+    return event_to_response(event)
 
 
 @router.get("/{event_id}", response_model=EventResponse)
 async def get_event(
     event_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific event by ID"""
 
-    event = db.query(Event).options(
-        joinedload(Event.user),
-        joinedload(Event.recipient)
-    ).filter(Event.id == event_id).first()
+    return await db.run_sync(_get_event, event_id, current_user)
 
-    if not event:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Event not found"
-        )
-    if event.recipient_id:
-        ensure_recipient_access(db, current_user, str(event.recipient_id))
 
-    return EventResponse(
-        id=str(event.id),
-        type=event.type,
-        timestamp=to_utc_iso(event.timestamp),
-        user_id=str(event.user_id),
-        user_name=event.user.username if event.user else "Unknown",
-        recipient_id=str(event.recipient.id) if event.recipient else None,
-        recipient_name=event.recipient.name if event.recipient else None,
-        notes=event.notes,
-        metadata=event.event_data,
-        synced=event.synced,
-        created_offline=event.created_offline,
-        created_at=to_utc_iso(event.created_at),
-        updated_at=to_utc_iso(event.updated_at)
-    )
+def _update_event(
+    db: Session,
+    event_id: UUID,
+    event_update: EventUpdate,
+    current_user: User
+):
+    event = get_event_or_404(db, event_id, with_relations=True)
+    allowed = get_allowed_recipient_ids(db, current_user)
+    apply_event_update(db, allowed, event, event_update)
+
+    db.flush()
+    db.refresh(event)
+    response = event_to_response(event)
+    stage_broadcast(db, {
+        "type": "event.updated",
+        "id": response.id,
+        "recipient_id": response.recipient_id,
+        "event": response.model_dump()
+    })
+    db.commit()
+
+    return response
 
 
 @router.patch("/{event_id}", response_model=EventResponse)
 async def update_event(
     event_id: UUID,
     event_update: EventUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Update an event (notes and metadata only)"""
 
     require_write_access(current_user)
 
-    event = db.query(Event).options(
-        joinedload(Event.user),
-        joinedload(Event.recipient)
-    ).filter(Event.id == event_id).first()
-
-    if not event:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Event not found"
-        )
-    if event.recipient_id:
-        ensure_recipient_access(db, current_user, str(event.recipient_id))
-
-    # Update fields if provided
-    if event_update.type is not None:
-        valid_types = ["medication", "feeding", "diaper", "demeanor", "observation"]
-        if event_update.type not in valid_types:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid event type. Must be one of: {', '.join(valid_types)}"
-            )
-        event.type = event_update.type
-
-    if event_update.timestamp is not None:
-        event.timestamp = event_update.timestamp
+    return await db.run_sync(_update_event, event_id, event_update, current_user)
 
-    if event_update.notes is not None:
-        event.notes = event_update.notes
-
-    if event_update.metadata is not None:
-        event.event_data = event_update.metadata
-    if event_update.recipient_id is not None:
-        recipient = resolve_recipient(db, event_update.recipient_id)
-        ensure_recipient_access(db, current_user, str(recipient.id))
-        event.recipient_id = recipient.id
-
-    event.updated_at = datetime.now(timezone.utc)
-
-    if event.type == "feeding":
-        metadata = event.event_data or {}
-        if metadata.get("mode") == "continuous" and metadata.get("status") == "started" and event.recipient_id:
-            update_active_feed_started_at(db, str(event.recipient_id), event.timestamp)
 
+def _delete_event(
+    db: Session,
+    event_id: UUID,
+    current_user: User
+):
+    event = get_event_or_404(db, event_id)
+    recipient_id = str(event.recipient_id) if event.recipient_id else None
+    allowed = get_allowed_recipient_ids(db, current_user)
+    apply_event_delete(db, allowed, event)
+    stage_broadcast(db, {"type": "event.deleted", "id": str(event_id), "recipient_id": recipient_id})
     db.commit()
-    db.refresh(event)
-    await broadcast_event({"type": "event.updated", "id": str(event.id), "recipient_id": str(event.recipient_id) if event.recipient_id else None})
 
-    return EventResponse(
-        id=str(event.id),
-        type=event.type,
-        timestamp=to_utc_iso(event.timestamp),
-        user_id=str(event.user_id),
-        user_name=event.user.username if event.user else "Unknown",
-        recipient_id=str(event.recipient.id) if event.recipient else None,
-        recipient_name=event.recipient.name if event.recipient else None,
-        notes=event.notes,
-        metadata=event.event_data,
-        synced=event.synced,
-        created_offline=event.created_offline,
-        created_at=to_utc_iso(event.created_at),
-        updated_at=to_utc_iso(event.updated_at)
-    )
+    return None
 
 
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_event(
     event_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Delete an event"""
 
     require_write_access(current_user)
 
-    event = db.query(Event).filter(Event.id == event_id).first()
+    return await db.run_sync(_delete_event, event_id, current_user)
 
-    if not event:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Event not found"
-        )
-    if event.recipient_id:
-        ensure_recipient_access(db, current_user, str(event.recipient_id))
-
-    med_name = None
-    recipient_id = None
-    if event.type == "medication":
-        med_name = (event.event_data or {}).get("med_name")
-        recipient_id = str(event.recipient_id) if event.recipient_id else None
 
-    db.delete(event)
-    db.commit()
-
-    if med_name and recipient_id:
-        reminder = update_reminder_after_event_delete(db, recipient_id, med_name, str(event_id))
-        if reminder:
-            db.commit()
-    await broadcast_event({"type": "event.deleted", "id": str(event.id), "recipient_id": str(event.recipient_id) if event.recipient_id else None})
+def _get_event_stats(
+    db: Session,
+    recipient_id: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    current_user: User
+):
+    allowed = get_allowed_recipient_ids(db, current_user)
+    check_recipient_filter(recipient_id, allowed)
+    if allowed is not None and not allowed:
+        return empty_stats()
 
-    return None
+    recipient_ids = [recipient_id] if recipient_id else allowed
+    return get_event_counts(db, recipient_ids, start, end)
 
 
 @router.get("/stats/summary")
 async def get_event_stats(
     recipient_id: Optional[str] = Query(None, description="Filter by care recipient"),
-    db: Session = Depends(get_db),
+    start: Optional[datetime] = Query(None, description="Start datetime (inclusive)"),
+    end: Optional[datetime] = Query(None, description="End datetime (inclusive)"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get summary statistics of events
 
-    Returns count of each event type
+    Returns count of each event type, read from the incrementally
+    maintained counter tables rather than by counting events.
     """
 
-    allowed = get_allowed_recipient_ids(db, current_user)
-    if allowed is not None:
-        if recipient_id and recipient_id not in allowed:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You do not have access to this recipient"
-            )
-        if not allowed:
-            return {"total": 0, "medication": 0, "feeding": 0, "diaper": 0, "demeanor": 0, "observation": 0}
-
-    stats = {}
-    event_types = ["medication", "feeding", "diaper", "demeanor", "observation"]
-
-    for event_type in event_types:
-        count_query = db.query(Event).filter(Event.type == event_type)
-        if recipient_id:
-            count_query = count_query.filter(Event.recipient_id == recipient_id)
-        elif allowed is not None:
-            count_query = count_query.filter(Event.recipient_id.in_(allowed))
-        count = count_query.count()
-        stats[event_type] = count
-
-    total_query = db.query(Event)
-    if recipient_id:
-        total_query = total_query.filter(Event.recipient_id == recipient_id)
-    elif allowed is not None:
-        total_query = total_query.filter(Event.recipient_id.in_(allowed))
-    stats["total"] = total_query.count()
-
-    return stats
+    return await db.run_sync(_get_event_stats, recipient_id, start, end, current_user)
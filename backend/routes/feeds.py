@@ -1,21 +1,29 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
 from datetime import datetime, timezone
-import json
 
 logger = logging.getLogger(__name__)
 
-from database import get_db
-from models.app_setting import AppSetting
+from database import get_async_db
 from models.event import Event
 from models.user import User
 from models.care_recipient import CareRecipient
 from routes.auth import get_current_user
-from routes.stream import broadcast_event
+from routes.stream import stage_broadcast
 from services.access_control import ensure_recipient_access, require_write_access
+from services.app_settings import decode_json, get_setting, set_json_setting
+from services.change_feed import mark_event_changed
+from services.event_stats import record_event_created
+from services.idempotency import (
+    commit_or_replay,
+    find_idempotent_response,
+    request_fingerprint,
+    store_idempotent_response,
+)
 from services.utils import to_utc_iso
 
 router = APIRouter()
@@ -66,37 +74,20 @@ def feed_setting_key(recipient_id: str) -> str:
     return f"{ACTIVE_FEED_KEY_PREFIX}:{recipient_id}"
 
 
-def get_active_feed_setting(db: Session, recipient_id: str) -> Optional[Dict[str, Any]]:
-    setting = db.query(AppSetting).filter(AppSetting.key == feed_setting_key(recipient_id)).first()
-    if not setting:
-        return None
-    try:
-        return json.loads(setting.value)
-    except json.JSONDecodeError:
-        return None
+def get_active_feed_setting(db: Session, recipient_id: str, for_update: bool = False) -> Optional[Dict[str, Any]]:
+    """The recipient's running feed, if any. Pass for_update when starting or stopping one."""
+    return get_setting(db, feed_setting_key(recipient_id), decode_json, for_update=for_update)
 
 
 def set_active_feed_setting(db: Session, recipient_id: str, value: Optional[Dict[str, Any]]) -> None:
-    setting = db.query(AppSetting).filter(AppSetting.key == feed_setting_key(recipient_id)).first()
-    if value is None:
-        if setting:
-            db.delete(setting)
-            db.commit()
-        return
-    payload = json.dumps(value)
-    if setting:
-        setting.value = payload
-    else:
-        setting = AppSetting(key=feed_setting_key(recipient_id), value=payload)
-        db.add(setting)
-    db.commit()
+    """Stage the active feed setting change. Caller commits."""
+    set_json_setting(db, feed_setting_key(recipient_id), value)
 
 
-@router.get("/feeds/continuous/active", response_model=ContinuousFeedStatus)
-async def get_active_continuous_feed(
+def _get_active_continuous_feed(
+    db: Session,
     recipient_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User
 ):
     recipient = db.query(CareRecipient).filter(CareRecipient.id == recipient_id).first()
     if not recipient or not recipient.is_active:
@@ -109,13 +100,26 @@ async def get_active_continuous_feed(
     return ContinuousFeedStatus(active_feed=get_active_feed_setting(db, recipient_id), event=None)
 
 
-@router.post("/feeds/continuous/start", response_model=ContinuousFeedStatus, status_code=status.HTTP_201_CREATED)
-async def start_continuous_feed(
-    payload: ContinuousFeedStart,
-    db: Session = Depends(get_db),
+@router.get("/feeds/continuous/active", response_model=ContinuousFeedStatus)
+async def get_active_continuous_feed(
+    recipient_id: str,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    require_write_access(current_user)
+    return await db.run_sync(_get_active_continuous_feed, recipient_id, current_user)
+
+
+def _start_continuous_feed(
+    db: Session,
+    payload: ContinuousFeedStart,
+    idempotency_key: Optional[str],
+    current_user: User,
+    fingerprint: str
+):
+    replay = find_idempotent_response(db, current_user.id, idempotency_key, fingerprint)
+    if replay:
+        return replay
+
     recipient = db.query(CareRecipient).filter(CareRecipient.id == payload.recipient_id).first()
     if not recipient or not recipient.is_active:
         raise HTTPException(
@@ -124,7 +128,7 @@ async def start_continuous_feed(
         )
     ensure_recipient_access(db, current_user, str(recipient.id))
 
-    if get_active_feed_setting(db, payload.recipient_id):
+    if get_active_feed_setting(db, payload.recipient_id, for_update=True):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="A continuous feed is already running"
@@ -159,25 +163,53 @@ async def start_continuous_feed(
         created_offline=False
     )
     db.add(new_event)
-    db.commit()
-    db.refresh(new_event)
-
+    mark_event_changed(db, new_event)
+    record_event_created(db, new_event)
     set_active_feed_setting(db, payload.recipient_id, feed_data)
+    db.flush()
 
-    await broadcast_event({"type": "feed.started", "recipient_id": str(recipient.id)})
-    return ContinuousFeedStatus(
+    response = ContinuousFeedStatus(
         active_feed=feed_data,
         event=event_to_response(new_event, current_user.username, recipient.name)
     )
+    store_idempotent_response(db, current_user.id, idempotency_key, fingerprint, status.HTTP_201_CREATED, response)
+    stage_broadcast(db, {
+        "type": "feed.started",
+        "recipient_id": str(recipient.id),
+        "active_feed": response.active_feed,
+        "event": response.event
+    })
+    replay = commit_or_replay(db, current_user.id, idempotency_key, fingerprint)
+    if replay:
+        return replay
 
+    return response
 
-@router.post("/feeds/continuous/stop", response_model=ContinuousFeedStatus)
-async def stop_continuous_feed(
-    payload: ContinuousFeedStop,
-    db: Session = Depends(get_db),
+
+@router.post("/feeds/continuous/start", response_model=ContinuousFeedStatus, status_code=status.HTTP_201_CREATED)
+async def start_continuous_feed(
+    payload: ContinuousFeedStart,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     require_write_access(current_user)
+    fingerprint = request_fingerprint("POST /feeds/continuous/start", payload.model_dump_json())
+
+    return await db.run_sync(_start_continuous_feed, payload, idempotency_key, current_user, fingerprint)
+
+
+def _stop_continuous_feed(
+    db: Session,
+    payload: ContinuousFeedStop,
+    idempotency_key: Optional[str],
+    current_user: User,
+    fingerprint: str
+):
+    replay = find_idempotent_response(db, current_user.id, idempotency_key, fingerprint)
+    if replay:
+        return replay
+
     recipient = db.query(CareRecipient).filter(CareRecipient.id == payload.recipient_id).first()
     if not recipient or not recipient.is_active:
         raise HTTPException(
@@ -186,7 +218,7 @@ async def stop_continuous_feed(
         )
     ensure_recipient_access(db, current_user, str(recipient.id))
 
-    active_feed = get_active_feed_setting(db, payload.recipient_id)
+    active_feed = get_active_feed_setting(db, payload.recipient_id, for_update=True)
     if not active_feed:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -247,13 +279,37 @@ async def stop_continuous_feed(
         created_offline=False
     )
     db.add(new_event)
-    db.commit()
-    db.refresh(new_event)
-
+    mark_event_changed(db, new_event)
+    record_event_created(db, new_event)
     set_active_feed_setting(db, payload.recipient_id, None)
+    db.flush()
 
-    await broadcast_event({"type": "feed.stopped", "recipient_id": str(recipient.id)})
-    return ContinuousFeedStatus(
+    response = ContinuousFeedStatus(
         active_feed=None,
         event=event_to_response(new_event, current_user.username, recipient.name)
     )
+    store_idempotent_response(db, current_user.id, idempotency_key, fingerprint, status.HTTP_200_OK, response)
+    stage_broadcast(db, {
+        "type": "feed.stopped",
+        "recipient_id": str(recipient.id),
+        "active_feed": response.active_feed,
+        "event": response.event
+    })
+    replay = commit_or_replay(db, current_user.id, idempotency_key, fingerprint)
+    if replay:
+        return replay
+
+    return response
+
+
+@router.post("/feeds/continuous/stop", response_model=ContinuousFeedStatus)
+async def stop_continuous_feed(
+    payload: ContinuousFeedStop,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    require_write_access(current_user)
+    fingerprint = request_fingerprint("POST /feeds/continuous/stop", payload.model_dump_json())
+
+    return await db.run_sync(_stop_continuous_feed, payload, idempotency_key, current_user, fingerprint)
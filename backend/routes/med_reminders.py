@@ -4,9 +4,10 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
-from database import get_db
+from database import get_async_db
 from models.med_reminder import MedicationReminder
 from models.medication import Medication
 from models.user import User
@@ -99,12 +100,11 @@ def _ensure_utc(value: Optional[datetime]) -> Optional[datetime]:
     return value.astimezone(timezone.utc)
 
 
-@router.get("/", response_model=List[MedReminderResponse])
-async def list_reminders(
-    recipient_id: str = Query(...),
-    include_disabled: bool = Query(False),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+def _list_reminders(
+    db: Session,
+    recipient_id: str,
+    include_disabled: bool,
+    current_user: User
 ):
     ensure_recipient_access(db, current_user, recipient_id)
     query = db.query(MedicationReminder).options(joinedload(MedicationReminder.medication))
@@ -115,11 +115,20 @@ async def list_reminders(
     return [_to_response(reminder) for reminder in reminders]
 
 
-@router.post("/", response_model=MedReminderResponse, status_code=status.HTTP_201_CREATED)
-async def create_reminder(
+@router.get("/", response_model=List[MedReminderResponse])
+async def list_reminders(
+    recipient_id: str = Query(...),
+    include_disabled: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await db.run_sync(_list_reminders, recipient_id, include_disabled, current_user)
+
+
+def _create_reminder(
+    db: Session,
     payload: MedReminderCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_admin)
+    current_user: User
 ):
     ensure_recipient_access(db, current_user, payload.recipient_id)
     existing = db.query(MedicationReminder).filter(
@@ -155,12 +164,20 @@ async def create_reminder(
     return _to_response(reminder)
 
 
-@router.patch("/{reminder_id}", response_model=MedReminderResponse)
-async def update_reminder(
+@router.post("/", response_model=MedReminderResponse, status_code=status.HTTP_201_CREATED)
+async def create_reminder(
+    payload: MedReminderCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_admin)
+):
+    return await db.run_sync(_create_reminder, payload, current_user)
+
+
+def _update_reminder(
+    db: Session,
     reminder_id: UUID,
     updates: MedReminderUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_admin)
+    current_user: User
 ):
     reminder = db.query(MedicationReminder).filter(MedicationReminder.id == reminder_id).first()
     if not reminder:
@@ -180,13 +197,21 @@ async def update_reminder(
     return _to_response(reminder)
 
 
-@router.post("/{reminder_id}/skip", response_model=MedReminderResponse)
-async def skip_reminder(
+@router.patch("/{reminder_id}", response_model=MedReminderResponse)
+async def update_reminder(
     reminder_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    updates: MedReminderUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_admin)
+):
+    return await db.run_sync(_update_reminder, reminder_id, updates, current_user)
+
+
+def _skip_reminder(
+    db: Session,
+    reminder_id: UUID,
+    current_user: User
 ):
-    require_write_access(current_user)
     reminder = db.query(MedicationReminder).filter(MedicationReminder.id == reminder_id).first()
     if not reminder:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reminder not found")
@@ -199,13 +224,22 @@ async def skip_reminder(
     return _to_response(reminder)
 
 
-@router.post("/{reminder_id}/log", response_model=MedReminderResponse)
-async def log_dose(
+@router.post("/{reminder_id}/skip", response_model=MedReminderResponse)
+async def skip_reminder(
     reminder_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     require_write_access(current_user)
+
+    return await db.run_sync(_skip_reminder, reminder_id, current_user)
+
+
+def _log_dose(
+    db: Session,
+    reminder_id: UUID,
+    current_user: User
+):
     reminder = db.query(MedicationReminder).filter(MedicationReminder.id == reminder_id).first()
     if not reminder:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reminder not found")
@@ -218,12 +252,22 @@ async def log_dose(
     return _to_response(reminder)
 
 
-@router.get("/next", response_model=List[MedReminderNextResponse])
-async def next_reminders(
-    recipient_id: str = Query(...),
-    limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
+@router.post("/{reminder_id}/log", response_model=MedReminderResponse)
+async def log_dose(
+    reminder_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
+):
+    require_write_access(current_user)
+
+    return await db.run_sync(_log_dose, reminder_id, current_user)
+
+
+def _next_reminders(
+    db: Session,
+    recipient_id: str,
+    limit: int,
+    current_user: User
 ):
     ensure_recipient_access(db, current_user, recipient_id)
     reminders = db.query(MedicationReminder).options(joinedload(MedicationReminder.medication)).filter(
@@ -256,11 +300,20 @@ async def next_reminders(
     return results[:limit]
 
 
-@router.post("/check-early", response_model=MedEarlyCheckResponse)
-async def check_early(
-    payload: MedEarlyCheckRequest,
-    db: Session = Depends(get_db),
+@router.get("/next", response_model=List[MedReminderNextResponse])
+async def next_reminders(
+    recipient_id: str = Query(...),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
+):
+    return await db.run_sync(_next_reminders, recipient_id, limit, current_user)
+
+
+def _check_early(
+    db: Session,
+    payload: MedEarlyCheckRequest,
+    current_user: User
 ):
     ensure_recipient_access(db, current_user, payload.recipient_id)
     medication = get_medication_by_name(db, payload.med_name, payload.recipient_id)
@@ -281,3 +334,12 @@ async def check_early(
         minutes_until_due=status.get("minutes_until_due"),
         warning_level=status.get("warning_level")
     )
+
+
+@router.post("/check-early", response_model=MedEarlyCheckResponse)
+async def check_early(
+    payload: MedEarlyCheckRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await db.run_sync(_check_early, payload, current_user)
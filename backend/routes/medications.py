@@ -9,9 +9,10 @@ from database import get_db
 from models.medication import Medication
 from models.user import User
 from routes.auth import get_current_user, get_current_active_admin
-from routes.stream import broadcast_event
+from routes.stream import stage_broadcast
 from models.med_reminder import MedicationReminder
 from services.access_control import get_allowed_recipient_ids
+from services.utils import FastJSONResponse
 
 router = APIRouter(redirect_slashes=False)
 
@@ -104,7 +105,23 @@ async def list_medications(
             )
         if not allowed:
             return []
-    query = db.query(Medication)
+    query = db.query(
+        Medication.id,
+        Medication.name,
+        Medication.default_dose,
+        Medication.dose_unit,
+        Medication.default_route,
+        Medication.interval_hours,
+        Medication.early_warning_minutes,
+        Medication.notes,
+        Medication.is_prn,
+        Medication.is_active,
+        Medication.auto_start_reminder,
+        Medication.is_quick_med,
+        Medication.recipient_id,
+        Medication.created_at,
+        Medication.updated_at
+    )
     if not include_inactive:
         query = query.filter(Medication.is_active.is_(True))
     if quick_only:
@@ -117,8 +134,8 @@ async def list_medications(
         query = query.filter(
             (Medication.recipient_id.in_(allowed)) | (Medication.recipient_id.is_(None))
         )
-    meds = query.order_by(Medication.name.asc()).all()
-    return [_to_response(med) for med in meds]
+    rows = query.order_by(Medication.name.asc()).all()
+    return FastJSONResponse([row._asdict() for row in rows], naive_utc=False)
 
 
 @router.post("/", response_model=MedicationResponse, status_code=status.HTTP_201_CREATED)
@@ -188,10 +205,10 @@ async def delete_medication(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Medication not found")
     db.query(MedicationReminder).filter(MedicationReminder.medication_id == med_id).delete(synchronize_session=False)
     db.delete(med)
-    db.commit()
-    await broadcast_event({
+    stage_broadcast(db, {
         "type": "med.deleted",
         "id": str(med_id),
         "recipient_id": str(med.recipient_id) if med.recipient_id else None
     })
+    db.commit()
     return None
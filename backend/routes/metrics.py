@@ -0,0 +1,66 @@
+import secrets
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+
+from config import get_settings
+from routes.stream import get_stream_metrics
+from services import metrics
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def stream_lines() -> List[str]:
+    """Open stream figures from routes/stream.py, registered as a collector by main.py"""
+    stream_metrics = get_stream_metrics()
+    lines: List[str] = []
+    for name, key, documentation in (
+        ("sse_open_streams", "open_streams", "Event streams and sockets open on this worker"),
+        ("sse_queued_messages", "queued_messages", "Messages waiting in open streams' queues"),
+        ("sse_max_queue_depth", "max_queue_depth", "Deepest open stream queue"),
+        ("sse_streams_behind", "streams_behind", "Open streams that have overflowed their queue"),
+    ):
+        lines.extend(metrics.format_gauge(name, documentation, [({}, stream_metrics[key])]))
+    for name, key, documentation in (
+        ("sse_streams_opened_total", "streams_opened", "Streams opened"),
+        ("sse_streams_closed_total", "streams_closed", "Streams closed"),
+        ("sse_messages_dropped_total", "messages_dropped", "Messages dropped from full stream queues"),
+        ("sse_overflows_total", "overflows", "Times a stream queue overflowed"),
+        ("sse_resyncs_sent_total", "resyncs_sent", "Resync messages sent to streams that fell behind"),
+    ):
+        lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} counter", f"{name} {stream_metrics[key]}"])
+
+    lifetimes = stream_metrics["lifetime_seconds"]
+    name = "sse_stream_lifetime_seconds"
+    lines.extend([f"# HELP {name} How long closed streams stayed open", f"# TYPE {name} histogram"])
+    cumulative = 0
+    for bound, count in lifetimes["buckets"].items():
+        cumulative += count
+        lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+    lines.append(f"{name}_sum {lifetimes['sum']}")
+    lines.append(f"{name}_count {lifetimes['count']}")
+    return lines
+
+
+async def verify_scrape_token(request: Request) -> None:
+    """Require METRICS_SCRAPE_TOKEN as a bearer token; without one configured the endpoint is off"""
+    expected = get_settings().METRICS_SCRAPE_TOKEN
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid scrape token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(verify_scrape_token)])
+async def get_metrics():
+    """Every worker's metrics in the Prometheus text format (scrape token only)"""
+    return PlainTextResponse(metrics.render_workers(), media_type=PROMETHEUS_CONTENT_TYPE)
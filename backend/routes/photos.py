@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from fastapi import APIRouter, Depends, Header, HTTPException, UploadFile, File, Form, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from uuid import UUID
+import hashlib
 
 from database import get_db
 from models.user import User
@@ -17,6 +18,12 @@ from services.image_service import (
     delete_image_from_disk,
 )
 from services.access_control import ensure_recipient_access, require_write_access
+from services.idempotency import (
+    commit_or_replay,
+    find_idempotent_response,
+    request_fingerprint,
+    store_idempotent_response,
+)
 
 router = APIRouter()
 
@@ -59,6 +66,7 @@ def photo_to_response(photo: Photo) -> PhotoResponse:
 async def upload_photo(
     file: UploadFile = File(..., description="Image file to upload"),
     event_id: str = Form(..., description="ID of the event to attach photo to"),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -73,6 +81,9 @@ async def upload_photo(
     - Resized if larger than 2048px
     - Stripped of GPS/location EXIF data for privacy
     - A thumbnail will be generated for list views
+
+    Retrying with the same Idempotency-Key returns the original photo
+    without processing or storing the image again.
     """
     require_write_access(current_user)
 
@@ -104,6 +115,16 @@ async def upload_photo(
     # Read file content
     content = await file.read()
 
+    fingerprint = request_fingerprint(
+        "POST /photos",
+        event_id,
+        file.filename or "",
+        hashlib.sha256(content).hexdigest()
+    )
+    replay = find_idempotent_response(db, current_user.id, idempotency_key, fingerprint)
+    if replay:
+        return replay
+
     # Validate file size
     if not validate_image_size(len(content)):
         raise HTTPException(
@@ -135,10 +156,18 @@ async def upload_photo(
         )
 
         db.add(photo)
-        db.commit()
-        db.refresh(photo)
-
-        return photo_to_response(photo)
+        db.flush()
+
+        response = photo_to_response(photo)
+        store_idempotent_response(db, current_user.id, idempotency_key, fingerprint, status.HTTP_201_CREATED, response)
+        replay = commit_or_replay(db, current_user.id, idempotency_key, fingerprint)
+        if replay:
+            # A concurrent retry stored this photo first; drop our copy
+            delete_image_from_disk(filename)
+            delete_image_from_disk(thumbnail_filename)
+            return replay
+
+        return response
 
     except Exception as e:
         # Clean up any saved files on error
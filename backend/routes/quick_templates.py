@@ -11,6 +11,7 @@ from models.care_recipient import CareRecipient
 from models.user import User
 from routes.auth import get_current_user, get_current_active_admin
 from services.access_control import get_allowed_recipient_ids
+from services.utils import FastJSONResponse
 
 router = APIRouter()
 VALID_FEED_MODES = ["continuous", "bolus", "oral"]
@@ -75,7 +76,18 @@ async def list_quick_medications(
         if not allowed:
             return []
 
-    query = db.query(QuickMedication)
+    query = db.query(
+        QuickMedication.id,
+        QuickMedication.name,
+        QuickMedication.dosage,
+        QuickMedication.route,
+        QuickMedication.is_active,
+        QuickMedication.recipient_id,
+        QuickMedication.created_by_user_id,
+        User.username.label("created_by_name"),
+        QuickMedication.created_at,
+        QuickMedication.updated_at
+    ).outerjoin(User, User.id == QuickMedication.created_by_user_id)
     if not include_inactive:
         query = query.filter(QuickMedication.is_active.is_(True))
     if recipient_id:
@@ -83,23 +95,9 @@ async def list_quick_medications(
     elif allowed is not None:
         query = query.filter(QuickMedication.recipient_id.in_(allowed))
 
-    meds = query.order_by(QuickMedication.created_at.desc()).all()
-
-    return [
-        QuickMedicationResponse(
-            id=str(med.id),
-            name=med.name,
-            dosage=med.dosage,
-            route=med.route,
-            is_active=med.is_active,
-            recipient_id=str(med.recipient_id) if med.recipient_id else None,
-            created_by_user_id=str(med.created_by_user_id),
-            created_by_name=med.created_by.username if med.created_by else None,
-            created_at=med.created_at.isoformat(),
-            updated_at=med.updated_at.isoformat()
-        )
-        for med in meds
-    ]
+    rows = query.order_by(QuickMedication.created_at.desc()).all()
+
+    return FastJSONResponse([row._asdict() for row in rows], naive_utc=False)
 
 
 @router.post("/quick-meds", response_model=QuickMedicationResponse, status_code=status.HTTP_201_CREATED)
@@ -287,7 +285,24 @@ async def list_quick_feeds(
         if not allowed:
             return []
 
-    query = db.query(QuickFeed)
+    query = db.query(
+        QuickFeed.id,
+        QuickFeed.name,
+        QuickFeed.mode,
+        QuickFeed.amount_ml,
+        QuickFeed.duration_min,
+        QuickFeed.formula_type,
+        QuickFeed.rate_ml_hr,
+        QuickFeed.dose_ml,
+        QuickFeed.interval_hr,
+        QuickFeed.oral_notes,
+        QuickFeed.is_active,
+        QuickFeed.recipient_id,
+        QuickFeed.created_by_user_id,
+        User.username.label("created_by_name"),
+        QuickFeed.created_at,
+        QuickFeed.updated_at
+    ).outerjoin(User, User.id == QuickFeed.created_by_user_id)
     if not include_inactive:
         query = query.filter(QuickFeed.is_active.is_(True))
     if recipient_id:
@@ -295,29 +310,9 @@ async def list_quick_feeds(
     elif allowed is not None:
         query = query.filter(QuickFeed.recipient_id.in_(allowed))
 
-    feeds = query.order_by(QuickFeed.created_at.desc()).all()
-
-    return [
-        QuickFeedResponse(
-            id=str(feed.id),
-            name=feed.name,
-            mode=feed.mode,
-            amount_ml=feed.amount_ml,
-            duration_min=feed.duration_min,
-            formula_type=feed.formula_type,
-            rate_ml_hr=feed.rate_ml_hr,
-            dose_ml=feed.dose_ml,
-            interval_hr=feed.interval_hr,
-            oral_notes=feed.oral_notes,
-            is_active=feed.is_active,
-            recipient_id=str(feed.recipient_id) if feed.recipient_id else None,
-            created_by_user_id=str(feed.created_by_user_id),
-            created_by_name=feed.created_by.username if feed.created_by else None,
-            created_at=feed.created_at.isoformat(),
-            updated_at=feed.updated_at.isoformat()
-        )
-        for feed in feeds
-    ]
+    rows = query.order_by(QuickFeed.created_at.desc()).all()
+
+    return FastJSONResponse([row._asdict() for row in rows], naive_utc=False)
 
 
 @router.post("/quick-feeds", response_model=QuickFeedResponse, status_code=status.HTTP_201_CREATED)
@@ -9,6 +9,7 @@ from models.care_recipient import CareRecipient
 from models.user import User
 from routes.auth import get_current_user, get_current_active_admin
 from services.access_control import get_allowed_recipient_ids
+from services.utils import FastJSONResponse
 
 router = APIRouter()
 
@@ -54,7 +55,16 @@ async def list_recipients(
             detail="Admin privileges required to view inactive recipients"
         )
 
-    query = db.query(CareRecipient)
+    query = db.query(
+        CareRecipient.id,
+        CareRecipient.name,
+        CareRecipient.is_active,
+        CareRecipient.enabled_categories,
+        CareRecipient.created_by_user_id,
+        User.username.label("created_by_name"),
+        CareRecipient.created_at,
+        CareRecipient.updated_at
+    ).outerjoin(User, User.id == CareRecipient.created_by_user_id)
     if not include_inactive:
         query = query.filter(CareRecipient.is_active.is_(True))
 
@@ -64,21 +74,14 @@ async def list_recipients(
             return []
         query = query.filter(CareRecipient.id.in_(allowed))
 
-    recipients = query.order_by(CareRecipient.created_at.asc()).all()
-
-    return [
-        RecipientResponse(
-            id=str(recipient.id),
-            name=recipient.name,
-            is_active=recipient.is_active,
-            enabled_categories=recipient.enabled_categories or ALLOWED_CATEGORIES,
-            created_by_user_id=str(recipient.created_by_user_id),
-            created_by_name=recipient.created_by.username if recipient.created_by else None,
-            created_at=recipient.created_at.isoformat(),
-            updated_at=recipient.updated_at.isoformat()
-        )
-        for recipient in recipients
-    ]
+    rows = query.order_by(CareRecipient.created_at.asc()).all()
+
+    recipients = []
+    for row in rows:
+        data = row._asdict()
+        data["enabled_categories"] = data["enabled_categories"] or ALLOWED_CATEGORIES
+        recipients.append(data)
+    return FastJSONResponse(recipients, naive_utc=False)
 
 
 @router.post("/recipients", response_model=RecipientResponse, status_code=status.HTTP_201_CREATED)
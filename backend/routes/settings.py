@@ -4,9 +4,10 @@ from pydantic import BaseModel, Field
 import json
 
 from database import get_db
-from models.app_setting import AppSetting
 from models.user import User
 from routes.auth import get_current_user, get_current_active_admin
+from services.app_settings import get_setting, set_json_setting, set_setting
+from services.event_stats import set_counts_timezone
 
 router = APIRouter()
 
@@ -43,8 +44,7 @@ async def get_timezone(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    setting = db.query(AppSetting).filter(AppSetting.key == TIMEZONE_KEY).first()
-    return TimezoneResponse(timezone=setting.value if setting else "local")
+    return TimezoneResponse(timezone=get_setting(db, TIMEZONE_KEY, default="local"))
 
 
 @router.put("/settings/timezone", response_model=TimezoneResponse)
@@ -60,28 +60,16 @@ async def update_timezone(
             detail="Timezone is required"
         )
 
-    setting = db.query(AppSetting).filter(AppSetting.key == TIMEZONE_KEY).first()
-    if setting:
-        setting.value = value
-    else:
-        setting = AppSetting(key=TIMEZONE_KEY, value=value)
-        db.add(setting)
-
+    set_setting(db, TIMEZONE_KEY, value)
+    # Daily event counters are bucketed in this timezone
+    set_counts_timezone(db, value)
     db.commit()
-    db.refresh(setting)
 
-    return TimezoneResponse(timezone=setting.value)
+    return TimezoneResponse(timezone=value)
 
 
-def _get_notification_settings(setting: AppSetting) -> NotificationSettings:
-    defaults = NotificationSettings()
-    if not setting:
-        return defaults
-    try:
-        payload = json.loads(setting.value)
-        return NotificationSettings(**payload)
-    except (json.JSONDecodeError, ValueError, TypeError):
-        return defaults
+def _decode_notification_settings(value: str) -> NotificationSettings:
+    return NotificationSettings(**json.loads(value))
 
 
 @router.get("/settings/notifications", response_model=NotificationSettings)
@@ -89,8 +77,7 @@ async def get_notification_settings(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    setting = db.query(AppSetting).filter(AppSetting.key == NOTIFICATIONS_KEY).first()
-    return _get_notification_settings(setting)
+    return get_setting(db, NOTIFICATIONS_KEY, _decode_notification_settings, NotificationSettings())
 
 
 @router.put("/settings/notifications", response_model=NotificationSettings)
@@ -99,15 +86,7 @@ async def update_notification_settings(
     db: Session = Depends(get_db),
     current_admin: User = Depends(get_current_active_admin)
 ):
-    serialized = json.dumps(payload.model_dump())
-    setting = db.query(AppSetting).filter(AppSetting.key == NOTIFICATIONS_KEY).first()
-    if setting:
-        setting.value = serialized
-    else:
-        setting = AppSetting(key=NOTIFICATIONS_KEY, value=serialized)
-        db.add(setting)
-
+    set_json_setting(db, NOTIFICATIONS_KEY, payload.model_dump())
     db.commit()
-    db.refresh(setting)
 
-    return _get_notification_settings(setting)
+    return NotificationSettings(**payload.model_dump())
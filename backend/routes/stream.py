@@ -1,104 +1,619 @@
 import asyncio
 import json
-from typing import Dict, Any, Optional, Set
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional, Set, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Query, WebSocket, WebSocketDisconnect, status
 from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from database import get_db
+from config import get_settings
+from database import AsyncSessionLocal
 from models.user import User
-from routes.auth import get_token_from_request
+from routes.auth import get_current_active_admin, get_token_from_request
 from services.auth_service import decode_token, verify_token_type
 from services import pubsub
-from services.access_control import get_allowed_recipient_ids
+from services.access_control import ACCESS_CHANGED_EVENT, USER_CHANGED_EVENT, get_allowed_recipient_ids
+from services.app_settings import SETTINGS_CHANGED_EVENT
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+RESYNC_EVENT = pubsub.RESYNC_EVENT
+# Delivered only to the named user's streams
+USER_EVENTS = (ACCESS_CHANGED_EVENT, USER_CHANGED_EVENT)
+# For workers' caches; never delivered to streams
+WORKER_EVENTS = (SETTINGS_CHANGED_EVENT,)
+OVERFLOW_POLICIES = ("resync", "drop_oldest")
+# Upper bounds, in seconds, of the connection lifetime histogram
+LIFETIME_BUCKETS = (10, 60, 300, 1800, 3600, 4 * 3600, 24 * 3600)
+
+# (stream_id, message) as delivered to subscriber queues
+StreamMessage = Tuple[Optional[int], Dict[str, Any]]
+
+# Every open stream; messages without a recipient go to all of them
 _subscribers: Set[asyncio.Queue] = set()
+# Admin streams, which see every recipient
+_all_recipient_subscribers: Set[asyncio.Queue] = set()
+# Non-admin streams keyed by each recipient they may see
+_recipient_subscribers: Dict[str, Set[asyncio.Queue]] = {}
+# Streams keyed by user, for access.changed messages
+_user_subscribers: Dict[str, Set[asyncio.Queue]] = {}
+# What each queue is registered under: (user_id, allowed recipient IDs or None)
+_registrations: Dict[asyncio.Queue, Tuple[str, Optional[List[str]]]] = {}
+# Recent messages in arrival order, for Last-Event-ID replay. Every worker
+# receives every notification in the same order, so any worker can replay.
+_replay_buffer: Deque[StreamMessage] = deque(maxlen=get_settings().SSE_REPLAY_BUFFER_SIZE)
 _lock = asyncio.Lock()
 
 
+class StreamStats:
+    """Delivery counters for one open stream."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.connected_at = time.monotonic()
+        self.delivered = 0
+        self.dropped = 0
+        self.resyncs = 0
+        self.max_depth = 0
+        # Set when messages were dropped and the client has not been told yet
+        self.fell_behind = False
+
+
+# Counters for each open stream, kept across re-registration
+_stream_stats: Dict[asyncio.Queue, StreamStats] = {}
+# Totals for this worker since it started, open and closed streams alike
+_totals: Dict[str, float] = {
+    "opened": 0,
+    "closed": 0,
+    "dropped": 0,
+    "overflows": 0,
+    "resyncs": 0,
+    "lifetime_seconds_sum": 0.0,
+}
+# Closed streams per LIFETIME_BUCKETS bound, plus one for longer lifetimes
+_lifetime_counts: List[int] = [0] * (len(LIFETIME_BUCKETS) + 1)
+
+
+def _add_to_index(index: Dict[str, Set[asyncio.Queue]], key: str, queue: asyncio.Queue) -> None:
+    index.setdefault(key, set()).add(queue)
+
+
+def _remove_from_index(index: Dict[str, Set[asyncio.Queue]], key: str, queue: asyncio.Queue) -> None:
+    queues = index.get(key)
+    if queues is None:
+        return
+    queues.discard(queue)
+    if not queues:
+        del index[key]
+
+
+def _unregister_locked(queue: asyncio.Queue) -> None:
+    registration = _registrations.pop(queue, None)
+    if registration is None:
+        return
+    user_id, allowed = registration
+    _subscribers.discard(queue)
+    _remove_from_index(_user_subscribers, user_id, queue)
+    if allowed is None:
+        _all_recipient_subscribers.discard(queue)
+    else:
+        for recipient_id in allowed:
+            _remove_from_index(_recipient_subscribers, recipient_id, queue)
+
+
+def _is_visible(message: Dict[str, Any], user_id: str, allowed: Optional[List[str]]) -> bool:
+    """Whether a stream would have received message; mirrors the indexes used by local_broadcast."""
+    if message.get("type") in USER_EVENTS:
+        return message.get("user_id") == user_id
+    recipient_id = message.get("recipient_id")
+    return not recipient_id or allowed is None or recipient_id in allowed
+
+
+def _replay_after_locked(
+    last_event_id: str,
+    user_id: str,
+    allowed: Optional[List[str]]
+) -> Optional[List[StreamMessage]]:
+    """Messages after last_event_id visible to the stream, or None if it is no longer buffered."""
+    try:
+        last_id = int(last_event_id)
+    except ValueError:
+        return None
+
+    buffered = list(_replay_buffer)
+    for index, (stream_id, _) in enumerate(buffered):
+        if stream_id == last_id:
+            return [item for item in buffered[index + 1:] if _is_visible(item[1], user_id, allowed)]
+    return None
+
+
+async def register_subscriber(
+    queue: asyncio.Queue,
+    user_id: str,
+    allowed: Optional[List[str]],
+    last_event_id: Optional[str] = None
+) -> Optional[List[StreamMessage]]:
+    """
+    Index a stream by user and by the recipients it may see. Re-registering replaces the old entry.
+
+    With last_event_id, also returns the buffered messages the stream missed,
+    or None when they are no longer buffered and the client must resync.
+    Registration and the buffer snapshot happen under one lock, so nothing is
+    both replayed and queued, and nothing falls between them.
+    """
+    async with _lock:
+        _unregister_locked(queue)
+        if queue not in _stream_stats:
+            _stream_stats[queue] = StreamStats(user_id)
+            _totals["opened"] += 1
+        _registrations[queue] = (user_id, allowed)
+        _subscribers.add(queue)
+        _add_to_index(_user_subscribers, user_id, queue)
+        if allowed is None:
+            _all_recipient_subscribers.add(queue)
+        else:
+            for recipient_id in allowed:
+                _add_to_index(_recipient_subscribers, recipient_id, queue)
+
+        if not last_event_id:
+            return []
+        return _replay_after_locked(last_event_id, user_id, allowed)
+
+
+async def unregister_subscriber(queue: asyncio.Queue) -> None:
+    async with _lock:
+        _unregister_locked(queue)
+        stats = _stream_stats.pop(queue, None)
+    if stats is not None:
+        _record_closed(stats)
+
+
+def _record_closed(stats: StreamStats) -> None:
+    lifetime = time.monotonic() - stats.connected_at
+    _totals["closed"] += 1
+    _totals["lifetime_seconds_sum"] += lifetime
+    for index, bound in enumerate(LIFETIME_BUCKETS):
+        if lifetime <= bound:
+            _lifetime_counts[index] += 1
+            break
+    else:
+        _lifetime_counts[-1] += 1
+
+    if stats.dropped:
+        logger.info(
+            f"SSE stream for user {stats.user_id} closed after {lifetime:.0f}s; "
+            f"dropped {stats.dropped} of {stats.delivered + stats.dropped} messages, "
+            f"resynced {stats.resyncs} times, peak queue {stats.max_depth}"
+        )
+
+
+def get_stream_stats(queue: asyncio.Queue) -> Optional[StreamStats]:
+    return _stream_stats.get(queue)
+
+
+def _evict(pending: List[StreamMessage], room: int, policy: str) -> List[StreamMessage]:
+    """
+    What stays of pending, a full queue's messages and then the new one, to fit room.
+
+    access.changed and user.changed always stay: a stream reloads its
+    user's access only when it takes access.changed from its queue, so
+    losing one would leave it delivering recipients the user can no longer
+    see. Earlier copies of one are let go instead, since each says only
+    that its user changed.
+    """
+    droppable = [
+        index for index, (_, message) in enumerate(pending[:-1])
+        if message.get("type") not in USER_EVENTS
+    ]
+    if policy == "drop_oldest":
+        droppable = droppable[:1]
+    dropped = set(droppable)
+
+    if len(pending) - len(dropped) > room:
+        seen = set()
+        for index in range(len(pending) - 1, -1, -1):
+            event_type = pending[index][1].get("type")
+            if event_type in USER_EVENTS:
+                if event_type in seen:
+                    dropped.add(index)
+                seen.add(event_type)
+    kept = [item for index, item in enumerate(pending) if index not in dropped]
+    # Only a queue too small for both user events gets here
+    return kept[len(kept) - room:] if len(kept) > room else kept
+
+
+def _enqueue(queue: asyncio.Queue, item: StreamMessage) -> None:
+    """
+    Queue item for a stream, making room if the stream has fallen behind.
+
+    A full queue means the client is not reading fast enough. Under the
+    "resync" policy everything queued is discarded, since the client will
+    reload anyway; under "drop_oldest" only the oldest message goes.
+    access.changed and user.changed are kept either way (see _evict), and
+    the stream is marked so it tells the client to resync.
+    """
+    stats = _stream_stats.get(queue)
+    try:
+        queue.put_nowait(item)
+    except asyncio.QueueFull:
+        pending = []
+        while not queue.empty():
+            pending.append(queue.get_nowait())
+        pending.append(item)
+        kept = _evict(pending, queue.maxsize, get_settings().SSE_QUEUE_OVERFLOW)
+        for kept_item in kept:
+            queue.put_nowait(kept_item)
+        dropped = len(pending) - len(kept)
+        _totals["dropped"] += dropped
+        _totals["overflows"] += 1
+        if stats is not None:
+            if not stats.fell_behind:
+                logger.warning(f"SSE stream for user {stats.user_id} fell behind; dropping queued messages")
+            stats.dropped += dropped
+            stats.fell_behind = True
+
+    if stats is not None and queue.qsize() > stats.max_depth:
+        stats.max_depth = queue.qsize()
+
+
+def _take_overflow_notice(stats: StreamStats) -> Optional[Dict[str, Any]]:
+    """The resync message owed to a stream that fell behind, if any. Call before sending its next message."""
+    if not stats.fell_behind:
+        return None
+    stats.fell_behind = False
+    stats.resyncs += 1
+    _totals["resyncs"] += 1
+    return {"type": RESYNC_EVENT, "reason": "overflow", "dropped": stats.dropped}
+
+
+def get_stream_metrics() -> Dict[str, Any]:
+    """
+    Queue depth, drop and connection lifetime figures for this worker's streams.
+
+    Totals cover every stream since the worker started; the rest describe
+    the streams open now.
+    """
+    open_stats = list(_stream_stats.items())
+    depths = [queue.qsize() for queue, _ in open_stats]
+    now = time.monotonic()
+    return {
+        "queue_size": get_settings().SSE_QUEUE_SIZE,
+        "overflow_policy": get_settings().SSE_QUEUE_OVERFLOW,
+        "open_streams": len(open_stats),
+        "queued_messages": sum(depths),
+        "max_queue_depth": max(depths, default=0),
+        "streams_behind": sum(1 for _, stats in open_stats if stats.fell_behind),
+        "streams_opened": int(_totals["opened"]),
+        "streams_closed": int(_totals["closed"]),
+        "messages_dropped": int(_totals["dropped"]),
+        "overflows": int(_totals["overflows"]),
+        "resyncs_sent": int(_totals["resyncs"]),
+        "lifetime_seconds": {
+            "buckets": {
+                **{str(bound): count for bound, count in zip(LIFETIME_BUCKETS, _lifetime_counts)},
+                "+Inf": _lifetime_counts[-1],
+            },
+            "sum": round(_totals["lifetime_seconds_sum"], 3),
+            "count": int(_totals["closed"]),
+        },
+        "streams": [
+            {
+                "user_id": stats.user_id,
+                "connected_seconds": round(now - stats.connected_at, 1),
+                "queued": queue.qsize(),
+                "max_queued": stats.max_depth,
+                "delivered": stats.delivered,
+                "dropped": stats.dropped,
+                "resyncs": stats.resyncs,
+            }
+            for queue, stats in open_stats
+        ],
+    }
+
+
 async def local_broadcast(payload: Dict[str, Any]) -> None:
-    """Broadcast to this worker's local SSE subscribers only."""
+    """
+    Broadcast to this worker's local SSE subscribers only.
+
+    Only queues that will deliver the message are touched: the target
+    user's streams for access.changed and user.changed, admin streams
+    plus streams allowed the recipient for recipient messages, and every
+    stream otherwise. Messages meant only for workers' caches are skipped.
+    """
+    if payload.get("type") in WORKER_EVENTS:
+        return
+    stream_id = payload.get(pubsub.STREAM_ID_KEY)
+    message = {key: value for key, value in payload.items() if key != pubsub.STREAM_ID_KEY}
+    item: StreamMessage = (stream_id, message)
+
     async with _lock:
-        queues = list(_subscribers)
+        if stream_id is not None:
+            _replay_buffer.append(item)
+        elif message.get("type") == RESYNC_EVENT:
+            # Messages may be missing, so the buffer can no longer replay
+            # across this point
+            _replay_buffer.clear()
+        if message.get("type") in USER_EVENTS:
+            queues = list(_user_subscribers.get(message.get("user_id"), ()))
+        elif message.get("recipient_id"):
+            queues = list(_all_recipient_subscribers)
+            queues.extend(_recipient_subscribers.get(message["recipient_id"], ()))
+        else:
+            queues = list(_subscribers)
 
     for queue in queues:
-        try:
-            queue.put_nowait(payload)
-        except asyncio.QueueFull:
-            pass
+        _enqueue(queue, item)
 
 
-async def _get_current_user_from_stream(
-    request: Request,
-    db: Session,
-    token: Optional[str]
-) -> User:
-    if not token:
-        token = await get_token_from_request(request)
+def format_sse(stream_id: Optional[int], message: Dict[str, Any]) -> str:
+    if stream_id is None:
+        return f"data: {json.dumps(message)}\n\n"
+    return f"id: {stream_id}\ndata: {json.dumps(message)}\n\n"
+
 
-    payload = decode_token(token)
+def _user_id_from_token(token: Optional[str]) -> Optional[str]:
+    payload = decode_token(token) if token else None
     if payload is None or not verify_token_type(payload, "access"):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials"
-        )
+        return None
+    return payload.get("sub") or None
+
+
+async def _get_user_id_from_stream(request: Request, token: Optional[str]) -> str:
+    if not token:
+        token = await get_token_from_request(request)
 
-    user_id = payload.get("sub")
+    user_id = _user_id_from_token(token)
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
+    return user_id
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user or not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User account is inactive"
-        )
 
-    return user
+async def _load_stream_access(user_id: str) -> Tuple[bool, Optional[List[str]]]:
+    """
+    Return (is_active, allowed recipient IDs) for a stream's user.
 
+    Uses its own short-lived session so no pooled connection is held while
+    the stream is open.
+    """
+    async with AsyncSessionLocal() as db:
+        user = await db.scalar(select(User).where(User.id == user_id))
+        if not user or not user.is_active:
+            return False, []
+        return True, await db.run_sync(get_allowed_recipient_ids, user)
 
-async def broadcast_event(payload: Dict[str, Any]) -> None:
-    """Publish event to all workers via PostgreSQL NOTIFY."""
-    await pubsub.publish(payload)
+
+def stage_broadcast(db: Session, payload: Dict[str, Any]) -> None:
+    """Stage event for all workers; it is sent when db commits. Call right before committing."""
+    pubsub.stage_publish(db, payload)
 
 
 @router.get("/stream")
 async def stream_events(
     request: Request,
     token: Optional[str] = Query(default=None),
-    db: Session = Depends(get_db)
+    last_event_id: Optional[str] = Query(default=None, description="Resume after this message id"),
+    last_event_id_header: Optional[str] = Header(default=None, alias="Last-Event-ID")
 ):
-    current_user = await _get_current_user_from_stream(request, db, token)
-    allowed = get_allowed_recipient_ids(db, current_user)
+    """
+    Server-sent events for changes visible to the current user
 
-    queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+    Access is checked once up front with a short-lived session. If the
+    user's role or recipient access changes, an access.changed message
+    arrives over pub/sub and the stream reloads it, closing if the user was
+    deactivated or deleted.
 
-    async with _lock:
-        _subscribers.add(queue)
+    Each message carries an id. A reconnect with Last-Event-ID (or the
+    last_event_id query param) first receives the messages it missed. If
+    those are no longer buffered, it gets a stream.resync message instead
+    and should reload its data. A client that reads too slowly for its
+    queue to keep up also gets stream.resync, with reason "overflow".
+    """
+    user_id = await _get_user_id_from_stream(request, token)
+    is_active, allowed = await _load_stream_access(user_id)
+    if not is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive"
+        )
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=get_settings().SSE_QUEUE_SIZE)
+    replay = await register_subscriber(queue, user_id, allowed, last_event_id_header or last_event_id)
+    stats = get_stream_stats(queue)
 
     async def event_generator():
         try:
+            if replay is None:
+                yield format_sse(None, {"type": RESYNC_EVENT})
+            else:
+                for stream_id, message in replay:
+                    yield format_sse(stream_id, message)
+
             while True:
                 if await request.is_disconnected():
                     break
 
                 try:
-                    message = await asyncio.wait_for(queue.get(), timeout=15)
-                    if allowed is not None:
-                        recipient_id = message.get("recipient_id")
-                        if recipient_id and recipient_id not in allowed:
-                            continue
-                    yield f"data: {json.dumps(message)}\n\n"
+                    stream_id, message = await asyncio.wait_for(queue.get(), timeout=15)
+                    notice = _take_overflow_notice(stats)
+                    if notice:
+                        yield format_sse(None, notice)
+                    stats.delivered += 1
+                    if message.get("type") == ACCESS_CHANGED_EVENT:
+                        is_active, new_allowed = await _load_stream_access(user_id)
+                        yield format_sse(stream_id, message)
+                        if not is_active:
+                            break
+                        await register_subscriber(queue, user_id, new_allowed)
+                        continue
+                    yield format_sse(stream_id, message)
                 except asyncio.TimeoutError:
                     yield ": keepalive\n\n"
         finally:
-            async with _lock:
-                _subscribers.discard(queue)
+            await unregister_subscriber(queue)
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
+def _socket_token(websocket: WebSocket, token: Optional[str]) -> Optional[str]:
+    """Token from the query string, Authorization header or access_token cookie, in that order."""
+    if token:
+        return token
+    auth_header = websocket.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        return auth_header.split(" ")[1]
+    return websocket.cookies.get("access_token")
+
+
+def _split_permitted(
+    recipient_ids: List[str],
+    allowed: Optional[List[str]]
+) -> Tuple[List[str], List[str]]:
+    """Split recipient_ids into (those the user may see, the rest)."""
+    if allowed is None:
+        return list(recipient_ids), []
+    permitted = [recipient_id for recipient_id in recipient_ids if recipient_id in allowed]
+    return permitted, [recipient_id for recipient_id in recipient_ids if recipient_id not in allowed]
+
+
+def _parse_socket_command(text: str) -> Optional[Tuple[str, List[str]]]:
+    """(type, recipient_ids) from a subscribe or unsubscribe frame, or None if it is not one."""
+    try:
+        command = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(command, dict) or command.get("type") not in ("subscribe", "unsubscribe"):
+        return None
+    recipient_ids = command.get("recipient_ids")
+    if not isinstance(recipient_ids, list) or not all(isinstance(item, str) for item in recipient_ids):
+        return None
+    return command["type"], recipient_ids
+
+
+@router.websocket("/ws")
+async def stream_socket(
+    websocket: WebSocket,
+    token: Optional[str] = Query(default=None),
+    last_event_id: Optional[str] = Query(default=None),
+    recipient_id: List[str] = Query(default=[])
+):
+    """
+    The same messages as /stream, over a WebSocket, for chosen recipients only
+
+    The connection starts subscribed to the recipient_id query params and
+    changes with frames from the client:
+
+        {"type": "subscribe", "recipient_ids": ["..."]}
+        {"type": "unsubscribe", "recipient_ids": ["..."]}
+
+    Each change is answered with {"type": "subscribed", "recipient_ids": [...],
+    "denied": [...]}, listing the current subscriptions and any recipients
+    the user may not see. Messages without a recipient, and access.changed,
+    arrive regardless. Subscribing does not replay earlier messages for the
+    recipient; clients load its data when they switch to it.
+
+    Messages are JSON text frames with the stream id in stream_id, and
+    last_event_id resumes after one as on /stream. The server offers
+    permessage-deflate (uvicorn's websockets implementation does by
+    default), so browsers compress every frame.
+    """
+    user_id = _user_id_from_token(_socket_token(websocket, token))
+    if not user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    is_active, allowed = await _load_stream_access(user_id)
+    if not is_active:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    subscribed, denied = _split_permitted(recipient_id, allowed)
+    subscribed = set(subscribed)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=get_settings().SSE_QUEUE_SIZE)
+    replay = await register_subscriber(queue, user_id, sorted(subscribed), last_event_id)
+    stats = get_stream_stats(queue)
+
+    async def send(stream_id: Optional[int], message: Dict[str, Any]) -> None:
+        frame = dict(message)
+        if stream_id is not None:
+            frame[pubsub.STREAM_ID_KEY] = stream_id
+        await websocket.send_text(json.dumps(frame))
+
+    async def send_subscriptions(denied: List[str]) -> None:
+        await send(None, {"type": "subscribed", "recipient_ids": sorted(subscribed), "denied": denied})
+
+    # One loop does all the sending, so frames never interleave
+    receive_task = asyncio.ensure_future(websocket.receive())
+    get_task = asyncio.ensure_future(queue.get())
+    try:
+        await send_subscriptions(denied)
+        if replay is None:
+            await send(None, {"type": RESYNC_EVENT})
+        else:
+            for stream_id, message in replay:
+                await send(stream_id, message)
+
+        while True:
+            done, _ = await asyncio.wait({receive_task, get_task}, return_when=asyncio.FIRST_COMPLETED)
+
+            if get_task in done:
+                stream_id, message = get_task.result()
+                get_task = asyncio.ensure_future(queue.get())
+                notice = _take_overflow_notice(stats)
+                if notice:
+                    await send(None, notice)
+                stats.delivered += 1
+                if message.get("type") == ACCESS_CHANGED_EVENT:
+                    is_active, allowed = await _load_stream_access(user_id)
+                    await send(stream_id, message)
+                    if not is_active:
+                        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                        break
+                    still_allowed, revoked = _split_permitted(sorted(subscribed), allowed)
+                    subscribed = set(still_allowed)
+                    await register_subscriber(queue, user_id, sorted(subscribed))
+                    if revoked:
+                        await send_subscriptions(revoked)
+                else:
+                    await send(stream_id, message)
+
+            if receive_task in done:
+                received = receive_task.result()
+                if received["type"] == "websocket.disconnect":
+                    break
+                receive_task = asyncio.ensure_future(websocket.receive())
+                command = _parse_socket_command(received.get("text") or "")
+                if command is None:
+                    await send(None, {
+                        "type": "error",
+                        "detail": "Expected {\"type\": \"subscribe\" or \"unsubscribe\", \"recipient_ids\": [...]}"
+                    })
+                    continue
+                action, recipient_ids = command
+                if action == "subscribe":
+                    permitted, denied = _split_permitted(recipient_ids, allowed)
+                    subscribed.update(permitted)
+                else:
+                    denied = []
+                    subscribed.difference_update(recipient_ids)
+                await register_subscriber(queue, user_id, sorted(subscribed))
+                await send_subscriptions(denied)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receive_task.cancel()
+        get_task.cancel()
+        await unregister_subscriber(queue)
+
+@router.get("/stream/stats")
+async def stream_stats(current_admin: User = Depends(get_current_active_admin)):
+    """Queue depth, dropped messages and connection lifetimes for this worker's streams (admin only)"""
+    return get_stream_metrics()
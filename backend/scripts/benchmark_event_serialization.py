@@ -0,0 +1,77 @@
+"""Compare the per-row cost of the old and fast event list serialization paths.
+
+Runs against the configured database, using the most recent events:
+
+    python -m scripts.benchmark_event_serialization --limit 200 --rounds 50
+"""
+
+import argparse
+import json
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import desc
+from sqlalchemy.orm import Session, joinedload
+
+from database import SessionLocal
+from models.event import Event
+from routes.events import EventResponse, event_row_query, event_to_response
+from services.utils import FastJSONResponse
+
+RESPONSE_ADAPTER = TypeAdapter(List[EventResponse])
+
+
+def orm_path(db: Session, limit: int) -> bytes:
+    """ORM objects, a Pydantic model per row, response_model validation, json.dumps."""
+    events = db.query(Event).options(
+        joinedload(Event.user),
+        joinedload(Event.recipient)
+    ).order_by(desc(Event.timestamp)).limit(limit).all()
+    content = [event_to_response(event) for event in events]
+    validated = RESPONSE_ADAPTER.validate_python(content, from_attributes=True)
+    return json.dumps(RESPONSE_ADAPTER.dump_python(validated, mode="json")).encode("utf-8")
+
+
+def row_path(db: Session, limit: int) -> bytes:
+    """Column rows, _asdict(), orjson."""
+    rows = event_row_query(db).order_by(desc(Event.timestamp)).limit(limit).all()
+    return FastJSONResponse([row._asdict() for row in rows]).body
+
+
+def measure(db: Session, path, limit: int, rounds: int) -> float:
+    path(db, limit)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        path(db, limit)
+        # Drop identity map state so every round pays the same cost
+        db.expunge_all()
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    db: Session = SessionLocal()
+    try:
+        rows = db.query(Event).count()
+        limit = min(args.limit, rows)
+        if not limit:
+            print("No events to benchmark")
+            return
+
+        before = measure(db, orm_path, limit, args.rounds)
+        after = measure(db, row_path, limit, args.rounds)
+        print(f"{limit} rows per request, {args.rounds} rounds")
+        print(f"  orm + pydantic: {before * 1000:8.2f} ms/request  {before / limit * 1e6:7.1f} us/row")
+        print(f"  rows + orjson:  {after * 1000:8.2f} ms/request  {after / limit * 1e6:7.1f} us/row")
+        print(f"  speedup:        {before / after:8.2f}x")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compare pub/sub publishing throughput: one shared connection, coalesced publish, and publish_many.
+
+Runs against the configured database. Messages go to a separate channel so
+running workers do not receive them, and are deleted from the outbox
+afterwards:
+
+    python -m scripts.benchmark_pubsub_publish --messages 2000 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+import asyncpg
+
+from config import get_settings
+from services.pubsub_postgres import PUBLISH_SQL, PostgresBackend
+
+BENCHMARK_CHANNEL = "sse_events_benchmark"
+
+backend = PostgresBackend(channel=BENCHMARK_CHANNEL)
+
+
+def make_payloads(count: int) -> List[Dict[str, Any]]:
+    return [{"type": "benchmark", "recipient_id": None, "seq": index} for index in range(count)]
+
+
+async def shared_connection_path(payloads: List[Dict[str, Any]], concurrency: int) -> None:
+    """The old path: every publisher waits its turn on one connection."""
+    conn = await asyncpg.connect(get_settings().DATABASE_URL)
+    lock = asyncio.Lock()
+
+    async def publisher(chunk):
+        for payload in chunk:
+            async with lock:
+                await conn.execute(PUBLISH_SQL, [json.dumps(payload)], BENCHMARK_CHANNEL)
+
+    try:
+        await asyncio.gather(*(publisher(payloads[i::concurrency]) for i in range(concurrency)))
+    finally:
+        await conn.close()
+
+
+async def coalesced_path(payloads: List[Dict[str, Any]], concurrency: int) -> None:
+    async def publisher(chunk):
+        for payload in chunk:
+            await backend.publish(payload)
+
+    await asyncio.gather(*(publisher(payloads[i::concurrency]) for i in range(concurrency)))
+
+
+async def batched_path(payloads: List[Dict[str, Any]], batch_size: int) -> None:
+    for start in range(0, len(payloads), batch_size):
+        await backend.publish_many(payloads[start:start + batch_size])
+
+
+async def measure(label: str, path, payloads, arg) -> float:
+    started = time.perf_counter()
+    await path(payloads, arg)
+    elapsed = time.perf_counter() - started
+    rate = len(payloads) / elapsed
+    print(f"  {label:<22} {elapsed * 1000:9.1f} ms  {rate:9.0f} msg/s")
+    return rate
+
+
+async def run(args) -> None:
+    payloads = make_payloads(args.messages)
+    # Warm up the pool so its connect cost is not counted
+    await backend.publish_many(payloads[:1])
+
+    print(f"{args.messages} messages, {args.concurrency} concurrent publishers, batches of {args.batch_size}")
+    before = await measure("shared connection", shared_connection_path, payloads, args.concurrency)
+    coalesced = await measure("publish (coalesced)", coalesced_path, payloads, args.concurrency)
+    batched = await measure("publish_many", batched_path, payloads, args.batch_size)
+    print(f"  coalesced speedup:     {coalesced / before:9.2f}x")
+    print(f"  publish_many speedup:  {batched / before:9.2f}x")
+
+    await backend.stop()
+    conn = await asyncpg.connect(get_settings().DATABASE_URL)
+    try:
+        await conn.execute("DELETE FROM pubsub_outbox WHERE payload::jsonb->>'type' = 'benchmark'")
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compare one worker's request concurrency with blocking and async database sessions.
+
+Runs against the configured database. Each simulated request waits on the
+database for --query-ms (standing in for a slow query or a busy server)
+and then loads a page of events. The blocking path runs the queries on a
+sync Session inside the coroutine, as async handlers did before the async
+engine; the async path awaits them on an AsyncSession. A ticker measures
+how long the event loop stalls meanwhile, which is what open streams feel:
+
+    python -m scripts.benchmark_request_concurrency --requests 400 --concurrency 50 --query-ms 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from sqlalchemy import desc, text
+
+from database import AsyncSessionLocal, SessionLocal, async_engine
+from models.event import Event
+from routes.events import event_row_query
+
+SLEEP_SQL = text("SELECT pg_sleep(:seconds)")
+
+
+async def blocking_request(seconds: float, limit: int) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(SLEEP_SQL, {"seconds": seconds})
+        event_row_query(db).order_by(desc(Event.timestamp)).limit(limit).all()
+    finally:
+        db.close()
+
+
+async def async_request(seconds: float, limit: int) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(SLEEP_SQL, {"seconds": seconds})
+        await db.run_sync(lambda session: event_row_query(session).order_by(desc(Event.timestamp)).limit(limit).all())
+
+
+async def measure(label: str, request, args) -> float:
+    seconds = args.query_ms / 1000
+    latencies: List[float] = []
+    remaining = iter(range(args.requests))
+    stall = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal stall
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stall = max(stall, time.perf_counter() - started - 0.005)
+
+    async def client():
+        for _ in remaining:
+            started = time.perf_counter()
+            await request(seconds, args.limit)
+            latencies.append(time.perf_counter() - started)
+
+    tick_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    running = False
+    await tick_task
+
+    latencies.sort()
+    rate = len(latencies) / elapsed
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"  {label:<9} {rate:8.0f} req/s  p50 {statistics.median(latencies) * 1000:7.1f} ms"
+        f"  p95 {p95 * 1000:7.1f} ms  max loop stall {stall * 1000:7.1f} ms"
+    )
+    return rate
+
+
+async def run(args) -> None:
+    # Warm up both pools so connect cost is not counted
+    await asyncio.gather(*(async_request(0, 1) for _ in range(args.concurrency)))
+    await blocking_request(0, 1)
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent, {args.query_ms} ms database wait each")
+    before = await measure("blocking", blocking_request, args)
+    after = await measure("async", async_request, args)
+    print(f"  speedup:  {after / before:8.2f}x")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--query-ms", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure SSE fan-out from publish to subscriber queues, without a database.
+
+Uses the in-process pub/sub backend and the real stream routing, with a mix
+of admin streams and streams limited to one recipient:
+
+    python -m scripts.benchmark_sse_fanout --streams 500 --recipients 50 --messages 5000
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from routes import stream
+from services import pubsub
+from services.pubsub_memory import InProcessBackend
+
+
+async def run(args) -> None:
+    pubsub.set_backend(InProcessBackend())
+    pubsub.register_handler(stream.local_broadcast)
+    await pubsub.start_listener()
+
+    recipients = [str(uuid.uuid4()) for _ in range(args.recipients)]
+    queues = []
+    for index in range(args.streams):
+        queue: asyncio.Queue = asyncio.Queue()
+        admin = index % 10 == 0
+        allowed = None if admin else [recipients[index % len(recipients)]]
+        await stream.register_subscriber(queue, f"user-{index}", allowed)
+        queues.append(queue)
+
+    payloads = [
+        {"type": "event.created", "id": str(index), "recipient_id": recipients[index % len(recipients)]}
+        for index in range(args.messages)
+    ]
+    done = asyncio.Event()
+
+    async def watch(data):
+        if data.get("id") == payloads[-1]["id"]:
+            done.set()
+
+    pubsub.register_handler(watch)
+    started = time.perf_counter()
+    for start in range(0, len(payloads), args.batch_size):
+        await pubsub.publish_many(payloads[start:start + args.batch_size])
+    await done.wait()
+    elapsed = time.perf_counter() - started
+
+    delivered = sum(queue.qsize() for queue in queues)
+    print(f"{args.messages} messages, {args.streams} streams, {args.recipients} recipients")
+    print(f"  elapsed:     {elapsed * 1000:9.1f} ms")
+    print(f"  messages/s:  {args.messages / elapsed:9.0f}")
+    print(f"  deliveries:  {delivered:9d}  ({delivered / elapsed:.0f}/s)")
+    await pubsub.stop_listener()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=500)
+    parser.add_argument("--recipients", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from services.event_stats import rebuild_event_counts
+
+
+def rebuild():
+    db: Session = SessionLocal()
+    try:
+        rebuild_event_counts(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild()
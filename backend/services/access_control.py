@@ -3,33 +3,80 @@ from typing import List, Optional
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from database import SessionLocal
 from models.user import User
 from models.user_recipient_access import UserRecipientAccess
+from services import identity_cache, pubsub
+from services.identity_cache import ACCESS_CHANGED_EVENT, USER_CHANGED_EVENT
 
 
 def get_allowed_recipient_ids(db: Session, user: User) -> Optional[List[str]]:
     if user.role == "admin":
         return None
-    rows = db.query(UserRecipientAccess).filter(
-        UserRecipientAccess.user_id == user.id
-    ).all()
-    return [str(row.recipient_id) for row in rows]
+    allowed = identity_cache.get_allowed_recipient_ids(user)
+    if allowed is identity_cache.MISSING:
+        loaded_at = identity_cache.generation(user.id)
+        rows = db.query(UserRecipientAccess.recipient_id).filter(
+            UserRecipientAccess.user_id == user.id
+        ).all()
+        allowed = [str(row.recipient_id) for row in rows]
+        identity_cache.store_allowed_recipient_ids(user, allowed, loaded_at)
+    return list(allowed)
 
 
-def ensure_recipient_access(db: Session, user: User, recipient_id: str) -> None:
-    if user.role == "admin":
+def check_recipient_allowed(allowed: Optional[List[str]], recipient_id: str) -> None:
+    """Check a recipient against an already-fetched get_allowed_recipient_ids result."""
+    if allowed is None:
         return
-    allowed = get_allowed_recipient_ids(db, user)
-    if not allowed or recipient_id not in allowed:
+    if recipient_id not in allowed:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have access to this recipient"
         )
 
 
+def ensure_recipient_access(db: Session, user: User, recipient_id: str) -> None:
+    if user.role == "admin":
+        return
+    check_recipient_allowed(get_allowed_recipient_ids(db, user), recipient_id)
+
+
 def require_write_access(user: User) -> None:
     if user.role == "read_only":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Read-only users cannot modify data"
         )
+
+
+def stage_access_changed(db: Session, user_id, authz_version: Optional[int] = None) -> None:
+    """
+    Tell open streams and identity caches that a user's role, status or
+    recipient access changed, with the authz_version it gave them. Caller commits.
+    """
+    identity_cache.mark_changed(db, user_id)
+    payload = {"type": ACCESS_CHANGED_EVENT, "user_id": str(user_id)}
+    if authz_version is not None:
+        payload["authz_version"] = authz_version
+    pubsub.stage_publish(db, payload)
+
+
+def stage_user_changed(db: Session, user_id) -> None:
+    """Tell identity caches that a user's profile or password changed. Caller commits."""
+    identity_cache.mark_changed(db, user_id)
+    pubsub.stage_publish(db, {"type": USER_CHANGED_EVENT, "user_id": str(user_id)})
+
+
+def load_authz_versions() -> None:
+    """
+    Learn every user's authz_version, so this worker trusts current token
+    claims without loading users. Call once pub/sub is listening, so no
+    change falls between the load and the messages announcing it.
+    """
+    loaded_at = identity_cache.generations()
+    db = SessionLocal()
+    try:
+        rows = db.query(User.id, User.authz_version).all()
+    finally:
+        db.close()
+    identity_cache.store_authz_versions({str(row.id): row.authz_version for row in rows}, loaded_at)
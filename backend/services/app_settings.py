@@ -0,0 +1,175 @@
+"""
+Typed, cached access to AppSetting rows.
+
+Settings are stored as text: JSON for structured values, plain strings
+like the timezone otherwise. get_setting reads through a per-worker cache
+holding each key's row version and its decoded values, one per decoder,
+so hot reads (notification config on every scheduler tick, the active
+feed on every feed call, the timezone) are memory lookups.
+
+set_setting bumps the row's version and stages settings.changed over
+pub/sub. Every worker, this one included, drops the key when the message
+arrives, unless it already holds a newer version; a resync clears the
+cache. Entries also expire after APP_SETTINGS_CACHE_TTL_SECONDS, in case
+a message is lost. Reads that decide a write should pass for_update=True,
+which bypasses the cache and locks the row.
+"""
+
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import get_settings
+from models.app_setting import AppSetting
+from services import pubsub
+
+SETTINGS_CHANGED_EVENT = "settings.changed"
+# Keys a session changed, dropped locally once it commits
+CHANGED_INFO_KEY = "app_settings_changed"
+
+# A missing row or a value that does not decode, as distinct from a decoded None
+_ABSENT = object()
+
+
+class _Entry:
+    __slots__ = ("version", "value", "expires_at", "decoded")
+
+    def __init__(self, version: int, value: Any, expires_at: float):
+        self.version = version
+        self.value = value
+        self.expires_at = expires_at
+        self.decoded: Dict[Callable, Any] = {}
+
+
+_entries: Dict[str, _Entry] = {}
+# Bumped per key on invalidation, and _epoch on clear, so a load that raced
+# a change is not cached
+_generations: Dict[str, int] = {}
+_epoch = 0
+# The scheduler reads from its own thread
+_lock = threading.Lock()
+
+
+def decode_json(value: str) -> Any:
+    return json.loads(value)
+
+
+def _decode(entry_value: Any, decode: Optional[Callable[[str], Any]]) -> Any:
+    if entry_value is _ABSENT or decode is None:
+        return entry_value
+    try:
+        return decode(entry_value)
+    except (ValueError, TypeError):
+        return _ABSENT
+
+
+def get_setting(
+    db: Session,
+    key: str,
+    decode: Optional[Callable[[str], Any]] = None,
+    default: Any = None,
+    for_update: bool = False
+) -> Any:
+    """
+    A setting's value passed through decode, or default if it is unset or does not decode.
+
+    Decoded values are shared by every caller, so treat them as read-only.
+    With for_update the row is read from the database and locked, and the
+    result is not cached.
+    """
+    if for_update:
+        setting = db.query(AppSetting).filter(AppSetting.key == key).with_for_update().first()
+        value = _decode(setting.value if setting else _ABSENT, decode)
+        return default if value is _ABSENT else value
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            if decode in entry.decoded:
+                value = entry.decoded[decode]
+                return default if value is _ABSENT else value
+        else:
+            entry = None
+        generation = (_epoch, _generations.get(key, 0))
+
+    if entry is None:
+        setting = db.query(AppSetting).filter(AppSetting.key == key).first()
+        entry = _Entry(
+            setting.version if setting else 0,
+            setting.value if setting else _ABSENT,
+            time.monotonic() + get_settings().APP_SETTINGS_CACHE_TTL_SECONDS
+        )
+
+    value = _decode(entry.value, decode)
+    with _lock:
+        current = _entries.get(key)
+        if (_epoch, _generations.get(key, 0)) == generation and (current is None or current.version <= entry.version):
+            entry.decoded[decode] = value
+            _entries[key] = entry
+    return default if value is _ABSENT else value
+
+
+def set_setting(db: Session, key: str, value: Optional[str]) -> None:
+    """Stage a setting change; None deletes it. Caller commits."""
+    setting = db.query(AppSetting).filter(AppSetting.key == key).with_for_update().first()
+    if value is None:
+        if setting is None:
+            return
+        version = setting.version + 1
+        db.delete(setting)
+    elif setting is None:
+        version = 1
+        db.add(AppSetting(key=key, value=value, version=version))
+    else:
+        version = setting.version + 1
+        setting.value = value
+        setting.version = version
+    db.info.setdefault(CHANGED_INFO_KEY, set()).add(key)
+    pubsub.stage_publish(db, {"type": SETTINGS_CHANGED_EVENT, "key": key, "version": version})
+
+
+def set_json_setting(db: Session, key: str, value: Any) -> None:
+    """Stage a JSON setting change; None deletes it. Caller commits."""
+    set_setting(db, key, json.dumps(value) if value is not None else None)
+
+
+def invalidate(key: str, version: Optional[int] = None) -> None:
+    """Drop a key, unless the cache already holds version or newer."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and version is not None and entry.version >= version:
+            return
+        _entries.pop(key, None)
+        _generations[key] = _generations.get(key, 0) + 1
+
+
+def clear() -> None:
+    global _epoch
+    with _lock:
+        _entries.clear()
+        _epoch += 1
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    # Other workers hear over pub/sub; this one should not wait for it
+    for key in session.info.pop(CHANGED_INFO_KEY, ()):
+        invalidate(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(CHANGED_INFO_KEY, None)
+
+
+def handle_message(payload: Dict[str, Any]) -> None:
+    """Pub/sub handler: drop settings changed by any worker."""
+    message_type = payload.get("type")
+    if message_type == SETTINGS_CHANGED_EVENT:
+        invalidate(payload.get("key"), payload.get("version"))
+    elif message_type == pubsub.RESYNC_EVENT:
+        clear()
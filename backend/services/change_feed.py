@@ -0,0 +1,185 @@
+"""Change feed for delta sync of events.
+
+Every event insert or update takes the next value of event_change_seq, and
+every delete (or move to another recipient) writes a tombstone with its own
+sequence value. A client remembers the highest sequence it has applied and
+asks for everything after it.
+
+Sequence order must match commit order, so that a reader never sees
+sequence N+1 committed while N is still in flight. Writers record what they
+changed in the session, and just before the transaction commits they take
+a transaction-level advisory lock and restamp those rows with fresh
+sequence values. The lock is held only for that final step and the commit,
+so concurrent writes do all their other work in parallel.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import BigInteger, bindparam, event, func, inspect, literal, select, text, union_all
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.orm import Session
+
+from config import get_settings
+from models.app_setting import AppSetting
+from models.event import Event
+from models.event_tombstone import EventTombstone
+
+CHANGE_FEED_LOCK_ID = 7261934
+TOMBSTONE_WATERMARK_KEY = "event_tombstones_purged_through"
+# Events and tombstones a session changed, restamped when it commits
+CHANGED_INFO_KEY = "change_feed_changed"
+
+# SKIP LOCKED passes over events another transaction holds: this one did not
+# change them (its savepoint rolled back), and waiting on them while holding
+# the lock could deadlock with that transaction's own commit.
+RESTAMP_EVENTS_SQL = text(
+    """
+    UPDATE events SET change_seq = nextval('event_change_seq')
+    WHERE id IN (SELECT id FROM events WHERE id = ANY(:ids) ORDER BY id FOR UPDATE SKIP LOCKED)
+    """
+).bindparams(bindparam("ids", type_=ARRAY(UUID(as_uuid=True))))
+# Uncommitted tombstones are invisible to other transactions, so need no such care
+RESTAMP_TOMBSTONES_SQL = text(
+    "UPDATE event_tombstones SET change_seq = nextval('event_change_seq') WHERE change_seq = ANY(:seqs)"
+).bindparams(bindparam("seqs", type_=ARRAY(BigInteger)))
+
+
+def _changed(db: Session) -> Dict[str, List[Any]]:
+    return db.info.setdefault(CHANGED_INFO_KEY, {"events": [], "tombstones": []})
+
+
+def mark_event_changed(db: Session, event: Event) -> None:
+    """Give a new or updated event a change sequence when the session commits. Caller commits."""
+    _changed(db)["events"].append(event)
+
+
+def record_event_tombstone(db: Session, event_id, recipient_id) -> None:
+    """Stage a tombstone telling recipient_id's clients to drop event_id. Caller commits."""
+    tombstone = EventTombstone(event_id=event_id, recipient_id=recipient_id)
+    db.add(tombstone)
+    _changed(db)["tombstones"].append(tombstone)
+
+
+def _written_keys(objects: List[Any]) -> Iterable[Any]:
+    # Primary keys of rows still in the database; reading the identity does
+    # not reload objects a rolled-back savepoint expired
+    for obj in objects:
+        identity = inspect(obj).identity
+        if identity is not None:
+            yield identity[0]
+
+
+@event.listens_for(Session, "before_commit")
+def _stamp_before_commit(session: Session) -> None:
+    changed = session.info.pop(CHANGED_INFO_KEY, None)
+    if not changed:
+        return
+    # Sequence values exist once the rows are written
+    session.flush()
+    event_ids = sorted(set(_written_keys(changed["events"])))
+    tombstone_seqs = list(_written_keys(changed["tombstones"]))
+    if not event_ids and not tombstone_seqs:
+        return
+    session.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": CHANGE_FEED_LOCK_ID})
+    if event_ids:
+        session.execute(RESTAMP_EVENTS_SQL, {"ids": event_ids})
+    if tombstone_seqs:
+        session.execute(RESTAMP_TOMBSTONES_SQL, {"seqs": tombstone_seqs})
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(CHANGED_INFO_KEY, None)
+
+
+def get_tombstone_watermark(db: Session) -> int:
+    """Highest change sequence whose tombstones may have been purged."""
+    setting = db.query(AppSetting).filter(AppSetting.key == TOMBSTONE_WATERMARK_KEY).first()
+    if not setting:
+        return 0
+    try:
+        return int(setting.value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def get_change_feed_position(db: Session) -> int:
+    """Highest committed change sequence, used to start a client off after a full load."""
+    position = db.execute(
+        select(func.greatest(
+            select(func.coalesce(func.max(Event.change_seq), 0)).scalar_subquery(),
+            select(func.coalesce(func.max(EventTombstone.change_seq), 0)).scalar_subquery()
+        ))
+    ).scalar()
+    return max(int(position or 0), get_tombstone_watermark(db))
+
+
+def list_changes(
+    db: Session,
+    since: int,
+    recipient_ids: Optional[List[str]],
+    limit: int
+) -> List[Dict[str, Any]]:
+    """
+    Return up to limit changes after since, ordered by change sequence.
+
+    Each change is {"seq", "kind", "event_id", "recipient_id"} with kind
+    "event" or "deleted". recipient_ids of None means all recipients.
+    Tombstones for events that currently exist within the same recipients
+    are skipped: the event was moved between two of them, not deleted.
+    """
+    event_rows = select(
+        Event.change_seq.label("seq"),
+        literal("event").label("kind"),
+        Event.id.label("event_id"),
+        Event.recipient_id.label("recipient_id")
+    ).where(Event.change_seq > since)
+
+    current = select(Event.id).where(Event.id == EventTombstone.event_id)
+    tombstone_rows = select(
+        EventTombstone.change_seq.label("seq"),
+        literal("deleted").label("kind"),
+        EventTombstone.event_id.label("event_id"),
+        EventTombstone.recipient_id.label("recipient_id")
+    ).where(EventTombstone.change_seq > since)
+
+    if recipient_ids is not None:
+        event_rows = event_rows.where(Event.recipient_id.in_(recipient_ids))
+        tombstone_rows = tombstone_rows.where(EventTombstone.recipient_id.in_(recipient_ids))
+        current = current.where(Event.recipient_id.in_(recipient_ids))
+    tombstone_rows = tombstone_rows.where(~current.exists())
+
+    # One statement so events and tombstones come from the same snapshot
+    changes = union_all(event_rows, tombstone_rows).subquery()
+    rows = db.execute(
+        select(changes).order_by(changes.c.seq).limit(limit)
+    ).all()
+    return [
+        {"seq": row.seq, "kind": row.kind, "event_id": row.event_id, "recipient_id": row.recipient_id}
+        for row in rows
+    ]
+
+
+def purge_expired_tombstones(db: Session) -> int:
+    """Delete tombstones past retention and advance the watermark. Returns rows removed."""
+    settings = get_settings()
+    cutoff = datetime.utcnow() - timedelta(days=settings.EVENT_TOMBSTONE_RETENTION_DAYS)
+
+    purged_through = db.query(func.max(EventTombstone.change_seq)).filter(
+        EventTombstone.deleted_at < cutoff
+    ).scalar()
+    if purged_through is None:
+        return 0
+
+    removed = db.query(EventTombstone).filter(
+        EventTombstone.change_seq <= purged_through
+    ).delete(synchronize_session=False)
+
+    setting = db.query(AppSetting).filter(AppSetting.key == TOMBSTONE_WATERMARK_KEY).first()
+    if setting:
+        setting.value = str(max(int(purged_through), get_tombstone_watermark(db)))
+    else:
+        db.add(AppSetting(key=TOMBSTONE_WATERMARK_KEY, value=str(purged_through)))
+    db.commit()
+    return removed
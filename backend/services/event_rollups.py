@@ -0,0 +1,167 @@
+"""Time-bucketed event rollups for care timelines.
+
+Day and week buckets in the timezone setting's zone are summed from the
+daily counters that event writes keep (services/event_stats.py): a row per
+recipient, type and day, however many events that day had. Hour buckets,
+and buckets in another timezone, are grouped from the events in the window
+instead; hour windows are short, and other timezones are asked for
+explicitly.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, cast, func, literal_column
+from sqlalchemy.orm import Session
+
+from models.event import Event
+from models.event_count import EventDailyCount
+from services.app_settings import get_setting
+from services.event_stats import EVENT_AMOUNT_SQL, EVENT_TYPES, get_counts_timezone, resolve_timezone
+
+TIMEZONE_SETTING_KEY = "timezone"
+MAX_BUCKETS = 1000
+BUCKET_STEPS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+DEFAULT_WINDOWS = {
+    "hour": timedelta(hours=48),
+    "day": timedelta(days=30),
+    "week": timedelta(weeks=12),
+}
+
+
+def get_rollup_timezone(db: Session, override: Optional[str] = None) -> Tuple[str, ZoneInfo]:
+    """
+    Resolve the timezone used for bucketing.
+
+    Uses override when given, else the timezone AppSetting, which falls back
+    to UTC when it names no zone the server knows. An unknown override is an error.
+    """
+    if not override:
+        return resolve_timezone(get_setting(db, TIMEZONE_SETTING_KEY))
+    try:
+        return override, ZoneInfo(override)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown timezone"
+        )
+
+
+def truncate_local(value: datetime, bucket: str) -> datetime:
+    """Truncate a naive local datetime to the start of its bucket (weeks start Monday)."""
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if bucket == "hour":
+        return value
+    value = value.replace(hour=0)
+    if bucket == "week":
+        value -= timedelta(days=value.weekday())
+    return value
+
+
+def _local_to_naive_utc(value: datetime, zone: ZoneInfo) -> datetime:
+    return value.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def get_event_rollups(
+    db: Session,
+    recipient_ids: Optional[List[str]],
+    bucket: str,
+    zone_name: str,
+    zone: ZoneInfo,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """
+    Return one entry per bucket between start and end, oldest first.
+
+    The buckets holding start and end are included whole. Buckets without
+    events are included with zero counts so charts get a continuous series.
+    recipient_ids of None means all recipients.
+    """
+    step = BUCKET_STEPS[bucket]
+    end = end or datetime.now(timezone.utc)
+    start = start or end - DEFAULT_WINDOWS[bucket]
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+
+    first_bucket = truncate_local(start.astimezone(zone).replace(tzinfo=None), bucket)
+    last_bucket = truncate_local(end.astimezone(zone).replace(tzinfo=None), bucket)
+    if (last_bucket - first_bucket) / step >= MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range covers more than {MAX_BUCKETS} buckets"
+        )
+
+    buckets: Dict[datetime, Dict[str, Any]] = {}
+    current = first_bucket
+    while current <= last_bucket:
+        counts = {event_type: 0 for event_type in EVENT_TYPES}
+        buckets[current] = {"counts": counts, "total": 0, "amount_ml": 0.0}
+        # Steps are in local wall-clock time, so days and weeks stay aligned across DST
+        current += step
+
+    if recipient_ids is not None and not recipient_ids:
+        return _format_buckets(buckets, zone)
+
+    if bucket != "hour" and zone_name == get_counts_timezone(db)[0]:
+        # As a timestamp: date_trunc would otherwise take the day as a timestamptz
+        local_bucket = func.date_trunc(bucket, cast(EventDailyCount.day, DateTime)).label("local_bucket")
+        query = db.query(
+            local_bucket,
+            EventDailyCount.type,
+            func.sum(EventDailyCount.count),
+            func.sum(EventDailyCount.amount_ml)
+        ).filter(
+            EventDailyCount.day >= first_bucket.date(),
+            EventDailyCount.day < (last_bucket + step).date()
+        )
+        if recipient_ids is not None:
+            query = query.filter(EventDailyCount.recipient_id.in_(recipient_ids))
+        query = query.group_by(local_bucket, EventDailyCount.type)
+    else:
+        local_time = func.timezone(zone_name, func.timezone("UTC", Event.timestamp))
+        local_bucket = func.date_trunc(bucket, local_time).label("local_bucket")
+        query = db.query(
+            local_bucket,
+            Event.type,
+            func.count(Event.id),
+            func.sum(literal_column(EVENT_AMOUNT_SQL))
+        ).filter(
+            Event.timestamp >= _local_to_naive_utc(first_bucket, zone),
+            Event.timestamp < _local_to_naive_utc(last_bucket + step, zone)
+        )
+        if recipient_ids is not None:
+            query = query.filter(Event.recipient_id.in_(recipient_ids))
+        query = query.group_by(local_bucket, Event.type)
+
+    for bucket_start, event_type, count, amount_ml in query.all():
+        entry = buckets.get(bucket_start)
+        if entry is None:
+            continue
+        count = int(count or 0)
+        if event_type in entry["counts"]:
+            entry["counts"][event_type] += count
+        entry["total"] += count
+        entry["amount_ml"] += float(amount_ml or 0)
+
+    return _format_buckets(buckets, zone)
+
+
+def _format_buckets(buckets: Dict[datetime, Dict[str, Any]], zone: ZoneInfo) -> List[Dict[str, Any]]:
+    return [
+        {"start": bucket_start.replace(tzinfo=zone).isoformat(), **entry}
+        for bucket_start, entry in buckets.items()
+    ]
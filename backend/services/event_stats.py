@@ -0,0 +1,305 @@
+"""Incrementally maintained event counters for stats and rollups.
+
+Event writes adjust two counter tables in the same transaction as the event
+itself: a running total per (recipient, type), and a count and summed
+amount_ml per (recipient, type, local day). The summary endpoint reads a
+handful of counter rows instead of counting the events table, and the
+rollups endpoint (services/event_rollups.py) builds its day and week
+buckets from the daily rows.
+
+Days are local to the timezone recorded under COUNTS_TIMEZONE_KEY, which
+follows the timezone setting. Writers look it up inside their upsert, and
+changing it rebuilds the daily rows under a table lock, so a write that
+races the change still lands in the right day.
+
+Events without a recipient, recorded before recipients existed, are counted
+under a recipient_id of NULL, so they appear in unfiltered totals as they
+always have.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import Date, cast, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from models.app_setting import AppSetting
+from models.event import Event
+from models.event_count import EventDailyCount, EventTypeCount
+from services.app_settings import get_setting, set_setting
+
+EVENT_TYPES = ["medication", "feeding", "diaper", "demeanor", "observation"]
+
+# Timezone whose days the daily counters use
+COUNTS_TIMEZONE_KEY = "event_counts_timezone"
+DEFAULT_TIMEZONE = "UTC"
+
+# amount_ml from an event's metadata, when it is a number
+EVENT_AMOUNT_SQL = (
+    "CASE WHEN jsonb_typeof(event_data->'amount_ml') = 'number' "
+    "THEN (event_data->>'amount_ml')::float8 ELSE 0 END"
+)
+
+
+def _to_naive_utc(value: datetime) -> datetime:
+    """Normalize a datetime to the naive UTC form stored in events.timestamp."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def resolve_timezone(name: Optional[str]) -> Tuple[str, ZoneInfo]:
+    """
+    The zone for a timezone setting value.
+
+    The setting may be "local" (meaning the viewer's browser), which the
+    server cannot resolve, so that and any unknown name fall back to UTC.
+    """
+    try:
+        return name, ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return DEFAULT_TIMEZONE, ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def get_counts_timezone(db: Session) -> Tuple[str, ZoneInfo]:
+    return resolve_timezone(get_setting(db, COUNTS_TIMEZONE_KEY, default=DEFAULT_TIMEZONE))
+
+
+def event_amount_ml(event_data: Optional[Dict[str, Any]]) -> float:
+    """The amount_ml logged with an event, or 0."""
+    value = (event_data or {}).get("amount_ml")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return 0.0
+
+
+def empty_stats() -> Dict[str, int]:
+    stats = {event_type: 0 for event_type in EVENT_TYPES}
+    stats["total"] = 0
+    return stats
+
+
+def _adjust_type_count(db: Session, recipient_id, event_type: str, delta: int) -> None:
+    stmt = insert(EventTypeCount).values(
+        recipient_id=recipient_id,
+        type=event_type,
+        count=delta
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[EventTypeCount.recipient_id, EventTypeCount.type],
+        set_={"count": EventTypeCount.count + delta}
+    ))
+
+
+def _adjust_daily_count(
+    db: Session,
+    recipient_id,
+    event_type: str,
+    timestamp: datetime,
+    amount_ml: float,
+    delta: int
+) -> None:
+    counts_zone = func.coalesce(
+        select(AppSetting.value).where(AppSetting.key == COUNTS_TIMEZONE_KEY).scalar_subquery(),
+        DEFAULT_TIMEZONE
+    )
+    local_day = cast(func.timezone(counts_zone, func.timezone("UTC", _to_naive_utc(timestamp))), Date)
+    stmt = insert(EventDailyCount).values(
+        recipient_id=recipient_id,
+        type=event_type,
+        day=local_day,
+        count=delta,
+        amount_ml=amount_ml * delta
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[EventDailyCount.recipient_id, EventDailyCount.type, EventDailyCount.day],
+        set_={
+            "count": EventDailyCount.count + delta,
+            "amount_ml": EventDailyCount.amount_ml + amount_ml * delta
+        }
+    ))
+
+
+def record_event_created(db: Session, event: Event) -> None:
+    """Count a new event. Call before committing the event change."""
+    _adjust_type_count(db, event.recipient_id, event.type, 1)
+    _adjust_daily_count(db, event.recipient_id, event.type, event.timestamp, event_amount_ml(event.event_data), 1)
+
+
+def record_event_deleted(db: Session, event: Event) -> None:
+    """Uncount a deleted event. Call before committing the event change."""
+    _adjust_type_count(db, event.recipient_id, event.type, -1)
+    _adjust_daily_count(db, event.recipient_id, event.type, event.timestamp, event_amount_ml(event.event_data), -1)
+
+
+def record_event_changed(
+    db: Session,
+    event: Event,
+    old_recipient_id,
+    old_type: str,
+    old_timestamp: datetime,
+    old_event_data: Optional[Dict[str, Any]]
+) -> None:
+    """Move an updated event between counters if its recipient, type, time or amount changed."""
+    if old_recipient_id != event.recipient_id or old_type != event.type:
+        _adjust_type_count(db, old_recipient_id, old_type, -1)
+        _adjust_type_count(db, event.recipient_id, event.type, 1)
+
+    old_amount = event_amount_ml(old_event_data)
+    new_amount = event_amount_ml(event.event_data)
+    if (
+        old_recipient_id == event.recipient_id
+        and old_type == event.type
+        and _to_naive_utc(old_timestamp) == _to_naive_utc(event.timestamp)
+        and old_amount == new_amount
+    ):
+        return
+    _adjust_daily_count(db, old_recipient_id, old_type, old_timestamp, old_amount, -1)
+    _adjust_daily_count(db, event.recipient_id, event.type, event.timestamp, new_amount, 1)
+
+
+def _merge_counts(stats: Dict[str, int], rows: Iterable) -> None:
+    for event_type, count in rows:
+        if event_type in stats:
+            stats[event_type] += int(count or 0)
+        stats["total"] += int(count or 0)
+
+
+def _count_raw_events(
+    db: Session,
+    recipient_ids: Optional[List[str]],
+    start: Optional[datetime],
+    end_exclusive: Optional[datetime]
+):
+    query = db.query(Event.type, func.count(Event.id))
+    if recipient_ids is not None:
+        query = query.filter(Event.recipient_id.in_(recipient_ids))
+    if start is not None:
+        query = query.filter(Event.timestamp >= start)
+    if end_exclusive is not None:
+        query = query.filter(Event.timestamp < end_exclusive)
+    return query.group_by(Event.type).all()
+
+
+def local_day_start(day: date, zone: ZoneInfo) -> datetime:
+    """Naive UTC time at which day starts in zone."""
+    return datetime.combine(day, time.min, tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def get_event_counts(
+    db: Session,
+    recipient_ids: Optional[List[str]],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Dict[str, int]:
+    """
+    Return per-type and total event counts.
+
+    Args:
+        recipient_ids: Recipients to include, or None for all events, those
+            without a recipient included
+        start: Inclusive lower bound on event timestamp
+        end: Inclusive upper bound on event timestamp
+
+    Whole days inside the window are answered from the daily counters; only
+    the partial days at either edge are counted from the events table.
+    """
+    stats = empty_stats()
+    if recipient_ids is not None and not recipient_ids:
+        return stats
+
+    if start is None and end is None:
+        query = db.query(EventTypeCount.type, func.sum(EventTypeCount.count))
+        if recipient_ids is not None:
+            query = query.filter(EventTypeCount.recipient_id.in_(recipient_ids))
+        _merge_counts(stats, query.group_by(EventTypeCount.type).all())
+        return stats
+
+    _, zone = get_counts_timezone(db)
+    start = _to_naive_utc(start) if start is not None else None
+    end_exclusive = _to_naive_utc(end) + timedelta(microseconds=1) if end is not None else None
+
+    # Whole days are [first_day, last_day_exclusive), in the counters' timezone
+    first_day: Optional[date] = None
+    if start is not None:
+        local_start = start.replace(tzinfo=timezone.utc).astimezone(zone)
+        first_day = local_start.date()
+        if local_day_start(first_day, zone) < start:
+            first_day += timedelta(days=1)
+    last_day_exclusive: Optional[date] = None
+    if end_exclusive is not None:
+        last_day_exclusive = end_exclusive.replace(tzinfo=timezone.utc).astimezone(zone).date()
+
+    if first_day is not None and last_day_exclusive is not None and first_day >= last_day_exclusive:
+        _merge_counts(stats, _count_raw_events(db, recipient_ids, start, end_exclusive))
+        return stats
+
+    query = db.query(EventDailyCount.type, func.sum(EventDailyCount.count))
+    if recipient_ids is not None:
+        query = query.filter(EventDailyCount.recipient_id.in_(recipient_ids))
+    if first_day is not None:
+        query = query.filter(EventDailyCount.day >= first_day)
+    if last_day_exclusive is not None:
+        query = query.filter(EventDailyCount.day < last_day_exclusive)
+    _merge_counts(stats, query.group_by(EventDailyCount.type).all())
+
+    if start is not None and start < local_day_start(first_day, zone):
+        _merge_counts(stats, _count_raw_events(db, recipient_ids, start, local_day_start(first_day, zone)))
+    if end_exclusive is not None and end_exclusive > local_day_start(last_day_exclusive, zone):
+        _merge_counts(stats, _count_raw_events(db, recipient_ids, local_day_start(last_day_exclusive, zone), end_exclusive))
+
+    return stats
+
+
+REBUILD_TYPE_COUNTS_SQL = [
+    "DELETE FROM event_type_counts",
+    """
+    INSERT INTO event_type_counts (recipient_id, type, count)
+    SELECT recipient_id, type, COUNT(*)
+    FROM events
+    GROUP BY recipient_id, type
+    """,
+]
+
+# Takes the zone as :zone. The lock holds off writers until the rebuild
+# commits; their upserts then read the new zone.
+REBUILD_DAILY_COUNTS_SQL = [
+    "LOCK TABLE event_daily_counts IN EXCLUSIVE MODE",
+    "DELETE FROM event_daily_counts",
+    f"""
+    INSERT INTO event_daily_counts (recipient_id, type, day, count, amount_ml)
+    SELECT recipient_id, type, CAST(timezone(:zone, timezone('UTC', timestamp)) AS DATE), COUNT(*), SUM({EVENT_AMOUNT_SQL})
+    FROM events
+    GROUP BY 1, 2, 3
+    """,
+]
+
+
+def _rebuild_daily_counts(db: Session, zone_name: str) -> None:
+    for statement in REBUILD_DAILY_COUNTS_SQL:
+        db.execute(text(statement), {"zone": zone_name})
+
+
+def set_counts_timezone(db: Session, name: Optional[str]) -> None:
+    """
+    Bucket the daily counters by the timezone setting value name.
+
+    Rebuilds them if that changes their timezone. Caller commits, which
+    should follow promptly: writers wait on the rebuild's lock.
+    """
+    zone_name, _ = resolve_timezone(name)
+    current = get_setting(db, COUNTS_TIMEZONE_KEY, default=DEFAULT_TIMEZONE, for_update=True)
+    if zone_name == resolve_timezone(current)[0]:
+        return
+    _rebuild_daily_counts(db, zone_name)
+    set_setting(db, COUNTS_TIMEZONE_KEY, zone_name)
+
+
+def rebuild_event_counts(db: Session) -> None:
+    """Recompute all counters from the events table."""
+    for statement in REBUILD_TYPE_COUNTS_SQL:
+        db.execute(text(statement))
+    _rebuild_daily_counts(db, get_counts_timezone(db)[0])
+    db.commit()
@@ -0,0 +1,119 @@
+"""Idempotency-Key support for write endpoints.
+
+A client that retries a write with the same Idempotency-Key gets the stored
+response back instead of a second write. The key row is added in the same
+transaction as the write, so either both are committed or neither is.
+"""
+
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Optional, Union
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import get_settings
+from models.idempotency_key import IdempotencyKey
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+
+def request_fingerprint(scope: str, *parts: Union[str, bytes]) -> str:
+    """Hash the route scope and request body parts into a fingerprint."""
+    digest = hashlib.sha256(scope.encode("utf-8"))
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def find_idempotent_response(
+    db: Session,
+    user_id,
+    key: Optional[str],
+    fingerprint: str
+) -> Optional[JSONResponse]:
+    """Return the stored response for key, or None if this is the first request."""
+    if not key:
+        return None
+
+    record = db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key
+    ).first()
+    if not record:
+        return None
+
+    if record.expires_at <= datetime.utcnow():
+        db.delete(record)
+        db.flush()
+        return None
+
+    if record.request_hash != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different request"
+        )
+
+    return JSONResponse(
+        status_code=record.status_code,
+        content=record.response_body,
+        headers={REPLAY_HEADER: "true"}
+    )
+
+
+def store_idempotent_response(
+    db: Session,
+    user_id,
+    key: Optional[str],
+    fingerprint: str,
+    status_code: int,
+    body: Any
+) -> None:
+    """Stage the response for key. Caller commits together with the write."""
+    if not key:
+        return
+    settings = get_settings()
+    db.add(IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        request_hash=fingerprint,
+        status_code=status_code,
+        response_body=jsonable_encoder(body),
+        expires_at=datetime.utcnow() + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    ))
+
+
+def commit_or_replay(
+    db: Session,
+    user_id,
+    key: Optional[str],
+    fingerprint: str
+) -> Optional[JSONResponse]:
+    """
+    Commit the pending write.
+
+    If a concurrent request with the same key committed first, roll back and
+    return its stored response instead.
+    """
+    try:
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+        replay = find_idempotent_response(db, user_id, key, fingerprint) if key else None
+        if replay is None:
+            raise
+        return replay
+
+
+def purge_expired_keys(db: Session) -> int:
+    """Delete expired keys. Returns the number of rows removed."""
+    removed = db.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return removed
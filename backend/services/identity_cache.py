@@ -0,0 +1,283 @@
+"""
+Per-worker cache of users and their recipient access.
+
+get_current_user and get_allowed_recipient_ids read through it, so a
+typical request makes no identity queries. Entries expire after
+IDENTITY_CACHE_TTL_SECONDS and at most IDENTITY_CACHE_SIZE users are kept,
+least recently used first out.
+
+Changes are announced over pub/sub: access.changed when an admin changes a
+user's role, status or recipient access, user.changed when users edit
+their own profile. The worker making the change drops the user's entry
+when it commits, every worker does when the message arrives, and a resync
+clears the whole cache since messages may have been missed. The TTL only
+bounds staleness if a message is lost.
+
+Loaders read generation(user_id) before querying and pass it to the
+store, which skips caching a load that raced an invalidation.
+
+Each user's current authz_version is kept apart from the entries: loaded
+for every user at startup (access_control.load_authz_versions), taken from
+every user load and from access.changed, and dropped like the entries. An
+access token whose authz_version matches it has current claims, so
+user_from_claims builds the user from them without a query.
+
+Password hashes are not cached; cached users have password_hash unloaded.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from config import get_settings
+from models.user import User
+from services import pubsub
+
+ACCESS_CHANGED_EVENT = "access.changed"
+USER_CHANGED_EVENT = "user.changed"
+
+# get_allowed_recipient_ids result not cached; None means every recipient
+MISSING = object()
+
+# Memoizes the allowed recipient IDs on a request's User instance
+_ALLOWED_ATTR = "_cached_allowed_recipient_ids"
+# Marks a User built from token claims, with only TOKEN_CLAIMS' columns set
+_FROM_CLAIMS_ATTR = "_from_token_claims"
+# Access token claims user_from_claims needs, and the columns they set
+TOKEN_CLAIMS = {
+    "username": "username",
+    "role": "role",
+    "active": "is_active",
+    "authz_version": "authz_version",
+}
+# Session.info key holding users to drop once the session commits
+CHANGED_INFO_KEY = "identity_cache_changed"
+# Columns never cached
+UNCACHED_COLUMNS = ("password_hash",)
+
+
+class _Entry:
+    __slots__ = ("expires_at", "columns", "allowed")
+
+    def __init__(self, expires_at: float, columns: Optional[Dict[str, Any]] = None):
+        self.expires_at = expires_at
+        self.columns = columns
+        self.allowed: Any = MISSING
+
+
+_entries: "OrderedDict[str, _Entry]" = OrderedDict()
+# Current authz_version per user id, with when it expires. One integer per
+# user, so not bounded by IDENTITY_CACHE_SIZE.
+_authz_versions: Dict[str, Tuple[int, float]] = {}
+# Bumped per user on invalidation, and _epoch on clear, so a load that raced
+# a change is not cached
+_generations: Dict[str, int] = {}
+_epoch = 0
+# Sync routers call in from threadpool threads
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _get_entry(user_id: str) -> Optional[_Entry]:
+    entry = _entries.get(user_id)
+    if entry is None:
+        return None
+    if entry.expires_at <= time.monotonic():
+        del _entries[user_id]
+        return None
+    _entries.move_to_end(user_id)
+    return entry
+
+
+def _entry_for_update(user_id: str) -> _Entry:
+    settings = get_settings()
+    entry = _get_entry(user_id)
+    if entry is None:
+        entry = _Entry(time.monotonic() + settings.IDENTITY_CACHE_TTL_SECONDS)
+        _entries[user_id] = entry
+        while len(_entries) > settings.IDENTITY_CACHE_SIZE:
+            _entries.popitem(last=False)
+    return entry
+
+
+def generation(user_id) -> Tuple[int, int]:
+    """Read before loading a user's identity from the database, and pass to the store."""
+    with _lock:
+        return _epoch, _generations.get(str(user_id), 0)
+
+
+def generations() -> Tuple[int, Dict[str, int]]:
+    """Read before loading many users' authz_version, and pass to store_authz_versions."""
+    with _lock:
+        return _epoch, dict(_generations)
+
+
+def _is_current(user_id: str, loaded_at: Tuple[int, int]) -> bool:
+    return (_epoch, _generations.get(user_id, 0)) == loaded_at
+
+
+def _set_authz_version(user_id: str, version: int) -> None:
+    _authz_versions[user_id] = (version, time.monotonic() + get_settings().IDENTITY_CACHE_TTL_SECONDS)
+
+
+def authz_version(user_id) -> Optional[int]:
+    """The user's current authz_version, or None if this worker does not know it."""
+    with _lock:
+        known = _authz_versions.get(str(user_id))
+        if known is None:
+            return None
+        if known[1] <= time.monotonic():
+            del _authz_versions[str(user_id)]
+            return None
+        return known[0]
+
+
+def store_authz_versions(versions: Dict[str, int], loaded_at: Tuple[int, Dict[str, int]]) -> None:
+    """Record users' authz_version loaded at generations() loaded_at, skipping users changed since."""
+    epoch, loaded_generations = loaded_at
+    with _lock:
+        if epoch != _epoch:
+            return
+        for user_id, version in versions.items():
+            if _generations.get(user_id, 0) == loaded_generations.get(user_id, 0):
+                _set_authz_version(user_id, version)
+
+
+def get_user(user_id) -> Optional[User]:
+    """
+    A detached copy of the cached user, or None on a miss.
+
+    Each call returns a new instance, so a request may modify it or add it
+    to its session without affecting other requests.
+    """
+    with _lock:
+        entry = _get_entry(str(user_id))
+        if entry is None or entry.columns is None:
+            _stats["misses"] += 1
+            return None
+        _stats["hits"] += 1
+        columns = entry.columns
+        allowed = entry.allowed
+
+    user = User(**columns)
+    make_transient_to_detached(user)
+    if allowed is not MISSING:
+        setattr(user, _ALLOWED_ATTR, allowed)
+    return user
+
+
+def store_user(user: User, loaded_at: Tuple[int, int]) -> None:
+    """Cache the columns of a user loaded at generation loaded_at, unless it has since changed."""
+    columns = {
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(User).column_attrs
+        if attr.key not in UNCACHED_COLUMNS
+    }
+    with _lock:
+        if _is_current(str(user.id), loaded_at):
+            _entry_for_update(str(user.id)).columns = columns
+            _set_authz_version(str(user.id), user.authz_version)
+
+
+def user_from_claims(user_id, claims: Dict[str, Any]) -> Optional[User]:
+    """
+    A detached user built from access token claims, or None unless they are
+    complete and carry the user's current authz_version.
+
+    Only the TOKEN_CLAIMS columns and id are set, with the recipient scope
+    memoized; is_from_claims tells routes needing the rest to load it.
+    """
+    if any(claim not in claims for claim in (*TOKEN_CLAIMS, "recipient_ids")):
+        return None
+    if authz_version(user_id) != claims["authz_version"]:
+        return None
+    user = User(id=user_id, **{column: claims[claim] for claim, column in TOKEN_CLAIMS.items()})
+    make_transient_to_detached(user)
+    allowed = claims["recipient_ids"]
+    setattr(user, _ALLOWED_ATTR, tuple(allowed) if allowed is not None else None)
+    setattr(user, _FROM_CLAIMS_ATTR, True)
+    return user
+
+
+def is_from_claims(user: User) -> bool:
+    return getattr(user, _FROM_CLAIMS_ATTR, False)
+
+
+def get_allowed_recipient_ids(user: User) -> Any:
+    """The user's cached allowed recipient IDs, or MISSING."""
+    allowed = getattr(user, _ALLOWED_ATTR, MISSING)
+    if allowed is not MISSING:
+        return allowed
+    with _lock:
+        entry = _get_entry(str(user.id))
+        allowed = entry.allowed if entry is not None else MISSING
+    if allowed is not MISSING:
+        setattr(user, _ALLOWED_ATTR, allowed)
+    return allowed
+
+
+def store_allowed_recipient_ids(user: User, allowed: Optional[List[str]], loaded_at: Tuple[int, int]) -> None:
+    """Cache a user's allowed recipient IDs loaded at generation loaded_at, unless it has since changed."""
+    allowed = tuple(allowed) if allowed is not None else None
+    setattr(user, _ALLOWED_ATTR, allowed)
+    with _lock:
+        if _is_current(str(user.id), loaded_at):
+            _entry_for_update(str(user.id)).allowed = allowed
+
+
+def invalidate(user_id, authz_version: Optional[int] = None) -> None:
+    """Drop a user; authz_version, as announced with the change, becomes their current one."""
+    user_id = str(user_id)
+    with _lock:
+        if _entries.pop(user_id, None) is not None:
+            _stats["invalidations"] += 1
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        known = _authz_versions.pop(user_id, None)
+        if authz_version is not None:
+            # Messages arrive in commit order, but never step back
+            _set_authz_version(user_id, max(authz_version, known[0] if known else authz_version))
+
+
+def clear() -> None:
+    global _epoch
+    with _lock:
+        _entries.clear()
+        _authz_versions.clear()
+        _epoch += 1
+
+
+def mark_changed(db: Session, user_id) -> None:
+    """Drop the user from this worker's cache when db commits."""
+    db.info.setdefault(CHANGED_INFO_KEY, set()).add(str(user_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    # Other workers hear over pub/sub; this one should not wait for it
+    for user_id in session.info.pop(CHANGED_INFO_KEY, ()):
+        invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(CHANGED_INFO_KEY, None)
+
+
+def get_cache_stats() -> Dict[str, int]:
+    with _lock:
+        return {"users": len(_entries), **_stats}
+
+
+def handle_message(payload: Dict[str, Any]) -> None:
+    """Pub/sub handler: drop users whose identity or access changed."""
+    message_type = payload.get("type")
+    if message_type == ACCESS_CHANGED_EVENT:
+        invalidate(payload.get("user_id"), payload.get("authz_version"))
+    elif message_type == USER_CHANGED_EVENT:
+        invalidate(payload.get("user_id"))
+    elif message_type == pubsub.RESYNC_EVENT:
+        clear()
@@ -0,0 +1,362 @@
+"""
+Prometheus metrics, rendered by GET /api/metrics.
+
+Counters and histograms are in-process objects updated under a lock, so
+recording one costs a dictionary lookup and a few additions. Gauges that
+describe current state, like pool usage and open streams, are read when
+the metrics are rendered.
+
+With METRICS_DIR set, each worker also writes its rendered metrics there
+every METRICS_SNAPSHOT_SECONDS and when it stops, and whichever worker
+answers a scrape merges them with its own: counters and histograms are
+summed, exited workers' included so totals never go backwards, and gauges
+of live workers are reported with a worker label. Other workers' figures
+are up to one snapshot interval old.
+
+Queries per request come from the request's query profile
+(services/query_profile.py).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import get_settings
+from database import async_engine, engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """This metric's lines in the Prometheus text format."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        if not self.labels:
+            self._values[()] = 0
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = self.header()
+        for label_values, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # Per label set: count per bucket (the last one is +Inf), sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        if not self.labels:
+            self._values[()] = ([0] * (len(self.buckets) + 1), [0.0])
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            counts, total = self._values.setdefault(label_values, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, list(counts), total[0]) for labels, (counts, total) in self._values.items())
+        lines = self.header()
+        bounds = [*self.buckets, float("inf")]
+        for label_values, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels((*self.labels, "le"), (*label_values, _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def format_gauge(name: str, documentation: str, samples: Iterable[Tuple[Dict[str, str], float]]) -> List[str]:
+    """Lines for a gauge read at render time; samples are (labels, value) pairs."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+    return lines
+
+
+_registry: List[_Metric] = []
+# Functions returning more metric lines, read at render time
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending its response headers",
+    LATENCY_BUCKETS,
+    ("method", "route")
+)
+REQUESTS = Counter("http_requests_total", "Requests answered", ("method", "route", "status"))
+REQUEST_ERRORS = Counter(
+    "http_request_errors_total",
+    "Requests that ended in a 5xx response or an unhandled exception",
+    ("method", "route")
+)
+QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements run while handling a request",
+    QUERY_COUNT_BUCKETS,
+    ("method", "route")
+)
+PUBLISH_DURATION = Histogram(
+    "pubsub_publish_duration_seconds",
+    "Time from a publish call, or its transaction committing, until the batch is sent",
+    LATENCY_BUCKETS
+)
+PUBLISHED_MESSAGES = Counter("pubsub_published_messages_total", "Messages published to other workers")
+PUBLISH_FAILURES = Counter("pubsub_publish_failures_total", "Messages that could not be published to other workers")
+REMINDER_SCAN_DURATION = Histogram(
+    "reminder_scan_duration_seconds",
+    "Time taken by each medication reminder scan",
+    LATENCY_BUCKETS
+)
+REMINDERS_DUE = Counter("reminders_due_total", "Reminders found due and notified by the scanner")
+REMINDER_SCAN_FAILURES = Counter("reminder_scan_failures_total", "Reminder scans that raised an error")
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def route_label(scope) -> str:
+    """The matched route's path template, so /events/{event_id} is one series."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def _pool_samples() -> List[str]:
+    pools = {"sync": engine.pool, "async": async_engine.sync_engine.pool}
+    gauges = (
+        ("db_pool_size", "Connections the pool keeps open", lambda pool: pool.size()),
+        ("db_pool_checked_out", "Connections in use", lambda pool: pool.checkedout()),
+        ("db_pool_checked_in", "Idle connections in the pool", lambda pool: pool.checkedin()),
+        ("db_pool_overflow", "Connections open beyond the pool size; negative while below it", lambda pool: pool.overflow()),
+    )
+    lines: List[str] = []
+    for name, documentation, read in gauges:
+        lines.extend(format_gauge(name, documentation, (({"engine": label}, read(pool)) for label, pool in pools.items())))
+    return lines
+
+
+def add_collector(collector: Callable[[], Iterable[str]]) -> None:
+    """Include collector's lines, in the Prometheus text format, in every render."""
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def render() -> str:
+    """This worker's metrics in the Prometheus text format."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    lines.extend(_pool_samples())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+SNAPSHOT_PREFIX = "worker-"
+SNAPSHOT_SUFFIX = ".prom"
+# Sample kinds summed across workers; the rest are labeled per worker
+SUMMED_KINDS = ("counter", "histogram")
+
+_snapshot_task: Optional[asyncio.Task] = None
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"{SNAPSHOT_PREFIX}{pid}{SNAPSHOT_SUFFIX}")
+
+
+def _write_snapshot(directory: str, text: str) -> None:
+    path = _snapshot_path(directory, os.getpid())
+    # Written aside and renamed, so a scrape never reads half a file
+    partial = path + ".tmp"
+    with open(partial, "w") as handle:
+        handle.write(text)
+    os.replace(partial, path)
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_snapshots(directory: str) -> Dict[str, Tuple[str, bool]]:
+    """Other workers' snapshots by pid, with whether each worker is still running."""
+    snapshots: Dict[str, Tuple[str, bool]] = {}
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return snapshots
+    for name in names:
+        if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)):
+            continue
+        pid = name[len(SNAPSHOT_PREFIX):-len(SNAPSHOT_SUFFIX)]
+        if not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        try:
+            with open(os.path.join(directory, name)) as handle:
+                snapshots[pid] = (handle.read(), _is_running(int(pid)))
+        except OSError:
+            continue
+    return snapshots
+
+
+def _with_worker_label(sample: str, worker: str) -> str:
+    label = f'worker="{worker}"'
+    if sample.endswith("}"):
+        return sample[:-1] + ("," if not sample.endswith("{}") else "") + label + "}"
+    return sample + "{" + label + "}"
+
+
+def merge(workers: Dict[str, Tuple[str, bool]]) -> str:
+    """
+    Merge workers' metrics, keyed by worker, each (Prometheus text, running).
+
+    Counter and histogram samples are summed. Other samples are kept per
+    running worker, with a worker label.
+    """
+    headers: "OrderedDict[str, List[str]]" = OrderedDict()
+    kinds: Dict[str, str] = {}
+    samples: Dict[str, "OrderedDict[str, float]"] = {}
+    for worker, (text, running) in workers.items():
+        name = None
+        for line in text.splitlines():
+            if line.startswith("# "):
+                parts = line.split(" ", 3)
+                name = parts[2]
+                header = headers.setdefault(name, [])
+                samples.setdefault(name, OrderedDict())
+                if parts[1] == "TYPE":
+                    kinds[name] = parts[3]
+                if line not in header:
+                    header.append(line)
+                continue
+            if not line or name is None:
+                continue
+            sample, _, value = line.rpartition(" ")
+            family = samples[name]
+            if kinds.get(name) in SUMMED_KINDS:
+                family[sample] = family.get(sample, 0.0) + float(value)
+            elif running:
+                family[_with_worker_label(sample, worker)] = float(value)
+
+    lines: List[str] = []
+    for name, header in headers.items():
+        lines.extend(header)
+        lines.extend(f"{sample} {_format_value(value)}" for sample, value in samples[name].items())
+    return "\n".join(lines) + "\n"
+
+
+def render_workers() -> str:
+    """Every worker's metrics merged, or this worker's alone without METRICS_DIR."""
+    own = render()
+    directory = get_settings().METRICS_DIR
+    if not directory:
+        return own
+    return merge({str(os.getpid()): (own, True), **_read_snapshots(directory)})
+
+
+def _try_write_snapshot(directory: str, text: str) -> None:
+    try:
+        _write_snapshot(directory, text)
+    except OSError as e:
+        logger.warning(f"Could not write metrics snapshot: {e}")
+
+
+async def _write_snapshots(directory: str, interval: float) -> None:
+    while True:
+        await asyncio.to_thread(_try_write_snapshot, directory, render())
+        await asyncio.sleep(interval)
+
+
+async def start_snapshots() -> None:
+    """Start writing this worker's metrics to METRICS_DIR, if set."""
+    global _snapshot_task
+    settings = get_settings()
+    if not settings.METRICS_DIR or _snapshot_task is not None:
+        return
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    _snapshot_task = asyncio.create_task(_write_snapshots(settings.METRICS_DIR, settings.METRICS_SNAPSHOT_SECONDS))
+
+
+async def stop_snapshots() -> None:
+    """Stop writing snapshots, after a last one so the totals keep this worker's counts."""
+    global _snapshot_task
+    if _snapshot_task is None:
+        return
+    _snapshot_task.cancel()
+    try:
+        await _snapshot_task
+    except asyncio.CancelledError:
+        pass
+    _snapshot_task = None
+    _try_write_snapshot(get_settings().METRICS_DIR, render())
@@ -1,61 +1,202 @@
 """
-PostgreSQL LISTEN/NOTIFY pub/sub service for cross-worker SSE broadcasting.
-
-This module enables real-time event broadcasting across multiple Uvicorn workers
-by using PostgreSQL's built-in LISTEN/NOTIFY mechanism.
+Pub/sub service for cross-worker SSE broadcasting.
+
+A message published on one worker reaches the handlers registered on every
+worker, with a stream_id, in the same order everywhere. The transport is
+chosen by PUBSUB_BACKEND:
+
+- postgres: LISTEN/NOTIFY with a transactional outbox, for any number of
+  workers sharing the database (services/pubsub_postgres.py)
+- memory: an in-process asyncio queue, for a single worker, development and
+  benchmarks (services/pubsub_memory.py)
+- unix: a broker on a Unix domain socket, for several workers on one host
+  (services/pubsub_unix.py)
+
+Writers stage messages with the session of the change they announce. The
+postgres backend writes them inside that transaction. The others keep them
+on the session and publish right after it commits (nothing is sent on
+rollback), so they skip a database round trip per message, at the cost of
+losing messages if the worker dies in between.
 """
 
 import asyncio
-import json
 import logging
-from typing import Callable, Dict, Any, Optional, List
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Set
 
-import asyncpg
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
 from config import get_settings
+from services import metrics
 
 logger = logging.getLogger(__name__)
 
-CHANNEL_NAME = "sse_events"
+STREAM_ID_KEY = "stream_id"
+# Sent to handlers when messages may have been lost; streams tell clients to reload
+RESYNC_EVENT = "stream.resync"
+BACKENDS = ("postgres", "memory", "unix")
+
+# Session.info key holding messages to publish once the session commits
+PENDING_INFO_KEY = "pubsub_pending"
 
-_connection: Optional[asyncpg.Connection] = None
-_listen_task: Optional[asyncio.Task] = None
 _handlers: List[Callable[[Dict[str, Any]], Any]] = []
-_lock = asyncio.Lock()
+_backend: Optional["PubSubBackend"] = None
+
+
+async def deliver(data: Dict[str, Any]) -> None:
+    """Hand one received message to every registered handler. Backends call this in stream order."""
+    for handler in _handlers:
+        try:
+            result = handler(data)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.error(f"Handler error in pub/sub: {e}")
+
+
+class PubSubBackend(ABC):
+    """
+    Carries messages between workers.
+
+    Subclasses implement publish_many and usually start and stop, and pass
+    each received message, with its stream_id, to deliver() in order.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def stage_many(self, db: Session, payloads: List[Dict[str, Any]]) -> None:
+        """Hold payloads on the session until it commits, then publish them."""
+        db.info.setdefault(PENDING_INFO_KEY, []).extend(payloads)
+
+    def publish_committed(self, payloads: List[Dict[str, Any]]) -> None:
+        """Publish staged payloads after their session committed. Safe to call from any thread."""
+        if self._loop is None:
+            logger.error("Pub/sub backend is not started; dropping %s messages", len(payloads))
+            metrics.PUBLISH_FAILURES.inc(amount=len(payloads))
+            return
+        self._loop.call_soon_threadsafe(self._spawn_publish, payloads, time.perf_counter())
+
+    def _spawn_publish(self, payloads: List[Dict[str, Any]], started: float) -> None:
+        task = self._loop.create_task(self._publish_committed(payloads, started))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish_committed(self, payloads: List[Dict[str, Any]], started: float) -> None:
+        try:
+            await _timed_publish(self.publish_many(payloads), len(payloads), started)
+        except Exception as e:
+            # The change has committed, so there is no caller left to tell
+            logger.error(f"Failed to publish {len(payloads)} committed messages: {e}")
+
+    @abstractmethod
+    async def publish_many(self, payloads: List[Dict[str, Any]]) -> None:
+        """Send payloads to every worker, in order. Raises if they could not be sent."""
+
+    async def publish(self, payload: Dict[str, Any]) -> None:
+        await self.publish_many([payload])
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._loop = None
+
+
+async def _timed_publish(publish: Awaitable[None], count: int, started: float) -> None:
+    try:
+        await publish
+    except Exception:
+        metrics.PUBLISH_FAILURES.inc(amount=count)
+        raise
+    metrics.PUBLISH_DURATION.observe(time.perf_counter() - started)
+    metrics.PUBLISHED_MESSAGES.inc(amount=count)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session) -> None:
+    payloads = session.info.pop(PENDING_INFO_KEY, None)
+    if payloads:
+        get_backend().publish_committed(payloads)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(PENDING_INFO_KEY, None)
+
 
+def get_backend() -> PubSubBackend:
+    """The configured backend, created on first use."""
+    global _backend
+    if _backend is None:
+        name = get_settings().PUBSUB_BACKEND
+        if name == "postgres":
+            from services.pubsub_postgres import PostgresBackend
+            _backend = PostgresBackend()
+        elif name == "memory":
+            from services.pubsub_memory import InProcessBackend
+            _backend = InProcessBackend()
+        elif name == "unix":
+            from services.pubsub_unix import UnixSocketBackend
+            _backend = UnixSocketBackend()
+        else:
+            raise ValueError(f"Unknown PUBSUB_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+    return _backend
 
-async def _get_connection() -> asyncpg.Connection:
-    """Get or create asyncpg connection for pub/sub."""
-    global _connection
-    async with _lock:
-        if _connection is None or _connection.is_closed():
-            settings = get_settings()
-            _connection = await asyncpg.connect(settings.DATABASE_URL)
-            logger.info("Created new asyncpg connection for pub/sub")
-        return _connection
+
+def set_backend(backend: PubSubBackend) -> None:
+    """Use backend instead of the configured one. Call before start_listener."""
+    global _backend
+    _backend = backend
+
+
+def stage_publish_many(db: Session, payloads: List[Dict[str, Any]]) -> None:
+    """
+    Stage payloads for all workers, in order. Caller commits.
+
+    Workers receive them, each with a stream_id, only if the transaction
+    commits. Stage right before committing.
+    """
+    if payloads:
+        get_backend().stage_many(db, payloads)
+
+
+def stage_publish(db: Session, payload: Dict[str, Any]) -> None:
+    """Stage one payload for all workers. Caller commits."""
+    stage_publish_many(db, [payload])
+
+
+async def publish_many(payloads: List[Dict[str, Any]]) -> None:
+    """
+    Publish payloads to all workers, in order, outside any request transaction.
+
+    For messages that do not accompany a database change; otherwise use
+    stage_publish_many with the change's session. Raises if the backend
+    could not send them; nothing is retried.
+
+    Args:
+        payloads: Dictionaries to broadcast (each will be JSON-encoded)
+    """
+    if payloads:
+        await _timed_publish(get_backend().publish_many(payloads), len(payloads), time.perf_counter())
 
 
 async def publish(payload: Dict[str, Any]) -> None:
     """
-    Publish event to all workers via PostgreSQL NOTIFY.
+    Publish one payload to all workers, outside any request transaction.
+    Raises like publish_many.
 
     Args:
         payload: Dictionary to broadcast (will be JSON-encoded)
     """
-    try:
-        conn = await _get_connection()
-        message = json.dumps(payload)
-        # PostgreSQL NOTIFY has a payload limit of ~8000 bytes
-        if len(message) > 7500:
-            logger.warning("Pub/sub message truncated due to size")
-            message = json.dumps({"type": payload.get("type"), "id": payload.get("id")})
-        # Use pg_notify to safely pass payload as a parameter.
-        await conn.execute("SELECT pg_notify($1, $2)", CHANNEL_NAME, message)
-    except Exception as e:
-        logger.error(f"Failed to publish to pub/sub: {e}")
-        # Reset connection on error
-        global _connection
-        _connection = None
+    await _timed_publish(get_backend().publish(payload), 1, time.perf_counter())
 
 
 def register_handler(handler: Callable[[Dict[str, Any]], Any]) -> None:
@@ -70,100 +211,14 @@ def register_handler(handler: Callable[[Dict[str, Any]], Any]) -> None:
         logger.info(f"Registered pub/sub handler: {handler.__name__}")
 
 
-async def _notification_callback(
-    conn: asyncpg.Connection,
-    pid: int,
-    channel: str,
-    payload: str
-) -> None:
-    """Handle incoming notifications from PostgreSQL."""
-    try:
-        data = json.loads(payload)
-        for handler in _handlers:
-            try:
-                result = handler(data)
-                if asyncio.iscoroutine(result):
-                    await result
-            except Exception as e:
-                logger.error(f"Handler error in pub/sub: {e}")
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to decode pub/sub message: {e}")
-
-
 async def start_listener() -> None:
-    """Start listening for PostgreSQL notifications."""
-    global _listen_task
-
-    if _listen_task is not None and not _listen_task.done():
-        logger.info("Pub/sub listener already running")
-        return
-
-    try:
-        conn = await _get_connection()
-        await conn.add_listener(CHANNEL_NAME, _notification_callback)
-        logger.info(f"Started listening on channel: {CHANNEL_NAME}")
-
-        # Keepalive task to maintain connection
-        async def keepalive():
-            while True:
-                try:
-                    await asyncio.sleep(30)
-                    if _connection and not _connection.is_closed():
-                        await _connection.execute("SELECT 1")
-                except asyncio.CancelledError:
-                    raise
-                except Exception as e:
-                    logger.warning(f"Pub/sub keepalive error: {e}")
-                    # Try to reconnect
-                    try:
-                        await _reconnect()
-                    except Exception:
-                        pass
-
-        _listen_task = asyncio.create_task(keepalive())
-
-    except Exception as e:
-        logger.error(f"Failed to start pub/sub listener: {e}")
-        raise
-
-
-async def _reconnect() -> None:
-    """Reconnect to PostgreSQL and re-register listener."""
-    global _connection
-
-    async with _lock:
-        if _connection and not _connection.is_closed():
-            try:
-                await _connection.remove_listener(CHANNEL_NAME, _notification_callback)
-                await _connection.close()
-            except Exception:
-                pass
-        _connection = None
-
-    conn = await _get_connection()
-    await conn.add_listener(CHANNEL_NAME, _notification_callback)
-    logger.info("Reconnected pub/sub listener")
+    """Start receiving messages from other workers."""
+    backend = get_backend()
+    await backend.start()
+    logger.info(f"Started {backend.name} pub/sub backend")
 
 
 async def stop_listener() -> None:
-    """Stop the listener and close connection."""
-    global _listen_task, _connection
-
-    if _listen_task:
-        _listen_task.cancel()
-        try:
-            await _listen_task
-        except asyncio.CancelledError:
-            pass
-        _listen_task = None
-        logger.info("Stopped pub/sub keepalive task")
-
-    async with _lock:
-        if _connection and not _connection.is_closed():
-            try:
-                await _connection.remove_listener(CHANNEL_NAME, _notification_callback)
-                await _connection.close()
-                logger.info("Closed pub/sub connection")
-            except Exception as e:
-                logger.error(f"Error closing pub/sub connection: {e}")
-        _connection = None
+    """Stop receiving messages and release the backend's connections."""
+    if _backend is not None:
+        await _backend.stop()
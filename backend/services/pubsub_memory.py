@@ -0,0 +1,72 @@
+"""
+In-process pub/sub backend, for a single worker, development and benchmarks.
+
+Messages never leave the process: publishing puts them on an asyncio queue
+and one task hands them to the handlers in order. Payloads are round-tripped
+through JSON so handlers see exactly what the other backends would deliver.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from services.pubsub import PubSubBackend, STREAM_ID_KEY, deliver
+
+logger = logging.getLogger(__name__)
+
+
+def initial_stream_id() -> int:
+    """
+    Starting stream_id for a process without shared state: the current time in microseconds.
+
+    Ids then keep increasing across restarts, so a client's Last-Event-ID from
+    before a restart can never match a message sent after it.
+    """
+    return time.time_ns() // 1000
+
+
+class InProcessBackend(PubSubBackend):
+    """Delivers messages to this process's own handlers. Only suitable for one worker."""
+
+    name = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._stream_ids = itertools.count(initial_stream_id())
+        self._dispatch_task: Optional[asyncio.Task] = None
+
+    async def publish_many(self, payloads: List[Dict[str, Any]]) -> None:
+        for payload in payloads:
+            self._queue.put_nowait(json.dumps(payload))
+
+    async def _dispatch(self) -> None:
+        while True:
+            message = await self._queue.get()
+            try:
+                data = json.loads(message)
+                data[STREAM_ID_KEY] = next(self._stream_ids)
+                await deliver(data)
+            except Exception as e:
+                logger.error(f"Failed to dispatch pub/sub message: {e}")
+
+    async def start(self) -> None:
+        await super().start()
+        if self._dispatch_task is None or self._dispatch_task.done():
+            self._dispatch_task = asyncio.create_task(self._dispatch())
+
+    async def stop(self) -> None:
+        await super().stop()
+        # Deliver what was already published before stopping
+        while not self._queue.empty() and self._dispatch_task and not self._dispatch_task.done():
+            await asyncio.sleep(0)
+        if self._dispatch_task:
+            self._dispatch_task.cancel()
+            try:
+                await self._dispatch_task
+            except asyncio.CancelledError:
+                pass
+            self._dispatch_task = None
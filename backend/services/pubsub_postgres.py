@@ -0,0 +1,494 @@
+"""
+PostgreSQL LISTEN/NOTIFY pub/sub backend, for workers sharing a database.
+
+Messages go through an outbox. stage_many writes the message to the
+pubsub_outbox table and issues the NOTIFY inside the caller's transaction,
+so a message is sent exactly when the change it describes commits, and
+never when it rolls back. The outbox id doubles as the SSE id.
+Messages without a surrounding transaction are published on a small
+asyncpg pool, separate from the listener connection.
+
+Publishers take no lock, so concurrent transactions can commit their ids
+out of order, and notifications arrive in commit order. Each worker puts
+them back in id order (_Sequencer): a message after a missing id is held
+until that one arrives, or for PUBSUB_GAP_SETTLE_MS, after which the
+missing id is taken as rolled back and skipped.
+
+NOTIFY payloads are limited to about 8000 bytes, so larger messages are
+notified as a reference and listeners read them from the outbox. Each
+worker remembers the last outbox id it delivered and the ids it skipped.
+After its listener reconnects it reads those and everything newer from the
+outbox, so messages notified while it was disconnected are delivered late
+rather than lost.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, Optional, List, Tuple
+
+import asyncpg
+from sqlalchemy import func, or_, text
+from sqlalchemy.orm import Session
+
+from config import get_settings
+from database import SessionLocal
+from models.app_setting import AppSetting
+from models.pubsub_outbox import PubSubOutboxMessage
+from services.pubsub import PubSubBackend, RESYNC_EVENT, STREAM_ID_KEY, deliver
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_NAME = "sse_events"
+SPILLED_KEY = "spilled"
+MAX_NOTIFY_BYTES = 7500
+OUTBOX_WATERMARK_KEY = "pubsub_outbox_purged_through"
+CATCH_UP_LIMIT = 1000
+# Skipped ids are still delivered if their transaction commits within this long
+SKIPPED_ID_MEMORY_SECONDS = 600
+
+# One statement queues a batch of messages and notifies each, in id order.
+# Callers fill in the two placeholders for their driver's parameter syntax.
+PUBLISH_SQL_TEMPLATE = f"""
+    WITH queued AS (
+        INSERT INTO pubsub_outbox (payload)
+        SELECT message.payload
+        FROM unnest({{payloads}}) WITH ORDINALITY AS message(payload, position)
+        ORDER BY message.position
+        RETURNING id, payload
+    )
+    SELECT pg_notify({{channel}}, CASE
+        WHEN octet_length(ordered.payload) > {MAX_NOTIFY_BYTES}
+            THEN jsonb_build_object('{STREAM_ID_KEY}', ordered.id, '{SPILLED_KEY}', true)
+        ELSE CAST(ordered.payload AS jsonb) || jsonb_build_object('{STREAM_ID_KEY}', ordered.id)
+    END::text)
+    FROM (SELECT id, payload FROM queued ORDER BY id) AS ordered
+"""
+STAGE_SQL = text(PUBLISH_SQL_TEMPLATE.format(payloads="CAST(:payloads AS text[])", channel=":channel"))
+PUBLISH_SQL = PUBLISH_SQL_TEMPLATE.format(payloads="$1::text[]", channel="$2")
+
+# Queued in place of a notification to make the dispatcher read the outbox
+_CATCH_UP = object()
+
+# A received message: its payload, and whether that is only a spilled reference
+Received = Tuple[str, bool]
+
+
+class _PublishConnection(asyncpg.Connection):
+    def get_reset_query(self) -> str:
+        # Publishing leaves no session state behind, so skip the reset round
+        # trip on every release
+        return ""
+
+
+class _Sequencer:
+    """
+    Puts outbox messages received in commit order back in id order.
+
+    position is the id up to which every message has been released or
+    skipped. A message above position + 1 is held until the ids before it
+    arrive, or until it has waited settle seconds; the missing ids are then
+    skipped, as a rolled-back transaction's are never filled. A skipped id
+    that does arrive later, from a transaction slow to commit, is released
+    at once, out of order, for SKIPPED_ID_MEMORY_SECONDS.
+    """
+
+    def __init__(self, position: int, settle: float):
+        self.position = position
+        self.settle = settle
+        # Held messages by id, with the time each arrived
+        self._held: Dict[int, Tuple[Received, float]] = {}
+        # Skipped ids, with the time each was skipped
+        self._skipped: Dict[int, float] = {}
+
+    @property
+    def skipped_ids(self) -> List[int]:
+        return sorted(self._skipped)
+
+    def skip(self, stream_ids: Iterable[int], now: float) -> None:
+        """Treat ids at or below position as not yet committed, so they are released if they arrive."""
+        for stream_id in stream_ids:
+            if stream_id <= self.position:
+                self._skipped[stream_id] = now
+
+    def receive(self, stream_id: int, item: Received, now: float) -> List[Tuple[int, Received]]:
+        """Take one message; returns the messages now ready, in order."""
+        if stream_id <= self.position:
+            if self._skipped.pop(stream_id, None) is None:
+                # Already released
+                return []
+            return [(stream_id, item)]
+        self._held.setdefault(stream_id, (item, now))
+        return self._release()
+
+    def deadline(self) -> Optional[float]:
+        """When the oldest gap has settled, or None if nothing is held."""
+        if not self._held:
+            return None
+        return self._held[min(self._held)][1] + self.settle
+
+    def expire(self, now: float) -> List[Tuple[int, Received]]:
+        """Skip gaps that have settled; returns the messages that releases, in order."""
+        for stream_id, skipped_at in list(self._skipped.items()):
+            if now - skipped_at > SKIPPED_ID_MEMORY_SECONDS:
+                del self._skipped[stream_id]
+        ready: List[Tuple[int, Received]] = []
+        while self._held and self.deadline() <= now:
+            first = min(self._held)
+            self._skipped.update((stream_id, now) for stream_id in range(self.position + 1, first))
+            self.position = first - 1
+            ready.extend(self._release())
+        return ready
+
+    def reset(self, position: int) -> None:
+        """Drop everything held or skipped and continue after position."""
+        self.position = position
+        self._held.clear()
+        self._skipped.clear()
+
+    def _release(self) -> List[Tuple[int, Received]]:
+        ready: List[Tuple[int, Received]] = []
+        while self.position + 1 in self._held:
+            self.position += 1
+            ready.append((self.position, self._held.pop(self.position)[0]))
+        return ready
+
+
+def _encode_payloads(payloads: List[Dict[str, Any]]) -> List[str]:
+    return [json.dumps(payload) for payload in payloads]
+
+
+def get_outbox_watermark(db: Session) -> int:
+    """Highest outbox id that may have been purged."""
+    setting = db.query(AppSetting).filter(AppSetting.key == OUTBOX_WATERMARK_KEY).first()
+    if not setting:
+        return 0
+    try:
+        return int(setting.value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _load_outbox_position() -> Tuple[int, List[int]]:
+    """
+    Return (the highest outbox id, the recent ids below it not in the outbox).
+
+    The missing ids were rolled back or belong to transactions yet to
+    commit, whose messages must still be delivered.
+    """
+    db = SessionLocal()
+    try:
+        watermark = get_outbox_watermark(db)
+        position = max(int(db.query(func.max(PubSubOutboxMessage.id)).scalar() or 0), watermark)
+        floor = max(position - CATCH_UP_LIMIT, watermark)
+        present = {
+            row.id for row in db.query(PubSubOutboxMessage.id).filter(PubSubOutboxMessage.id > floor)
+        }
+        return position, [stream_id for stream_id in range(floor + 1, position) if stream_id not in present]
+    finally:
+        db.close()
+
+
+def _load_outbox_message(stream_id: int) -> Optional[str]:
+    db = SessionLocal()
+    try:
+        return db.query(PubSubOutboxMessage.payload).filter(
+            PubSubOutboxMessage.id == stream_id
+        ).scalar()
+    finally:
+        db.close()
+
+
+def _load_outbox_after(after: int, skipped: List[int]) -> Tuple[int, List[Tuple[int, str]]]:
+    """Return (watermark, up to CATCH_UP_LIMIT + 1 messages after the given id or among the skipped ids)."""
+    db = SessionLocal()
+    try:
+        rows = db.query(PubSubOutboxMessage.id, PubSubOutboxMessage.payload).filter(
+            or_(PubSubOutboxMessage.id > after, PubSubOutboxMessage.id.in_(skipped))
+        ).order_by(PubSubOutboxMessage.id).limit(CATCH_UP_LIMIT + 1).all()
+        return get_outbox_watermark(db), [(row.id, row.payload) for row in rows]
+    finally:
+        db.close()
+
+
+def purge_outbox(db: Session) -> int:
+    """Delete outbox messages past retention and advance the watermark. Returns rows removed."""
+    settings = get_settings()
+    cutoff = datetime.utcnow() - timedelta(minutes=settings.PUBSUB_OUTBOX_RETENTION_MINUTES)
+
+    purged_through = db.query(func.max(PubSubOutboxMessage.id)).filter(
+        PubSubOutboxMessage.created_at < cutoff
+    ).scalar()
+    if purged_through is None:
+        return 0
+
+    removed = db.query(PubSubOutboxMessage).filter(
+        PubSubOutboxMessage.id <= purged_through
+    ).delete(synchronize_session=False)
+
+    setting = db.query(AppSetting).filter(AppSetting.key == OUTBOX_WATERMARK_KEY).first()
+    if setting:
+        setting.value = str(max(int(purged_through), get_outbox_watermark(db)))
+    else:
+        db.add(AppSetting(key=OUTBOX_WATERMARK_KEY, value=str(purged_through)))
+    db.commit()
+    return removed
+
+
+class PostgresBackend(PubSubBackend):
+    """Outbox plus LISTEN/NOTIFY. Works across any number of workers and hosts."""
+
+    name = "postgres"
+
+    def __init__(self, channel: str = CHANNEL_NAME):
+        super().__init__()
+        self.channel = channel
+        self._connection: Optional[asyncpg.Connection] = None
+        self._lock = asyncio.Lock()
+        self._publish_pool: Optional[asyncpg.Pool] = None
+        self._publish_pool_lock = asyncio.Lock()
+        # Payloads waiting for the next coalesced publish, with the future each caller awaits
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._listen_task: Optional[asyncio.Task] = None
+        self._dispatch_task: Optional[asyncio.Task] = None
+        self._inbox: Optional[asyncio.Queue] = None
+        self._sequencer: Optional[_Sequencer] = None
+
+    async def _get_connection(self) -> asyncpg.Connection:
+        """Get or create the asyncpg connection used for LISTEN."""
+        async with self._lock:
+            if self._connection is None or self._connection.is_closed():
+                settings = get_settings()
+                self._connection = await asyncpg.connect(settings.DATABASE_URL)
+                logger.info("Created new asyncpg connection for pub/sub")
+            return self._connection
+
+    async def _get_publish_pool(self) -> asyncpg.Pool:
+        """Get the publishing pool, creating it on first use. Separate from the listener connection."""
+        if self._publish_pool is not None:
+            return self._publish_pool
+        async with self._publish_pool_lock:
+            if self._publish_pool is None:
+                settings = get_settings()
+                self._publish_pool = await asyncpg.create_pool(
+                    settings.DATABASE_URL,
+                    min_size=1,
+                    max_size=settings.PUBSUB_PUBLISH_POOL_SIZE,
+                    connection_class=_PublishConnection
+                )
+                logger.info("Created asyncpg pool for pub/sub publishing")
+            return self._publish_pool
+
+    def stage_many(self, db: Session, payloads: List[Dict[str, Any]]) -> None:
+        """
+        Queue payloads in the outbox inside db's transaction.
+
+        Stage last, right before committing: until the transaction commits,
+        other workers hold back messages with later ids.
+        """
+        db.execute(STAGE_SQL, {"payloads": _encode_payloads(payloads), "channel": self.channel})
+
+    async def publish_many(self, payloads: List[Dict[str, Any]]) -> None:
+        """Queue and notify payloads in one round trip and transaction, on a pooled connection."""
+        pool = await self._get_publish_pool()
+        await pool.execute(PUBLISH_SQL, _encode_payloads(payloads), self.channel)
+
+    async def _flush_pending(self) -> None:
+        """Publish everything queued by publish, one batch per round trip, until the queue is empty."""
+        while self._pending:
+            batch = list(self._pending)
+            self._pending.clear()
+            try:
+                await self.publish_many([payload for payload, _ in batch])
+            except Exception as e:
+                for _, done in batch:
+                    if not done.done():
+                        done.set_exception(e)
+                continue
+            for _, done in batch:
+                if not done.done():
+                    done.set_result(None)
+
+    async def publish(self, payload: Dict[str, Any]) -> None:
+        """
+        Publish one payload, coalesced with concurrent calls.
+
+        Payloads queued while a batch is in flight go out together in the
+        next one, so publishers never queue for a connection one message at
+        a time. Returns once the payload's batch has been sent, and raises
+        if it could not be.
+        """
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        self._pending.append((payload, done))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_pending())
+        await done
+
+    def _notification_callback(
+        self,
+        conn: asyncpg.Connection,
+        pid: int,
+        channel: str,
+        payload: str
+    ) -> None:
+        """Queue incoming notifications from PostgreSQL for the dispatcher."""
+        if self._inbox is not None:
+            self._inbox.put_nowait(payload)
+
+    async def _deliver(self, stream_id: int, item: Received) -> None:
+        payload, spilled = item
+        if spilled:
+            payload = await asyncio.to_thread(_load_outbox_message, stream_id)
+            if payload is None:
+                logger.warning(f"Pub/sub message {stream_id} is no longer in the outbox")
+                await deliver({"type": RESYNC_EVENT})
+                return
+        data = json.loads(payload)
+        data[STREAM_ID_KEY] = stream_id
+        await deliver(data)
+
+    def _receive_notification(self, payload: str) -> List[Tuple[int, Received]]:
+        data = json.loads(payload)
+        stream_id = data.get(STREAM_ID_KEY)
+        if stream_id is None:
+            return []
+        return self._sequencer.receive(stream_id, (payload, bool(data.get(SPILLED_KEY))), time.monotonic())
+
+    async def _catch_up(self) -> List[Tuple[int, Received]]:
+        """Receive messages committed while the listener was disconnected."""
+        sequencer = self._sequencer
+        watermark, rows = await asyncio.to_thread(_load_outbox_after, sequencer.position, sequencer.skipped_ids)
+        if watermark > sequencer.position or len(rows) > CATCH_UP_LIMIT:
+            logger.warning("Pub/sub listener fell too far behind; asking streams to resync")
+            sequencer.reset(max([watermark, sequencer.position] + [stream_id for stream_id, _ in rows]))
+            await deliver({"type": RESYNC_EVENT})
+            return []
+
+        now = time.monotonic()
+        ready: List[Tuple[int, Received]] = []
+        for stream_id, payload in rows:
+            ready.extend(sequencer.receive(stream_id, (payload, False), now))
+        if rows:
+            logger.info(f"Pub/sub listener caught up on {len(rows)} messages")
+        return ready
+
+    async def _next_item(self):
+        """The next inbox item, or None once the oldest held gap has settled."""
+        deadline = self._sequencer.deadline()
+        if deadline is None:
+            return await self._inbox.get()
+        try:
+            return await asyncio.wait_for(self._inbox.get(), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            return None
+
+    async def _dispatch_notifications(self) -> None:
+        """Hand messages to handlers one at a time, in outbox order."""
+        while True:
+            item = await self._next_item()
+            try:
+                if item is None:
+                    ready = self._sequencer.expire(time.monotonic())
+                elif item is _CATCH_UP:
+                    ready = await self._catch_up()
+                else:
+                    ready = self._receive_notification(item)
+                for stream_id, received in ready:
+                    await self._deliver(stream_id, received)
+            except Exception as e:
+                logger.error(f"Failed to dispatch pub/sub message: {e}")
+                await deliver({"type": RESYNC_EVENT})
+
+    async def start(self) -> None:
+        """Start listening for PostgreSQL notifications."""
+        if self._listen_task is not None and not self._listen_task.done():
+            logger.info("Pub/sub listener already running")
+            return
+
+        try:
+            self._inbox = asyncio.Queue()
+            conn = await self._get_connection()
+            await conn.add_listener(self.channel, self._notification_callback)
+            # Anything committed before this point predates every stream, but
+            # ids below it still uncommitted may yet arrive
+            position, missing = await asyncio.to_thread(_load_outbox_position)
+            self._sequencer = _Sequencer(position, get_settings().PUBSUB_GAP_SETTLE_MS / 1000)
+            self._sequencer.skip(missing, time.monotonic())
+            self._dispatch_task = asyncio.create_task(self._dispatch_notifications())
+            logger.info(f"Started listening on channel: {self.channel}")
+            self._listen_task = asyncio.create_task(self._keepalive())
+        except Exception as e:
+            logger.error(f"Failed to start pub/sub listener: {e}")
+            raise
+
+    async def _keepalive(self) -> None:
+        """Keep the listener connection open, reconnecting when it drops."""
+        while True:
+            try:
+                await asyncio.sleep(30)
+                if self._connection and not self._connection.is_closed():
+                    await self._connection.execute("SELECT 1")
+                else:
+                    await self._reconnect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Pub/sub keepalive error: {e}")
+                # Try to reconnect
+                try:
+                    await self._reconnect()
+                except Exception:
+                    pass
+
+    async def _reconnect(self) -> None:
+        """Reconnect to PostgreSQL, re-register listener and catch up on missed messages."""
+        async with self._lock:
+            if self._connection and not self._connection.is_closed():
+                try:
+                    await self._connection.remove_listener(self.channel, self._notification_callback)
+                    await self._connection.close()
+                except Exception:
+                    pass
+            self._connection = None
+
+        conn = await self._get_connection()
+        await conn.add_listener(self.channel, self._notification_callback)
+        if self._inbox is not None:
+            self._inbox.put_nowait(_CATCH_UP)
+        logger.info("Reconnected pub/sub listener")
+
+    async def stop(self) -> None:
+        """Stop the listener and close connections."""
+        for task in (self._dispatch_task, self._listen_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._dispatch_task = None
+        self._listen_task = None
+
+        async with self._lock:
+            if self._connection and not self._connection.is_closed():
+                try:
+                    await self._connection.remove_listener(self.channel, self._notification_callback)
+                    await self._connection.close()
+                    logger.info("Closed pub/sub connection")
+                except Exception as e:
+                    logger.error(f"Error closing pub/sub connection: {e}")
+            self._connection = None
+
+        if self._flush_task and not self._flush_task.done():
+            # Let publishes already queued go out before the pool closes
+            await self._flush_task
+
+        async with self._publish_pool_lock:
+            if self._publish_pool is not None:
+                await self._publish_pool.close()
+                self._publish_pool = None
+                logger.info("Closed pub/sub publishing pool")
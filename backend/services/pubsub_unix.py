@@ -0,0 +1,200 @@
+"""
+Unix domain socket pub/sub backend, for several workers on one host.
+
+One worker runs a broker listening on PUBSUB_SOCKET_PATH, and every worker,
+that one included, connects to it as a client. The broker runs in whichever
+worker holds an exclusive flock on the socket's lock file; if that worker
+exits, the lock is released and another worker takes over.
+
+Frames are newline-delimited JSON. A client sends {"payloads": [...]} and
+receives each payload on its own line with a stream_id added. The broker
+numbers and forwards messages one frame at a time, so every client sees
+them in the same order. A worker that loses its connection tells its
+streams to resync after reconnecting, since it may have missed messages.
+"""
+
+import asyncio
+import fcntl
+import itertools
+import json
+import logging
+import os
+from typing import Any, Dict, IO, List, Optional, Set
+
+from config import get_settings
+from services.pubsub import PubSubBackend, RESYNC_EVENT, STREAM_ID_KEY, deliver
+from services.pubsub_memory import initial_stream_id
+
+logger = logging.getLogger(__name__)
+
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+# A client with more than this waiting to be sent is not keeping up; the broker drops it
+MAX_CLIENT_BUFFER_BYTES = 16 * 1024 * 1024
+RECONNECT_DELAY_SECONDS = 0.5
+CONNECT_TIMEOUT_SECONDS = 5
+
+
+class _Broker:
+    """Numbers messages from every client and forwards them to all clients."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._handler_tasks: Set[asyncio.Task] = set()
+        self._stream_ids = itertools.count(initial_stream_id())
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        # Only the lock holder gets here, so any existing socket is stale
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(
+            self._handle_client,
+            path=self.path,
+            limit=MAX_FRAME_BYTES
+        )
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._handler_tasks.add(task)
+        self._clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._forward(json.loads(line).get("payloads") or [])
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Pub/sub broker dropped a client: {e}")
+        finally:
+            self._clients.discard(writer)
+            self._handler_tasks.discard(task)
+            writer.close()
+
+    def _forward(self, payloads: List[Dict[str, Any]]) -> None:
+        lines = []
+        for payload in payloads:
+            payload[STREAM_ID_KEY] = next(self._stream_ids)
+            lines.append(json.dumps(payload))
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+
+        for writer in list(self._clients):
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER_BYTES:
+                logger.warning("Pub/sub broker dropped a client that stopped reading")
+                self._clients.discard(writer)
+                writer.close()
+                continue
+            writer.write(data)
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._clients):
+            writer.close()
+        self._clients.clear()
+        # Closed connections end each handler's read loop
+        await asyncio.gather(*self._handler_tasks, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class UnixSocketBackend(PubSubBackend):
+    """Workers on one host exchange messages through a broker on a Unix socket."""
+
+    name = "unix"
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        self.path = path or get_settings().PUBSUB_SOCKET_PATH
+        self._lock_file: Optional[IO] = None
+        self._broker: Optional[_Broker] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connected = asyncio.Event()
+        self._run_task: Optional[asyncio.Task] = None
+
+    def _acquire_broker_lock(self) -> bool:
+        lock_file = open(self.path + ".lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    async def _connect(self) -> asyncio.StreamReader:
+        if self._broker is None and self._acquire_broker_lock():
+            self._broker = _Broker(self.path)
+            await self._broker.start()
+            logger.info(f"Running pub/sub broker on {self.path} (pid {os.getpid()})")
+        reader, self._writer = await asyncio.open_unix_connection(self.path, limit=MAX_FRAME_BYTES)
+        return reader
+
+    async def _run(self) -> None:
+        """Stay connected to the broker, delivering what it sends, and take it over if it goes away."""
+        connected_before = False
+        while True:
+            try:
+                reader = await self._connect()
+            except OSError as e:
+                logger.debug(f"Pub/sub broker not reachable yet: {e}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+                continue
+
+            self._connected.set()
+            if connected_before:
+                await deliver({"type": RESYNC_EVENT})
+            connected_before = True
+
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    await deliver(json.loads(line))
+            except (ConnectionError, ValueError) as e:
+                logger.warning(f"Pub/sub broker connection error: {e}")
+            finally:
+                self._connected.clear()
+                self._writer.close()
+                self._writer = None
+
+            logger.warning("Lost connection to pub/sub broker; reconnecting")
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    async def publish_many(self, payloads: List[Dict[str, Any]]) -> None:
+        writer = self._writer
+        if writer is None:
+            raise ConnectionError(f"Not connected to pub/sub broker on {self.path}")
+        # Written before the first await, so frames leave in call order
+        writer.write((json.dumps({"payloads": payloads}) + "\n").encode("utf-8"))
+        await writer.drain()
+
+    async def start(self) -> None:
+        await super().start()
+        if self._run_task is not None and not self._run_task.done():
+            return
+        self._run_task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), CONNECT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning(f"Pub/sub broker on {self.path} not reachable yet; still trying")
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._run_task:
+            self._run_task.cancel()
+            try:
+                await self._run_task
+            except asyncio.CancelledError:
+                pass
+            self._run_task = None
+        if self._broker:
+            await self._broker.stop()
+            self._broker = None
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
@@ -0,0 +1,130 @@
+"""
+Per-request SQL statement profiling.
+
+Engine event listeners on both engines count each statement into the
+profile of the request running it, held in a context variable that the
+request's threadpool calls and run_sync greenlets share. The count feeds
+db_queries_per_request.
+
+With SQL_PROFILING or DEBUG, profiles also time statements and count runs
+of each statement text. SQLAlchemy binds values as parameters, so a lazy
+load repeated in a loop runs one text many times; QueryProfileMiddleware
+logs any text run SQL_REPEATED_STATEMENT_THRESHOLD times or more.
+
+Statements slower than SQL_SLOW_QUERY_MS are logged wherever they run,
+scheduler jobs included, with their plan if SQL_EXPLAIN_SLOW_QUERIES.
+"""
+
+import contextvars
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from config import get_settings
+from database import async_engine, engine
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+DETAILED = settings.SQL_PROFILING or settings.DEBUG
+SLOW_SECONDS = settings.SQL_SLOW_QUERY_MS / 1000
+# Statements EXPLAIN accepts
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+# Execution context attribute holding the statement's start time
+_STARTED_ATTR = "_query_profile_started"
+
+
+class QueryProfile:
+    """SQL statements run by one request."""
+
+    __slots__ = ("count", "seconds", "statements", "detailed")
+
+    def __init__(self, detailed: bool = DETAILED):
+        self.count = 0
+        self.seconds = 0.0
+        # Runs per statement text, when detailed
+        self.statements: Dict[str, int] = {}
+        self.detailed = detailed
+
+    @property
+    def duplicates(self) -> int:
+        """Runs of a statement text beyond its first."""
+        return self.count - len(self.statements) if self.detailed else 0
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement texts run at least threshold times, most frequent first."""
+        found = [(statement, runs) for statement, runs in self.statements.items() if runs >= threshold]
+        return sorted(found, key=lambda item: item[1], reverse=True)
+
+
+_current: contextvars.ContextVar[Optional[QueryProfile]] = contextvars.ContextVar("query_profile", default=None)
+
+
+def start() -> Tuple[QueryProfile, contextvars.Token]:
+    """Profile statements run from this context until stop(token)."""
+    profile = QueryProfile()
+    return profile, _current.set(profile)
+
+
+def stop(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    # On a raw cursor, so engine events do not see it. The savepoint keeps a
+    # failed EXPLAIN from aborting the caller's transaction.
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT query_profile_explain")
+        try:
+            cursor.execute("EXPLAIN " + statement, parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception as exc:
+            cursor.execute("ROLLBACK TO SAVEPOINT query_profile_explain")
+            plan = f"EXPLAIN failed: {exc}"
+        cursor.execute("RELEASE SAVEPOINT query_profile_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+def _log_slow_statement(conn, statement: str, parameters, executemany: bool, elapsed: float) -> None:
+    plan = None
+    if settings.SQL_EXPLAIN_SLOW_QUERIES and not executemany and statement.lstrip().upper().startswith(EXPLAINABLE):
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception as exc:
+            plan = f"EXPLAIN failed: {exc}"
+    if plan:
+        logger.warning("Slow SQL statement (%.1f ms): %s\n%s", elapsed * 1000, statement, plan)
+    else:
+        logger.warning("Slow SQL statement (%.1f ms): %s", elapsed * 1000, statement)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.count += 1
+    if context is not None and (SLOW_SECONDS or (profile is not None and profile.detailed)):
+        setattr(context, _STARTED_ATTR, time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = getattr(context, _STARTED_ATTR, None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    profile = _current.get()
+    if profile is not None and profile.detailed:
+        profile.seconds += elapsed
+        profile.statements[statement] = profile.statements.get(statement, 0) + 1
+    if SLOW_SECONDS and elapsed >= SLOW_SECONDS:
+        _log_slow_statement(conn, statement, parameters, executemany, elapsed)
+
+
+for _engine in (engine, async_engine.sync_engine):
+    event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
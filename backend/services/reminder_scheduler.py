@@ -1,22 +1,26 @@
 import asyncio
 import json
 import logging
+import time
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import Session, joinedload
 
 from config import get_settings
 from database import SessionLocal
-from models.app_setting import AppSetting
 from models.med_reminder import MedicationReminder
 from models.push_subscription import PushSubscription
 from models.user import User
 from services.med_reminder_service import calculate_next_due
 from services.notification_service import send_push_notifications
-from services import pubsub
+from services.idempotency import purge_expired_keys
+from services.change_feed import purge_expired_tombstones
+from services import metrics, pubsub
+from services.app_settings import get_setting
+from services.pubsub_postgres import purge_outbox
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +45,21 @@ def start_scheduler() -> None:
         max_instances=1,
         coalesce=True
     )
+    purges = [
+        ("idempotency_key_purge", "expired idempotency keys", purge_expired_keys, IntervalTrigger(hours=1)),
+        ("event_tombstone_purge", "event tombstones", purge_expired_tombstones, IntervalTrigger(hours=6)),
+    ]
+    if settings.PUBSUB_BACKEND == "postgres":
+        purges.append(("pubsub_outbox_purge", "pub/sub outbox messages", purge_outbox, IntervalTrigger(minutes=10)))
+    for job_id, name, purge, trigger in purges:
+        _scheduler.add_job(
+            _run_purge,
+            trigger,
+            args=(name, purge),
+            id=job_id,
+            max_instances=1,
+            coalesce=True
+        )
     _scheduler.start()
     logger.info("Reminder scheduler started")
 
@@ -55,13 +74,39 @@ def stop_scheduler() -> None:
 
 async def _run_due_scan() -> None:
     """Scan reminders and broadcast due notifications."""
+    started = time.perf_counter()
     try:
-        await _scan_due_reminders()
+        due_count = await _scan_due_reminders()
     except Exception as exc:
+        metrics.REMINDER_SCAN_FAILURES.inc()
         logger.exception("Reminder scan failed: %s", exc)
+    else:
+        metrics.REMINDERS_DUE.inc(amount=due_count)
+    finally:
+        metrics.REMINDER_SCAN_DURATION.observe(time.perf_counter() - started)
+
+
+async def _run_purge(name: str, purge: Callable[[Session], int]) -> None:
+    """Run a retention purge in a worker thread; name describes the rows it removes."""
+    try:
+        removed = await asyncio.to_thread(_purge, purge)
+    except Exception as exc:
+        logger.exception("Purge of %s failed: %s", name, exc)
+        return
+    if removed:
+        logger.info("Purged %s %s", removed, name)
+
+
+def _purge(purge: Callable[[Session], int]) -> int:
+    db = SessionLocal()
+    try:
+        return purge(db)
+    finally:
+        db.close()
 
 
-async def _scan_due_reminders() -> None:
+async def _scan_due_reminders() -> int:
+    """Notify reminders that have come due; returns how many did."""
     now = datetime.now(timezone.utc)
     db = SessionLocal()
     due_payloads: List[Dict[str, Any]] = []
@@ -95,20 +140,16 @@ async def _scan_due_reminders() -> None:
             due_payloads.append(payload)
 
         if due_payloads:
+            if notify_config["enable_in_app"]:
+                pubsub.stage_publish_many(db, due_payloads)
             db.commit()
 
     finally:
         db.close()
 
-    if not due_payloads:
-        return
-
-    if notify_config["enable_in_app"]:
-        for payload in due_payloads:
-            await pubsub.publish(payload)
-
-    if notify_config["enable_push"]:
+    if due_payloads and notify_config["enable_push"]:
         await asyncio.to_thread(_send_push_for_due, due_payloads)
+    return len(due_payloads)
 
 
 def _send_push_for_due(due_payloads: List[Dict[str, Any]]) -> None:
@@ -134,26 +175,26 @@ def _send_push_for_due(due_payloads: List[Dict[str, Any]]) -> None:
         db.close()
 
 
-def _get_notification_config(db) -> Dict[str, Any]:
-    setting = db.query(AppSetting).filter(AppSetting.key == "notifications").first()
-    defaults = {
-        "enable_push": False,
-        "enable_in_app": True,
-        "overdue_repeat_minutes": 60
-    }
-    if not setting:
-        return defaults
-    try:
-        payload = json.loads(setting.value)
-    except (json.JSONDecodeError, TypeError, ValueError):
-        return defaults
+NOTIFICATION_DEFAULTS = {
+    "enable_push": False,
+    "enable_in_app": True,
+    "overdue_repeat_minutes": 60
+}
+
+
+def _decode_notification_config(value: str) -> Dict[str, Any]:
+    payload = {**NOTIFICATION_DEFAULTS, **json.loads(value)}
     return {
-        "enable_push": bool(payload.get("enable_push", defaults["enable_push"])),
-        "enable_in_app": bool(payload.get("enable_in_app", defaults["enable_in_app"])),
-        "overdue_repeat_minutes": int(payload.get("overdue_repeat_minutes", defaults["overdue_repeat_minutes"]))
+        "enable_push": bool(payload["enable_push"]),
+        "enable_in_app": bool(payload["enable_in_app"]),
+        "overdue_repeat_minutes": int(payload["overdue_repeat_minutes"])
     }
 
 
+def _get_notification_config(db) -> Dict[str, Any]:
+    return get_setting(db, "notifications", _decode_notification_config, NOTIFICATION_DEFAULTS)
+
+
 def _should_skip_due_notification(
     reminder: MedicationReminder,
     next_due: datetime,
@@ -1,6 +1,11 @@
 """Shared utility functions for the Care Docs API."""
 
+import uuid
 from datetime import datetime, timezone
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
 
 
 def to_utc_iso(value: datetime) -> str:
@@ -13,5 +18,32 @@ def to_utc_iso(value: datetime) -> str:
         ISO 8601 formatted string in UTC timezone
     """
     if value.tzinfo is None:
-        value = value.replace(tzinfo=timezone.utc)
+        # Stored timestamps are naive UTC; skip the timezone conversion
+        return value.isoformat() + "+00:00"
     return value.astimezone(timezone.utc).isoformat()
+
+
+def _json_default(value: Any) -> Any:
+    # asyncpg returns its own uuid.UUID subclass, which orjson only takes as a fallback
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered by orjson, for list endpoints returning plain dicts.
+
+    UUIDs and datetimes are serialized natively. With naive_utc (the default)
+    naive datetimes get a +00:00 suffix, matching to_utc_iso; without it they
+    are written like datetime.isoformat(). Returning a response directly also
+    skips FastAPI's response_model validation, so the content must already
+    match the declared model.
+    """
+
+    def __init__(self, content: Any, naive_utc: bool = True, **kwargs):
+        self.option = orjson.OPT_NAIVE_UTC if naive_utc else 0
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_json_default, option=self.option)
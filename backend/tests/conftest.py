@@ -0,0 +1,147 @@
+"""
+Shared fixtures.
+
+Tests that touch the database run against TEST_DATABASE_URL, a Postgres
+database whose public schema they drop and recreate; they are skipped when
+it is not set. Pub/sub uses the in-process backend, the reminder
+scheduler stays off and SQL profiling is on.
+"""
+
+import os
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+# Read by config.get_settings(), so set before any app module is imported
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-" + "x" * 32)
+os.environ["PUBSUB_BACKEND"] = "memory"
+os.environ["SCHEDULER_ENABLED"] = "false"
+os.environ["SQL_PROFILING"] = "true"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import database
+import models  # noqa: F401  (registers every table on Base.metadata)
+from models.care_recipient import CareRecipient
+from models.event import Event
+from models.user import User
+from models.user_recipient_access import UserRecipientAccess
+from services import app_settings, identity_cache
+from services.auth_service import create_access_token
+
+
+@pytest.fixture(scope="session")
+def schema():
+    """A fresh schema, created the way startup creates it."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    with database.engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+        has_trigrams = conn.scalar(text("SELECT count(*) FROM pg_available_extensions WHERE name = 'pg_trgm'"))
+    if not has_trigrams:
+        # Postgres without contrib: search falls back to sequential scans
+        for index in list(Event.__table__.indexes):
+            if index.name == "ix_events_search_text_trgm":
+                Event.__table__.indexes.discard(index)
+        database.Base.metadata.create_all(bind=database.engine)
+    else:
+        database.init_db()
+
+
+@pytest.fixture(scope="session")
+def client(schema):
+    """
+    One client, and so one event loop, for the whole session: the async
+    pool's connections belong to the loop that opened them.
+    """
+    import main
+
+    # The schema fixture has already created the tables startup would
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(main, "init_db", lambda: None)
+        with TestClient(main.app) as test_client:
+            yield test_client
+
+
+@pytest.fixture(autouse=True)
+def clean_tables(request):
+    """Empty every table and per-worker cache before each database test."""
+    if "schema" not in request.fixturenames:
+        yield
+        return
+    tables = ", ".join(table.name for table in database.Base.metadata.sorted_tables)
+    with database.engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} CASCADE"))
+    identity_cache.clear()
+    app_settings.clear()
+    yield
+
+
+@pytest.fixture
+def db(schema):
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def auth_headers(user: User) -> dict:
+    return {"Authorization": "Bearer " + create_access_token({"sub": str(user.id)})}
+
+
+@pytest.fixture
+def admin(db):
+    user = User(username="admin", email="admin@example.com", password_hash="x", role="admin")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def caregiver(db):
+    user = User(username="caregiver", email="caregiver@example.com", password_hash="x", role="caregiver")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def recipients(db, admin, caregiver):
+    """Two recipients; the caregiver may see only the first."""
+    first = CareRecipient(name="First", created_by_user_id=admin.id)
+    second = CareRecipient(name="Second", created_by_user_id=admin.id)
+    db.add_all([first, second])
+    db.commit()
+    db.add(UserRecipientAccess(user_id=caregiver.id, recipient_id=first.id))
+    db.commit()
+    return str(first.id), str(second.id)
+
+
+@pytest.fixture
+def admin_headers(admin):
+    return auth_headers(admin)
+
+
+@pytest.fixture
+def caregiver_headers(caregiver):
+    return auth_headers(caregiver)
+
+
+@pytest.fixture
+def create_event(client, admin_headers):
+    """Create an event through the API and return its JSON."""
+    def create(recipient_id: str, type: str = "diaper", headers: dict = None, **fields) -> dict:
+        response = client.post(
+            "/api/events/",
+            json={"type": type, "recipient_id": recipient_id, **fields},
+            headers=headers or admin_headers
+        )
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return create
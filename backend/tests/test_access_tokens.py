@@ -0,0 +1,151 @@
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+import database
+from models.user import User
+from models.user_recipient_access import UserRecipientAccess
+from services import identity_cache
+from services.access_control import load_authz_versions
+from services.auth_service import create_access_token, decode_token, get_password_hash
+
+
+def claims_headers(user: User, recipient_ids, **claims) -> dict:
+    """Headers with the token login would issue the user now."""
+    token = create_access_token({
+        "sub": str(user.id),
+        "username": user.username,
+        "role": user.role,
+        "active": user.is_active,
+        "recipient_ids": recipient_ids,
+        "authz_version": user.authz_version,
+        **claims,
+    })
+    return {"Authorization": "Bearer " + token}
+
+
+@contextmanager
+def identity_queries():
+    """Statements reading users or recipient access on either engine while in the block."""
+    statements = []
+    tables = (User.__tablename__, UserRecipientAccess.__tablename__)
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if any(f"FROM {table}" in statement for table in tables):
+            statements.append(statement)
+
+    engines = (database.engine, database.async_engine.sync_engine)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", record)
+
+
+def wait_for_version(user: User, version: int) -> None:
+    """Wait for the access.changed message announcing version to reach this worker."""
+    started = time.monotonic()
+    while identity_cache.authz_version(user.id) != version and time.monotonic() - started < 5:
+        time.sleep(0.02)
+    assert identity_cache.authz_version(user.id) == version
+
+
+def test_access_token_carries_identity_role_status_and_scope(client, db, caregiver, recipients):
+    caregiver.password_hash = get_password_hash("Care-password1")
+    db.commit()
+
+    response = client.post("/api/auth/login", json={"username": "caregiver", "password": "Care-password1"})
+    client.cookies.clear()
+    assert response.status_code == 200, response.text
+    claims = decode_token(response.json()["access_token"])
+
+    assert claims["sub"] == str(caregiver.id)
+    assert claims["username"] == "caregiver"
+    assert claims["role"] == "caregiver"
+    assert claims["active"] is True
+    assert claims["recipient_ids"] == [recipients[0]]
+    assert claims["authz_version"] == caregiver.authz_version
+
+
+def test_current_claims_need_no_identity_queries(client, caregiver, recipients):
+    first, second = recipients
+    load_authz_versions()
+    headers = claims_headers(caregiver, [first])
+
+    with identity_queries() as statements:
+        assert client.get("/api/events/", params={"recipient_id": first}, headers=headers).status_code == 200
+        assert client.get("/api/events/", params={"recipient_id": second}, headers=headers).status_code == 403
+
+    assert statements == []
+
+
+def test_unknown_authz_version_loads_the_user(client, caregiver, recipients):
+    headers = claims_headers(caregiver, [recipients[0]])
+
+    with identity_queries() as statements:
+        assert client.get("/api/events/", headers=headers).status_code == 200
+    assert statements
+
+    # The load taught this worker the version
+    assert identity_cache.authz_version(caregiver.id) == caregiver.authz_version
+
+
+def test_claims_from_before_an_access_change_are_not_trusted(client, db, admin_headers, caregiver, recipients):
+    first, second = recipients
+    load_authz_versions()
+    old_headers = claims_headers(caregiver, [first])
+
+    response = client.put(f"/api/auth/users/{caregiver.id}/recipients", json={"recipient_ids": [second]}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    db.refresh(caregiver)
+    wait_for_version(caregiver, caregiver.authz_version)
+
+    assert client.get("/api/events/", params={"recipient_id": first}, headers=old_headers).status_code == 403
+    assert client.get("/api/events/", params={"recipient_id": second}, headers=old_headers).status_code == 200
+
+    identity_cache.clear()
+    load_authz_versions()
+    with identity_queries() as statements:
+        response = client.get("/api/events/", params={"recipient_id": second}, headers=claims_headers(caregiver, [second]))
+    assert response.status_code == 200
+    assert statements == []
+
+
+def test_deactivated_user_is_refused_despite_active_claims(client, db, admin_headers, caregiver, recipients):
+    load_authz_versions()
+    old_headers = claims_headers(caregiver, [recipients[0]])
+
+    response = client.patch(f"/api/auth/users/{caregiver.id}", json={"is_active": False}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    db.refresh(caregiver)
+    wait_for_version(caregiver, caregiver.authz_version)
+
+    response = client.get("/api/events/", headers=old_headers)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "User account is inactive"
+
+
+def test_deleted_user_is_refused(client, admin_headers, caregiver, recipients):
+    load_authz_versions()
+    old_headers = claims_headers(caregiver, [recipients[0]])
+
+    assert client.delete(f"/api/auth/users/{caregiver.id}", headers=admin_headers).status_code == 200
+
+    assert client.get("/api/events/", headers=old_headers).status_code == 401
+
+
+def test_profile_routes_load_the_whole_user(client, caregiver, recipients):
+    load_authz_versions()
+    headers = claims_headers(caregiver, [recipients[0]])
+
+    response = client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["email"] == "caregiver@example.com"
+
+    response = client.patch("/api/auth/me", json={"display_name": "Care Giver"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["display_name"] == "Care Giver"
+    assert response.json()["email"] == "caregiver@example.com"
@@ -0,0 +1,122 @@
+import pytest
+
+import database
+from models.app_setting import AppSetting
+from services import app_settings, query_profile
+from services.app_settings import SETTINGS_CHANGED_EVENT, get_setting, set_setting
+
+KEY = "test_setting"
+
+
+def write_directly(value, version):
+    """Change the row as another worker would, without this worker's cache hearing of it."""
+    session = database.SessionLocal()
+    try:
+        setting = session.get(AppSetting, KEY)
+        if setting is None:
+            session.add(AppSetting(key=KEY, value=value, version=version))
+        else:
+            setting.value = value
+            setting.version = version
+        session.commit()
+    finally:
+        session.close()
+
+
+def read(db, **kwargs):
+    """(value, statements run) for one get_setting call."""
+    profile, token = query_profile.start()
+    try:
+        value = get_setting(db, KEY, **kwargs)
+    finally:
+        query_profile.stop(token)
+    db.rollback()
+    return value, profile.count
+
+
+@pytest.fixture
+def cached(db):
+    write_directly("one", 1)
+    assert read(db) == ("one", 1)
+    assert read(db) == ("one", 0)
+
+
+def test_settings_changed_drops_other_workers_entries(db, cached):
+    write_directly("two", 2)
+    assert read(db) == ("one", 0)
+
+    app_settings.handle_message({"type": SETTINGS_CHANGED_EVENT, "key": KEY, "version": 2})
+
+    assert read(db) == ("two", 1)
+
+
+def test_older_settings_changed_keeps_a_newer_entry(db, cached):
+    write_directly("two", 2)
+    app_settings.handle_message({"type": SETTINGS_CHANGED_EVENT, "key": KEY, "version": 2})
+    assert read(db) == ("two", 1)
+
+    # Delivered late, after this worker already loaded version 2
+    app_settings.handle_message({"type": SETTINGS_CHANGED_EVENT, "key": KEY, "version": 1})
+    assert read(db) == ("two", 0)
+
+
+def test_resync_clears_every_entry(db, cached):
+    write_directly("two", 2)
+    app_settings.handle_message({"type": "stream.resync"})
+
+    assert read(db) == ("two", 1)
+
+
+def test_local_changes_are_seen_once_committed(db, cached):
+    set_setting(db, KEY, "two")
+    db.commit()
+
+    assert read(db) == ("two", 1)
+    assert db.get(AppSetting, KEY).version == 2
+
+
+def test_load_that_raced_a_change_is_not_cached(db):
+    write_directly("one", 1)
+    raced = []
+
+    def racing_decode(value):
+        # Another request changes the setting after this one read the row
+        if not raced:
+            raced.append(value)
+            write_directly("two", 2)
+            app_settings.invalidate(KEY, 2)
+        return value
+
+    assert get_setting(db, KEY, racing_decode) == "one"
+    db.rollback()
+    assert read(db, decode=racing_decode) == ("two", 1)
+
+
+def test_stale_load_does_not_replace_a_newer_entry(db):
+    write_directly("one", 1)
+    loads = []
+
+    def racing_decode(value):
+        # While this load holds version 1, another reader caches version 2;
+        # no invalidation comes between, so only the versions tell them apart
+        if not loads:
+            loads.append(value)
+            write_directly("two", 2)
+            other = database.SessionLocal()
+            try:
+                assert get_setting(other, KEY, racing_decode) == "two"
+            finally:
+                other.close()
+        return value
+
+    assert get_setting(db, KEY, racing_decode) == "one"
+    db.rollback()
+    assert read(db, decode=racing_decode) == ("two", 0)
+
+
+def test_for_update_bypasses_the_cache(db, cached):
+    write_directly("two", 2)
+
+    assert read(db, for_update=True) == ("two", 1)
+    # Nor does it refresh the cache
+    assert read(db) == ("one", 0)
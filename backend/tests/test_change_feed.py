@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+import database
+from models.event import Event
+from models.event_tombstone import EventTombstone
+from services.change_feed import mark_event_changed, purge_expired_tombstones
+
+
+def changes(client, headers, **params):
+    response = client.get("/api/events/changes", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def position(client, headers):
+    return changes(client, headers)["next_since"]
+
+
+def test_resume_sees_creates_updates_and_deletes(client, admin_headers, recipients, create_event):
+    first = recipients[0]
+    kept = create_event(first, notes="kept")
+    removed = create_event(first, notes="removed")
+    since = position(client, admin_headers)
+
+    added = create_event(first, notes="added")
+    client.patch(f"/api/events/{kept['id']}", json={"notes": "edited"}, headers=admin_headers)
+    assert client.delete(f"/api/events/{removed['id']}", headers=admin_headers).status_code == 204
+
+    body = changes(client, admin_headers, since=since)
+
+    assert [(event["id"], event["notes"]) for event in body["events"]] == [(added["id"], "added"), (kept["id"], "edited")]
+    assert body["deleted"] == [{"id": removed["id"], "recipient_id": first}]
+    assert body["next_since"] > since
+    assert not body["has_more"]
+    assert changes(client, admin_headers, since=body["next_since"])["events"] == []
+
+
+def test_event_created_and_deleted_after_since_is_only_a_tombstone(client, admin_headers, recipients, create_event):
+    since = position(client, admin_headers)
+    event = create_event(recipients[0])
+    client.delete(f"/api/events/{event['id']}", headers=admin_headers)
+
+    body = changes(client, admin_headers, since=since)
+
+    assert body["events"] == []
+    assert [deleted["id"] for deleted in body["deleted"]] == [event["id"]]
+
+
+def test_move_between_recipients(client, admin_headers, caregiver_headers, recipients, create_event):
+    first, second = recipients
+    event = create_event(first)
+    since = position(client, admin_headers)
+
+    client.patch(f"/api/events/{event['id']}", json={"recipient_id": second}, headers=admin_headers)
+
+    # The caregiver only sees the first recipient, where the event is gone
+    caregiver_view = changes(client, caregiver_headers, since=since)
+    assert caregiver_view["events"] == []
+    assert caregiver_view["deleted"] == [{"id": event["id"], "recipient_id": first}]
+    # Seeing both, it was moved, not deleted
+    admin_view = changes(client, admin_headers, since=since)
+    assert [moved["recipient_id"] for moved in admin_view["events"]] == [second]
+    assert admin_view["deleted"] == []
+
+
+def test_pages_through_changes(client, admin_headers, recipients, create_event):
+    since = position(client, admin_headers)
+    created = [create_event(recipients[0])["id"] for _ in range(5)]
+
+    seen = []
+    while True:
+        body = changes(client, admin_headers, since=since, limit=2)
+        seen.extend(event["id"] for event in body["events"])
+        since = body["next_since"]
+        if not body["has_more"]:
+            break
+
+    assert seen == created
+
+
+def test_purged_tombstones_require_a_resync(client, db, admin_headers, recipients, create_event):
+    event = create_event(recipients[0])
+    since = position(client, admin_headers)
+    client.delete(f"/api/events/{event['id']}", headers=admin_headers)
+    db.query(EventTombstone).update({EventTombstone.deleted_at: datetime.utcnow() - timedelta(days=365)})
+    db.commit()
+
+    assert purge_expired_tombstones(db) == 1
+
+    body = changes(client, admin_headers, since=since)
+    assert body["resync_required"]
+    assert body["next_since"] > since
+
+
+def test_sequence_follows_commit_order(client, admin, recipients):
+    early = database.SessionLocal()
+    late = database.SessionLocal()
+    try:
+        # Written first but committed last
+        slow = Event(type="diaper", user_id=admin.id, recipient_id=recipients[0])
+        early.add(slow)
+        mark_event_changed(early, slow)
+        early.flush()
+
+        fast = Event(type="diaper", user_id=admin.id, recipient_id=recipients[0])
+        late.add(fast)
+        mark_event_changed(late, fast)
+        late.commit()
+
+        early.commit()
+        seqs = dict(late.execute(text("SELECT id, change_seq FROM events")).all())
+        assert seqs[slow.id] > seqs[fast.id]
+    finally:
+        early.close()
+        late.close()
+
+
+def test_commit_skips_rows_another_transaction_holds(client, db, admin, recipients, create_event):
+    event_id = create_event(recipients[0])["id"]
+    first = database.SessionLocal()
+    second = database.SessionLocal()
+    try:
+        # An update undone by a savepoint, as a failed batch operation is
+        event = first.get(Event, event_id)
+        savepoint = first.begin_nested()
+        event.notes = "undone"
+        mark_event_changed(first, event)
+        first.flush()
+        savepoint.rollback()
+
+        other = second.get(Event, event_id)
+        other.notes = "held"
+        mark_event_changed(second, other)
+        second.flush()
+
+        # Waiting on the held row would never end: the second transaction commits after this one
+        first.execute(text("SET LOCAL lock_timeout = '2s'"))
+        first.commit()
+        second.commit()
+    finally:
+        first.close()
+        second.close()
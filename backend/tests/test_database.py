@@ -0,0 +1,47 @@
+import re
+from pathlib import Path
+
+import pytest
+
+import database
+from config import Settings
+from routes import settings as settings_routes
+
+PROD_COMPOSE = Path(__file__).resolve().parents[2] / "docker-compose.prod.yml"
+
+
+def test_pools_fit_the_production_database():
+    if not PROD_COMPOSE.exists():
+        pytest.skip("docker-compose.prod.yml is not in this checkout")
+    compose = PROD_COMPOSE.read_text()
+    max_connections = int(re.search(r"max_connections=(\d+)", compose).group(1))
+    workers = int(re.search(r"WEB_CONCURRENCY=\$\{WEB_CONCURRENCY:-(\d+)\}", compose).group(1))
+
+    defaults = Settings(JWT_SECRET_KEY="x" * 32)
+
+    assert defaults.DB_MAX_CONNECTIONS == max_connections
+    assert workers * defaults.db_connections_per_worker() <= max_connections - defaults.DB_RESERVED_CONNECTIONS
+
+
+def test_aware_timestamps_are_stored_as_utc(client, admin_headers, recipients, create_event):
+    event = create_event(recipients[0], timestamp="2025-01-02T05:00:00+02:00")
+
+    response = client.get(f"/api/events/{event['id']}", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["timestamp"].startswith("2025-01-02T03:00:00")
+
+
+def test_sync_handlers_hold_no_async_connection(client, admin_headers, monkeypatch):
+    checked_out = []
+    get_setting = settings_routes.get_setting
+
+    def recording_get_setting(*args, **kwargs):
+        checked_out.append(database.async_engine.sync_engine.pool.checkedout())
+        return get_setting(*args, **kwargs)
+
+    monkeypatch.setattr(settings_routes, "get_setting", recording_get_setting)
+    # The identity cache is empty, so authentication loads the user
+    response = client.get("/api/settings/timezone", headers=admin_headers)
+
+    assert response.status_code == 200, response.text
+    assert checked_out == [0]
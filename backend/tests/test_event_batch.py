@@ -0,0 +1,73 @@
+def post_batch(client, headers, operations, **kwargs):
+    response = client.post("/api/events/batch", json={"operations": operations}, headers=headers, **kwargs)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def list_events(client, headers):
+    return client.get("/api/events/", headers=headers).json()
+
+
+def test_failed_operations_do_not_undo_the_others(client, admin_headers, caregiver_headers, recipients):
+    first, second = recipients
+    body = post_batch(client, caregiver_headers, [
+        {"op": "create", "client_id": "temp_a", "data": {"type": "diaper", "recipient_id": first}},
+        {"op": "update", "event_id": "temp_a", "data": {"notes": "edited"}},
+        {"op": "create", "client_id": "temp_b", "data": {"type": "bogus", "recipient_id": first}},
+        {"op": "create", "client_id": "temp_c", "data": {"type": "diaper", "recipient_id": second}},
+        {"op": "create", "client_id": "temp_d", "data": {"type": "observation", "recipient_id": first}},
+        {"op": "delete", "event_id": "temp_d"},
+        {"op": "update", "event_id": "not-a-uuid", "data": {}},
+        {"op": "create", "data": {"notes": 123}},
+    ])
+
+    assert [result["status"] for result in body["results"]] == [201, 200, 400, 403, 201, 204, 400, 422]
+    assert body["results"][1]["event"]["notes"] == "edited"
+    assert body["results"][2]["error"]
+    assert set(body["id_map"]) == {"temp_a", "temp_d"}
+
+    events = list_events(client, admin_headers)
+    assert [(event["id"], event["notes"], event["created_offline"]) for event in events] == [
+        (body["id_map"]["temp_a"], "edited", True)
+    ]
+    stats = client.get("/api/events/stats/summary", headers=admin_headers).json()
+    assert stats["total"] == 1
+
+
+def test_operations_on_missing_events_fail_alone(client, admin_headers, recipients, create_event):
+    existing = create_event(recipients[0])
+    body = post_batch(client, admin_headers, [
+        {"op": "delete", "event_id": "8d2b7c4e-0c52-4f3e-9a63-1f2e3d4c5b6a"},
+        {"op": "update", "event_id": existing["id"], "data": {"notes": "kept"}},
+        {"op": "update", "data": {"notes": "no target"}},
+    ])
+
+    assert [result["status"] for result in body["results"]] == [404, 200, 400]
+    assert list_events(client, admin_headers)[0]["notes"] == "kept"
+
+
+def test_batch_is_announced_once_per_recipient(client, admin_headers, recipients, monkeypatch):
+    from routes import events as event_routes
+
+    staged = []
+    monkeypatch.setattr(event_routes, "stage_broadcast", lambda db, payload: staged.append(payload))
+    first, second = recipients
+
+    post_batch(client, admin_headers, [
+        {"op": "create", "data": {"type": "diaper", "recipient_id": first}},
+        {"op": "create", "data": {"type": "feeding", "recipient_id": first}},
+        {"op": "create", "data": {"type": "feeding", "recipient_id": second}},
+    ])
+
+    assert {payload["recipient_id"]: len(payload["created"]) for payload in staged} == {first: 2, second: 1}
+    assert len(staged) == 2
+    assert all(payload["type"] == "event.batch" for payload in staged)
+
+
+def test_batch_is_limited_in_size(client, admin_headers, recipients):
+    from routes.events import MAX_BATCH_OPERATIONS
+
+    operations = [{"op": "create", "data": {"type": "diaper", "recipient_id": recipients[0]}}] * (MAX_BATCH_OPERATIONS + 1)
+    response = client.post("/api/events/batch", json={"operations": operations}, headers=admin_headers)
+
+    assert response.status_code == 422
@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+
+import pytest
+
+from routes import events as event_routes
+
+
+def export(client, headers, **params):
+    response = client.get("/api/events/export", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def csv_rows(response):
+    return list(csv.DictReader(io.StringIO(response.text)))
+
+
+@pytest.mark.parametrize("notes", ["=SUM(A1:A9)", "+1", "-2", "@cmd", "\tindented"])
+def test_csv_escapes_formula_prefixes(client, admin_headers, recipients, create_event, notes):
+    create_event(recipients[0], notes=notes)
+
+    rows = csv_rows(export(client, admin_headers))
+
+    assert [row["notes"] for row in rows] == ["'" + notes]
+
+
+def test_csv_lists_events_oldest_first(client, admin_headers, recipients, create_event):
+    first, second = recipients
+    later = create_event(first, type="feeding", timestamp="2025-01-02T10:00:00Z", notes="plain", metadata={"amount_ml": 90})
+    earlier = create_event(second, timestamp="2025-01-01T10:00:00Z")
+
+    response = export(client, admin_headers)
+
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"].startswith('attachment; filename="care-events-')
+    assert response.text.splitlines()[0] == ",".join(event_routes.EXPORT_CSV_FIELDS)
+    rows = csv_rows(response)
+    assert [row["id"] for row in rows] == [earlier["id"], later["id"]]
+    assert rows[1]["notes"] == "plain"
+    assert rows[1]["timestamp"] == later["timestamp"]
+    assert json.loads(rows[1]["metadata"]) == {"amount_ml": 90}
+
+
+def test_ndjson_is_one_event_per_line(client, admin_headers, recipients, create_event):
+    created = [create_event(recipients[0], timestamp=f"2025-01-0{day}T10:00:00Z", notes="line\nbreak") for day in (1, 2, 3)]
+
+    response = export(client, admin_headers, format="ndjson")
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.endswith("\n")
+    lines = response.text.split("\n")[:-1]
+    exported = [json.loads(line) for line in lines]
+    assert [event["id"] for event in exported] == [event["id"] for event in created]
+    assert exported[0]["notes"] == "line\nbreak"
+    assert exported[0]["recipient_id"] == recipients[0]
+
+
+def test_chunks_end_on_row_boundaries(recipients, create_event, monkeypatch):
+    for day in range(1, 6):
+        create_event(recipients[0], timestamp=f"2025-01-0{day}T10:00:00Z", notes="x" * 50)
+    monkeypatch.setattr(event_routes, "EXPORT_CHUNK_BYTES", 100)
+
+    chunks = list(event_routes.iter_event_export("ndjson", None, None, None, None, None, None))
+
+    assert len(chunks) > 1
+    assert all(chunk.endswith("\n") for chunk in chunks)
+    assert len("".join(chunks).splitlines()) == 5
+
+
+def test_export_covers_only_permitted_recipients(client, caregiver_headers, recipients, create_event):
+    first, second = recipients
+    allowed = create_event(first)
+    create_event(second)
+
+    assert [row["id"] for row in csv_rows(export(client, caregiver_headers))] == [allowed["id"]]
+    lines = export(client, caregiver_headers, format="ndjson").text.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [allowed["id"]]
+
+    response = client.get("/api/events/export", params={"recipient_id": second}, headers=caregiver_headers)
+    assert response.status_code == 403
+
+
+def test_export_without_recipient_access_is_empty(client, admin_headers, caregiver, caregiver_headers, recipients, create_event):
+    create_event(recipients[0])
+    response = client.put(f"/api/auth/users/{caregiver.id}/recipients", json={"recipient_ids": []}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+    assert csv_rows(export(client, caregiver_headers)) == []
+    assert export(client, caregiver_headers, format="ndjson").text == ""
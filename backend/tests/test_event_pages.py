@@ -0,0 +1,84 @@
+import base64
+import json
+
+import pytest
+
+
+def walk_pages(client, headers, **params):
+    events, cursor = [], None
+    while True:
+        response = client.get("/api/events/page", params={**params, **({"cursor": cursor} if cursor else {})}, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        events.extend(page["events"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return events
+
+
+def test_pages_cover_every_event_once_in_order(client, admin_headers, recipients, create_event):
+    first, second = recipients
+    # Shared timestamps make the id the tiebreaker
+    created = [
+        create_event(first if index % 2 else second, timestamp=f"2025-01-0{1 + index // 3}T08:00:00Z")
+        for index in range(8)
+    ]
+
+    events = walk_pages(client, admin_headers, limit=3)
+
+    assert sorted(event["id"] for event in events) == sorted(event["id"] for event in created)
+    positions = [(event["timestamp"], event["id"]) for event in events]
+    assert positions == sorted(positions, reverse=True)
+
+
+def test_last_page_has_no_cursor(client, admin_headers, recipients, create_event):
+    create_event(recipients[0])
+    create_event(recipients[0])
+
+    page = client.get("/api/events/page", params={"limit": 2}, headers=admin_headers).json()
+
+    assert len(page["events"]) == 2
+    assert page["next_cursor"] is None
+
+
+def test_pages_keep_filters(client, admin_headers, recipients, create_event):
+    first, second = recipients
+    for index in range(5):
+        create_event(first, type="feeding" if index % 2 else "diaper")
+        create_event(second, type="feeding")
+
+    events = walk_pages(client, admin_headers, limit=2, type="feeding", recipient_id=first)
+
+    assert len(events) == 2
+    assert {(event["type"], event["recipient_id"]) for event in events} == {("feeding", first)}
+
+
+def test_caregiver_pages_only_their_recipients(client, caregiver_headers, recipients, create_event):
+    first, second = recipients
+    create_event(first)
+    create_event(second)
+
+    events = walk_pages(client, caregiver_headers, limit=1)
+    assert [event["recipient_id"] for event in events] == [first]
+
+    response = client.get("/api/events/page", params={"recipient_id": second}, headers=caregiver_headers)
+    assert response.status_code == 403
+
+
+def encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    encode(b"\xff\xfe"),
+    encode(b"[1, 2]"),
+    encode(json.dumps({"ts": "2025-01-01T00:00:00"}).encode()),
+    encode(json.dumps({"ts": "yesterday", "id": "8d2b7c4e-0c52-4f3e-9a63-1f2e3d4c5b6a"}).encode()),
+    encode(json.dumps({"ts": "2025-01-01T00:00:00", "id": "not-a-uuid"}).encode()),
+])
+def test_malformed_cursor_is_rejected(client, admin_headers, recipients, cursor):
+    response = client.get("/api/events/page", params={"cursor": cursor}, headers=admin_headers)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,117 @@
+from models.event_count import EventDailyCount
+
+
+def rollups(client, headers, **params):
+    response = client.get("/api/events/rollups", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def set_timezone(client, headers, timezone):
+    response = client.put("/api/settings/timezone", json={"timezone": timezone}, headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def totals(result):
+    return [(bucket["start"], bucket["total"], bucket["amount_ml"]) for bucket in result["buckets"]]
+
+
+def test_day_buckets_in_configured_timezone(client, admin_headers, recipients, create_event):
+    set_timezone(client, admin_headers, "America/New_York")
+    first = recipients[0]
+    # 22:00 on Jan 1 in New York, though Jan 2 in UTC
+    create_event(first, type="feeding", timestamp="2025-01-02T03:00:00Z", metadata={"amount_ml": 120})
+    create_event(first, type="feeding", timestamp="2025-01-02T06:00:00Z", metadata={"amount_ml": 90.5})
+    create_event(first, type="diaper", timestamp="2025-01-02T07:00:00Z")
+
+    result = rollups(client, admin_headers, bucket="day", start="2025-01-01T12:00:00Z", end="2025-01-02T12:00:00Z")
+
+    assert result["timezone"] == "America/New_York"
+    assert totals(result) == [
+        ("2025-01-01T00:00:00-05:00", 1, 120.0),
+        ("2025-01-02T00:00:00-05:00", 2, 90.5),
+    ]
+    assert result["buckets"][1]["counts"]["diaper"] == 1
+
+
+def test_week_buckets_sum_daily_counters(client, admin_headers, recipients, create_event):
+    first, second = recipients
+    create_event(first, type="feeding", timestamp="2025-01-06T10:00:00Z", metadata={"amount_ml": 100})
+    create_event(second, type="feeding", timestamp="2025-01-12T10:00:00Z", metadata={"amount_ml": 50})
+    create_event(first, type="feeding", timestamp="2025-01-13T10:00:00Z", metadata={"amount_ml": "lots"})
+
+    result = rollups(client, admin_headers, bucket="week", start="2025-01-06T00:00:00Z", end="2025-01-13T00:00:00Z")
+    assert totals(result) == [
+        ("2025-01-06T00:00:00+00:00", 2, 150.0),
+        ("2025-01-13T00:00:00+00:00", 1, 0.0),
+    ]
+
+    filtered = rollups(client, admin_headers, bucket="week", start="2025-01-06T00:00:00Z", end="2025-01-06T00:00:00Z", recipient_id=second)
+    assert totals(filtered) == [("2025-01-06T00:00:00+00:00", 1, 50.0)]
+
+
+def test_hour_buckets_and_timezone_override_read_events(client, admin_headers, recipients, create_event):
+    first = recipients[0]
+    create_event(first, type="feeding", timestamp="2025-01-02T03:15:00Z", metadata={"amount_ml": 60})
+    create_event(first, type="feeding", timestamp="2025-01-02T03:45:00Z", metadata={"amount_ml": 40})
+
+    hours = rollups(client, admin_headers, bucket="hour", start="2025-01-02T03:00:00Z", end="2025-01-02T04:00:00Z")
+    assert totals(hours) == [
+        ("2025-01-02T03:00:00+00:00", 2, 100.0),
+        ("2025-01-02T04:00:00+00:00", 0, 0.0),
+    ]
+
+    days = rollups(client, admin_headers, bucket="day", start="2025-01-02T00:00:00Z", end="2025-01-02T00:00:00Z", tz="Asia/Tokyo")
+    assert days["timezone"] == "Asia/Tokyo"
+    assert totals(days) == [("2025-01-02T00:00:00+09:00", 2, 100.0)]
+
+    response = client.get("/api/events/rollups", params={"tz": "Nowhere/Special"}, headers=admin_headers)
+    assert response.status_code == 400
+
+
+def test_daily_counters_follow_amount_changes(client, admin_headers, recipients, create_event):
+    event = create_event(recipients[0], type="feeding", timestamp="2025-01-02T10:00:00Z", metadata={"amount_ml": 100})
+
+    response = client.patch(f"/api/events/{event['id']}", json={"metadata": {"amount_ml": 30}}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    params = {"bucket": "day", "start": "2025-01-02T00:00:00Z", "end": "2025-01-02T00:00:00Z"}
+    assert totals(rollups(client, admin_headers, **params)) == [("2025-01-02T00:00:00+00:00", 1, 30.0)]
+
+    assert client.delete(f"/api/events/{event['id']}", headers=admin_headers).status_code == 204
+    assert totals(rollups(client, admin_headers, **params)) == [("2025-01-02T00:00:00+00:00", 0, 0.0)]
+
+
+def test_timezone_change_rebuilds_daily_counters(client, db, admin_headers, recipients, create_event):
+    first = recipients[0]
+    create_event(first, type="feeding", timestamp="2025-01-02T03:00:00Z", metadata={"amount_ml": 120})
+    assert [row.day.isoformat() for row in db.query(EventDailyCount)] == ["2025-01-02"]
+
+    set_timezone(client, admin_headers, "America/New_York")
+    db.expire_all()
+    assert [(row.day.isoformat(), row.count, row.amount_ml) for row in db.query(EventDailyCount)] == [("2025-01-01", 1, 120.0)]
+
+    # Events written after the change use its days
+    create_event(first, type="feeding", timestamp="2025-01-02T04:00:00Z")
+    db.expire_all()
+    assert sorted((row.day.isoformat(), row.count) for row in db.query(EventDailyCount)) == [("2025-01-01", 2)]
+
+    # A timezone the server cannot resolve counts in UTC
+    set_timezone(client, admin_headers, "local")
+    db.expire_all()
+    assert sorted((row.day.isoformat(), row.count) for row in db.query(EventDailyCount)) == [("2025-01-02", 2)]
+
+
+def test_stats_window_uses_local_days(client, admin_headers, recipients, create_event):
+    set_timezone(client, admin_headers, "America/New_York")
+    first = recipients[0]
+    for timestamp in ("2025-01-02T04:59:00Z", "2025-01-02T05:00:00Z", "2025-01-03T04:59:00Z", "2025-01-03T05:00:00Z"):
+        create_event(first, timestamp=timestamp)
+
+    # Exactly the New York day of Jan 2, answered from the daily counters
+    response = client.get(
+        "/api/events/stats/summary",
+        params={"start": "2025-01-02T05:00:00Z", "end": "2025-01-03T04:59:59Z"},
+        headers=admin_headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["total"] == 2
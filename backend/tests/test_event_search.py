@@ -0,0 +1,62 @@
+import pytest
+
+from routes import events as event_routes
+
+
+@pytest.fixture
+def searchable(recipients, create_event):
+    first = recipients[0]
+    return {
+        "notes": create_event(first, type="observation", notes="Slept well after lunch"),
+        "med": create_event(first, type="medication", metadata={"med_name": "Tylenol", "dosage": "500mg"}),
+        "formula": create_event(first, type="feeding", metadata={"formula_type": "Jevity 1.5", "amount_ml": 240}),
+        "other": create_event(first, type="diaper", notes="Wet"),
+    }
+
+
+def search(client, headers, q, **params):
+    response = client.get("/api/events/", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return {event["id"] for event in response.json()}
+
+
+@pytest.mark.parametrize("q, expected", [
+    ("slept", {"notes"}),
+    ("SLEPT WELL", {"notes"}),
+    # Word prefixes, from the full-text index
+    ("tyl", {"med"}),
+    ("well lun", {"notes"}),
+    # Substrings inside words, from the trigram index
+    ("ylen", {"med"}),
+    ("evity 1.", {"formula"}),
+    ("nothing like this", set()),
+])
+def test_search_matches_notes_and_metadata(client, admin_headers, searchable, q, expected):
+    assert search(client, admin_headers, q) == {searchable[name]["id"] for name in expected}
+
+
+def test_search_keeps_other_filters(client, admin_headers, searchable):
+    assert search(client, admin_headers, "tylenol", type="feeding") == set()
+    assert search(client, admin_headers, "tylenol", type="medication") == {searchable["med"]["id"]}
+
+
+def test_search_pages(client, admin_headers, searchable):
+    response = client.get("/api/events/page", params={"q": "we", "limit": 1}, headers=admin_headers)
+    page = response.json()
+
+    assert len(page["events"]) == 1
+    assert page["next_cursor"] is not None
+
+
+@pytest.mark.parametrize("trigrams", [None, False])
+def test_relevance_sort_ranks_better_matches_first(client, admin_headers, recipients, create_event, monkeypatch, trigrams):
+    # None looks pg_trgm up on the test database; False is a server without it
+    monkeypatch.setattr(event_routes, "_has_trigrams", trigrams)
+    first = recipients[0]
+    once = create_event(first, notes="Walked to the park", timestamp="2025-01-02T10:00:00Z")
+    twice = create_event(first, notes="Walked there and walked back", timestamp="2025-01-01T10:00:00Z")
+
+    response = client.get("/api/events/", params={"q": "walked", "sort": "relevance"}, headers=admin_headers)
+
+    assert response.status_code == 200, response.text
+    assert [event["id"] for event in response.json()] == [twice["id"], once["id"]]
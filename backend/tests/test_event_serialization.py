@@ -0,0 +1,62 @@
+from datetime import datetime
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import desc
+
+from models.event import Event
+from routes.events import EventResponse, event_row_query, event_to_response
+from services.utils import FastJSONResponse
+
+
+def pydantic_body(events) -> bytes:
+    """The body FastAPI rendered for response_model=List[EventResponse] before the fast path."""
+    responses = [event_to_response(event) for event in events]
+    return JSONResponse(TypeAdapter(List[EventResponse]).dump_python(responses, mode="json")).body
+
+
+def add_events(db, admin, recipients):
+    db.add_all([
+        Event(
+            type="feeding",
+            timestamp=datetime(2025, 1, 2, 3, 4, 5, 678901),
+            user_id=admin.id,
+            recipient_id=recipients[0],
+            notes="Café ☕ \"quoted\" \\ and\nnewline",
+            event_data={"amount_ml": 90.5, "nested": {"list": [1, None, True]}, "text": "é"},
+            synced=True,
+            created_offline=True,
+            created_at=datetime(2025, 1, 2, 3, 5),
+        ),
+        Event(
+            type="diaper",
+            timestamp=datetime(2025, 1, 1, 0, 0),
+            user_id=admin.id,
+            recipient_id=None,
+            notes=None,
+            event_data={},
+        ),
+    ])
+    db.commit()
+
+
+def test_row_query_renders_like_the_pydantic_models(db, admin, recipients):
+    add_events(db, admin, recipients)
+
+    events = db.query(Event).order_by(desc(Event.timestamp)).all()
+    rows = event_row_query(db).order_by(desc(Event.timestamp)).all()
+
+    assert FastJSONResponse([row._asdict() for row in rows]).body == pydantic_body(events)
+
+
+def test_event_list_is_byte_identical_to_the_pydantic_response(client, db, admin, admin_headers, recipients, create_event):
+    add_events(db, admin, recipients)
+    create_event(recipients[1], type="medication", notes=None, metadata={"med_name": "Aspirin", "dosage": "100mg"})
+
+    response = client.get("/api/events/", headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+    events = db.query(Event).order_by(desc(Event.timestamp)).all()
+    assert len(events) == 3
+    assert response.content == pydantic_body(events)
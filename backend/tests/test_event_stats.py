@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from models.event import Event
+from services.event_stats import record_event_created
+
+
+def stats(client, headers, **params):
+    response = client.get("/api/events/stats/summary", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_counts_per_type_and_recipient(client, admin_headers, caregiver_headers, recipients, create_event):
+    first, second = recipients
+    create_event(first, type="diaper")
+    create_event(first, type="feeding")
+    create_event(second, type="diaper")
+
+    assert stats(client, admin_headers) == {
+        "medication": 0, "feeding": 1, "diaper": 2, "demeanor": 0, "observation": 0, "total": 3
+    }
+    assert stats(client, admin_headers, recipient_id=second)["total"] == 1
+    # Caregivers only count the recipients they can see
+    assert stats(client, caregiver_headers) == stats(client, admin_headers, recipient_id=first)
+
+
+def test_window_matches_events_in_it(client, admin_headers, recipients, create_event):
+    first = recipients[0]
+    for timestamp in ("2025-01-01T23:30:00Z", "2025-01-02T00:00:00Z", "2025-01-03T12:00:00Z", "2025-01-04T06:00:00Z", "2025-01-05T00:00:00Z"):
+        create_event(first, timestamp=timestamp)
+
+    # Partial days at both edges, whole days between
+    assert stats(client, admin_headers, start="2025-01-01T12:00:00Z", end="2025-01-04T05:59:59Z")["total"] == 3
+    # Start and end inside one day
+    assert stats(client, admin_headers, start="2025-01-04T00:00:00Z", end="2025-01-04T12:00:00Z")["total"] == 1
+    # Inclusive end on a day boundary
+    assert stats(client, admin_headers, start="2025-01-02T00:00:00Z", end="2025-01-05T00:00:00Z")["total"] == 4
+
+
+def test_counts_follow_updates_and_deletes(client, admin_headers, recipients, create_event):
+    first, second = recipients
+    event = create_event(first, type="diaper", timestamp="2025-01-01T10:00:00Z")
+
+    response = client.patch(
+        f"/api/events/{event['id']}",
+        json={"type": "feeding", "recipient_id": second, "timestamp": "2025-01-03T10:00:00Z"},
+        headers=admin_headers
+    )
+    assert response.status_code == 200, response.text
+
+    assert stats(client, admin_headers, recipient_id=first)["total"] == 0
+    assert stats(client, admin_headers, recipient_id=second)["feeding"] == 1
+    assert stats(client, admin_headers, start="2025-01-03T00:00:00Z", end="2025-01-03T23:59:59Z")["feeding"] == 1
+
+    assert client.delete(f"/api/events/{event['id']}", headers=admin_headers).status_code == 204
+    assert stats(client, admin_headers)["total"] == 0
+
+
+def test_events_without_recipient_count_in_unfiltered_totals(client, db, admin, admin_headers, caregiver_headers, recipients, create_event):
+    create_event(recipients[0], type="feeding")
+    # Recorded before recipients existed
+    legacy = Event(type="diaper", timestamp=datetime(2024, 6, 1, 8), user_id=admin.id, recipient_id=None)
+    db.add(legacy)
+    record_event_created(db, legacy)
+    db.commit()
+
+    assert stats(client, admin_headers)["diaper"] == 1
+    assert stats(client, admin_headers)["total"] == 2
+    assert stats(client, admin_headers, start="2024-06-01T00:00:00Z", end="2024-06-30T00:00:00Z")["total"] == 1
+    assert stats(client, admin_headers, start="2024-06-01T06:00:00Z", end="2024-06-01T09:00:00Z")["total"] == 1
+    assert stats(client, admin_headers, recipient_id=recipients[0])["total"] == 1
+    assert stats(client, caregiver_headers)["total"] == 1
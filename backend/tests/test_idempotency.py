@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from models.idempotency_key import IdempotencyKey
+from services import reminder_scheduler
+from services.idempotency import REPLAY_HEADER, purge_expired_keys
+
+
+def post_event(client, headers, recipient_id, key, notes="first"):
+    return client.post(
+        "/api/events/",
+        json={"type": "diaper", "recipient_id": recipient_id, "notes": notes},
+        headers={**headers, "Idempotency-Key": key}
+    )
+
+
+def event_count(client, headers):
+    return len(client.get("/api/events/", headers=headers).json())
+
+
+def test_retry_replays_the_stored_response(client, admin_headers, recipients):
+    first = post_event(client, admin_headers, recipients[0], "key-1")
+    retry = post_event(client, admin_headers, recipients[0], "key-1")
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers[REPLAY_HEADER] == "true"
+    assert REPLAY_HEADER not in first.headers
+    assert event_count(client, admin_headers) == 1
+
+
+def test_key_reused_for_another_request_is_rejected(client, admin_headers, recipients):
+    assert post_event(client, admin_headers, recipients[0], "key-1").status_code == 201
+
+    response = post_event(client, admin_headers, recipients[0], "key-1", notes="different")
+
+    assert response.status_code == 422
+    assert event_count(client, admin_headers) == 1
+
+
+def test_keys_are_per_user(client, admin_headers, caregiver_headers, recipients):
+    assert post_event(client, admin_headers, recipients[0], "shared").status_code == 201
+
+    response = post_event(client, caregiver_headers, recipients[0], "shared")
+
+    assert response.status_code == 201
+    assert REPLAY_HEADER not in response.headers
+    assert event_count(client, admin_headers) == 2
+
+
+def test_writes_without_a_key_are_not_deduplicated(client, admin_headers, recipients):
+    for _ in range(2):
+        client.post("/api/events/", json={"type": "diaper", "recipient_id": recipients[0]}, headers=admin_headers)
+
+    assert event_count(client, admin_headers) == 2
+
+
+def test_batch_retry_replays_results(client, admin_headers, recipients):
+    operations = [{"op": "create", "client_id": "temp_a", "data": {"type": "diaper", "recipient_id": recipients[0]}}]
+    headers = {**admin_headers, "Idempotency-Key": "batch-1"}
+
+    first = client.post("/api/events/batch", json={"operations": operations}, headers=headers)
+    retry = client.post("/api/events/batch", json={"operations": operations}, headers=headers)
+
+    assert retry.json() == first.json()
+    assert retry.headers[REPLAY_HEADER] == "true"
+    assert event_count(client, admin_headers) == 1
+
+
+def expire_keys(db):
+    db.query(IdempotencyKey).update({IdempotencyKey.expires_at: datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+
+
+def test_expired_key_allows_a_new_write(client, db, admin_headers, recipients):
+    post_event(client, admin_headers, recipients[0], "key-1")
+    expire_keys(db)
+
+    response = post_event(client, admin_headers, recipients[0], "key-1", notes="different")
+
+    assert response.status_code == 201
+    assert REPLAY_HEADER not in response.headers
+    assert event_count(client, admin_headers) == 2
+
+
+def test_purge_removes_only_expired_keys(client, db, admin_headers, recipients):
+    post_event(client, admin_headers, recipients[0], "old")
+    expire_keys(db)
+    post_event(client, admin_headers, recipients[0], "new")
+
+    asyncio.run(reminder_scheduler._run_purge("expired idempotency keys", purge_expired_keys))
+
+    db.expire_all()
+    assert [row.key for row in db.query(IdempotencyKey).all()] == ["new"]
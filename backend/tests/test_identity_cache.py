@@ -0,0 +1,91 @@
+from models.user import User
+from services import identity_cache
+from services.auth_service import get_password_hash
+
+
+def me(client, headers):
+    return client.get("/api/auth/me", headers=headers)
+
+
+def summary_total(client, headers):
+    response = client.get("/api/events/stats/summary", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["total"]
+
+
+def test_deactivated_user_is_refused_at_once(client, admin_headers, caregiver, caregiver_headers):
+    assert me(client, caregiver_headers).status_code == 200
+
+    response = client.patch(f"/api/auth/users/{caregiver.id}", json={"is_active": False}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+    assert me(client, caregiver_headers).status_code == 403
+
+
+def test_role_change_is_seen_at_once(client, admin_headers, caregiver, caregiver_headers):
+    assert me(client, caregiver_headers).json()["role"] == "caregiver"
+
+    response = client.patch(f"/api/auth/users/{caregiver.id}", json={"role": "read_only"}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+    assert me(client, caregiver_headers).json()["role"] == "read_only"
+
+
+def test_recipient_access_change_is_seen_at_once(client, admin_headers, caregiver, caregiver_headers, recipients, create_event):
+    first, second = recipients
+    create_event(first)
+    create_event(second)
+    assert summary_total(client, caregiver_headers) == 1
+
+    response = client.put(
+        f"/api/auth/users/{caregiver.id}/recipients",
+        json={"recipient_ids": [first, second]},
+        headers=admin_headers
+    )
+    assert response.status_code == 200, response.text
+
+    assert summary_total(client, caregiver_headers) == 2
+
+
+def test_password_hash_is_not_cached(client, db, caregiver, caregiver_headers):
+    caregiver.password_hash = get_password_hash("Old-password1")
+    db.commit()
+    assert me(client, caregiver_headers).status_code == 200
+
+    cached = identity_cache.get_user(caregiver.id)
+    assert cached is not None
+    assert "password_hash" not in cached.__dict__
+
+    # A cached user can still change their password
+    response = client.patch(
+        "/api/auth/me/password",
+        json={"current_password": "Old-password1", "new_password": "New-password2", "confirm_password": "New-password2"},
+        headers=caregiver_headers
+    )
+    assert response.status_code == 200, response.text
+    response = client.patch(
+        "/api/auth/me/password",
+        json={"current_password": "Old-password1", "new_password": "Other-password3", "confirm_password": "Other-password3"},
+        headers=caregiver_headers
+    )
+    assert response.status_code == 401
+
+
+def test_load_that_raced_an_invalidation_is_not_cached(db, caregiver):
+    loaded_at = identity_cache.generation(caregiver.id)
+    user = db.get(User, caregiver.id)
+    identity_cache.invalidate(caregiver.id)
+
+    identity_cache.store_user(user, loaded_at)
+    identity_cache.store_allowed_recipient_ids(user, [], loaded_at)
+    assert identity_cache.get_user(caregiver.id) is None
+
+    # Nor one that raced a resync
+    loaded_at = identity_cache.generation(caregiver.id)
+    identity_cache.clear()
+    identity_cache.store_user(user, loaded_at)
+    assert identity_cache.get_user(caregiver.id) is None
+
+    loaded_at = identity_cache.generation(caregiver.id)
+    identity_cache.store_user(user, loaded_at)
+    assert identity_cache.get_user(caregiver.id).username == "caregiver"
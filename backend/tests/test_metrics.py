@@ -0,0 +1,90 @@
+import asyncio
+import os
+
+import pytest
+
+from config import get_settings
+from routes.metrics import stream_lines
+from services import metrics
+
+TOKEN = "scrape-token"
+
+
+@pytest.fixture
+def scrape_token(monkeypatch):
+    monkeypatch.setattr(get_settings(), "METRICS_SCRAPE_TOKEN", TOKEN)
+    return {"Authorization": f"Bearer {TOKEN}"}
+
+
+def test_metrics_are_off_without_a_scrape_token(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "METRICS_SCRAPE_TOKEN", "")
+
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer "}).status_code == 404
+
+
+def test_metrics_require_the_scrape_token(client, admin_headers, scrape_token):
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    # An admin session is no substitute
+    assert client.get("/api/metrics", headers=admin_headers).status_code == 401
+
+    response = client.get("/api/metrics", headers=scrape_token)
+    assert response.status_code == 200, response.text
+    assert "# TYPE sse_open_streams gauge" in response.text
+    assert "# TYPE http_requests_total counter" in response.text
+
+
+WORKER = """# HELP jobs_total Jobs run
+# TYPE jobs_total counter
+jobs_total{{kind="a"}} {jobs}
+# HELP wait_seconds Wait
+# TYPE wait_seconds histogram
+wait_seconds_bucket{{le="1"}} {jobs}
+wait_seconds_bucket{{le="+Inf"}} {jobs}
+wait_seconds_sum 0.5
+wait_seconds_count {jobs}
+# HELP open_streams Open streams
+# TYPE open_streams gauge
+open_streams {open}
+pool_size{{pool="sync"}} 3
+"""
+
+
+def test_merge_sums_counters_and_labels_live_gauges():
+    merged = metrics.merge({
+        "1": (WORKER.format(jobs=2, open=4), True),
+        "2": (WORKER.format(jobs=3, open=1), True),
+        "3": (WORKER.format(jobs=5, open=7), False),
+    })
+
+    lines = merged.splitlines()
+    assert lines.count("# TYPE jobs_total counter") == 1
+    assert 'jobs_total{kind="a"} 10' in lines
+    assert 'wait_seconds_bucket{le="+Inf"} 10' in lines
+    assert "wait_seconds_sum 1.5" in lines
+    # Gauges belong to a worker, and exited workers have none
+    assert 'open_streams{worker="1"} 4' in lines
+    assert 'open_streams{worker="2"} 1' in lines
+    assert not any('worker="3"' in line for line in lines)
+    assert 'pool_size{pool="sync",worker="2"} 3' in lines
+
+
+def test_workers_share_snapshots(tmp_path, monkeypatch):
+    # As main.py registers it
+    metrics.add_collector(stream_lines)
+    monkeypatch.setattr(get_settings(), "METRICS_DIR", str(tmp_path))
+    other = tmp_path / "worker-1.prom"
+    # pid 1 is always running
+    other.write_text(WORKER.format(jobs=2, open=4))
+
+    async def snapshot():
+        await metrics.start_snapshots()
+        await metrics.stop_snapshots()
+
+    asyncio.run(snapshot())
+    assert (tmp_path / f"worker-{os.getpid()}.prom").read_text().startswith("# HELP")
+
+    lines = metrics.render_workers().splitlines()
+    assert 'jobs_total{kind="a"} 2' in lines
+    assert 'open_streams{worker="1"} 4' in lines
+    assert f'sse_open_streams{{worker="{os.getpid()}"}} 0' in lines
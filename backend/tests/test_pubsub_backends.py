@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy.orm import Session
+
+from services import metrics, pubsub
+from services.pubsub import PubSubBackend
+from services.pubsub_memory import InProcessBackend
+from services.pubsub_unix import UnixSocketBackend
+
+
+def test_backend_without_publish_many_cannot_be_created():
+    class Incomplete(PubSubBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_metric_without_render_cannot_be_created():
+    class Incomplete(metrics._Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete_total", "Never registered")
+
+
+def collect(kind):
+    """Register a handler recording messages of type kind; returns (messages, unregister)."""
+    received = []
+
+    def handler(data):
+        if data.get("type") == kind:
+            received.append(data)
+
+    pubsub.register_handler(handler)
+    return received, lambda: pubsub._handlers.remove(handler)
+
+
+async def wait_for(condition, timeout=5):
+    started = time.monotonic()
+    while not condition():
+        assert time.monotonic() - started < timeout, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def message(number, kind="test.backend"):
+    return {"type": kind, "number": number}
+
+
+def test_memory_backend_delivers_in_order_with_increasing_stream_ids():
+    received, unregister = collect("test.backend")
+
+    async def scenario():
+        backend = InProcessBackend()
+        await backend.start()
+        await backend.publish_many([message(1), message(2)])
+        await backend.publish(message(3))
+        await backend.stop()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        unregister()
+
+    assert [data["number"] for data in received] == [1, 2, 3]
+    stream_ids = [data[pubsub.STREAM_ID_KEY] for data in received]
+    assert stream_ids == sorted(set(stream_ids))
+
+
+def test_memory_backend_publishes_staged_messages_only_on_commit():
+    received, unregister = collect("test.staged")
+    previous = pubsub._backend
+
+    async def scenario():
+        backend = InProcessBackend()
+        pubsub.set_backend(backend)
+        await backend.start()
+
+        committed = Session()
+        committed.begin()
+        pubsub.stage_publish_many(committed, [message(1, "test.staged"), message(2, "test.staged")])
+        rolled_back = Session()
+        rolled_back.begin()
+        pubsub.stage_publish(rolled_back, message(3, "test.staged"))
+        rolled_back.rollback()
+        assert received == []
+        committed.commit()
+
+        await wait_for(lambda: len(received) == 2)
+        await backend.stop()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pubsub.set_backend(previous)
+        unregister()
+
+    assert [data["number"] for data in received] == [1, 2]
+
+
+@pytest.fixture
+def socket_path(tmp_path_factory):
+    # Well under the 108 byte limit on socket paths
+    return str(tmp_path_factory.mktemp("pubsub") / "broker.sock")
+
+
+def test_unix_backend_numbers_every_workers_messages_in_one_order(socket_path):
+    received, unregister = collect("test.unix")
+
+    async def scenario():
+        first, second = UnixSocketBackend(socket_path), UnixSocketBackend(socket_path)
+        await first.start()
+        await second.start()
+        try:
+            # One worker holds the lock and runs the broker; both are its clients
+            assert first._broker is not None and second._broker is None
+            await first.publish_many([message(1, "test.unix"), message(2, "test.unix")])
+            await second.publish(message(3, "test.unix"))
+            await wait_for(lambda: len(received) == 6)
+        finally:
+            await second.stop()
+            await first.stop()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        unregister()
+
+    # Each message reaches both workers with the same stream_id
+    by_number = {}
+    for data in received:
+        by_number.setdefault(data["number"], set()).add(data[pubsub.STREAM_ID_KEY])
+    assert sorted(by_number) == [1, 2, 3]
+    assert all(len(stream_ids) == 1 for stream_ids in by_number.values())
+    stream_ids = [by_number[number].pop() for number in (1, 2, 3)]
+    assert stream_ids == sorted(set(stream_ids))
+
+
+def test_unix_backend_takes_over_the_broker_and_resyncs(socket_path):
+    resyncs, unregister_resyncs = collect(pubsub.RESYNC_EVENT)
+    received, unregister = collect("test.takeover")
+
+    async def scenario():
+        first, second = UnixSocketBackend(socket_path), UnixSocketBackend(socket_path)
+        await first.start()
+        await second.start()
+        try:
+            await first.stop()
+            # The second worker reconnects, to a broker of its own, and resyncs
+            await wait_for(lambda: resyncs)
+            assert second._broker is not None
+            await second.publish(message(1, "test.takeover"))
+            await wait_for(lambda: received)
+        finally:
+            await second.stop()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        unregister_resyncs()
+        unregister()
+
+    assert len(resyncs) == 1
+    assert [data["number"] for data in received] == [1]
+
+
+def test_unix_backend_raises_when_not_connected(socket_path):
+    backend = UnixSocketBackend(socket_path)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(backend.publish(message(1, "test.unix")))
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import pytest
+
+import database
+from services import metrics, pubsub
+from services.pubsub_postgres import SKIPPED_ID_MEMORY_SECONDS, PostgresBackend, _Sequencer
+
+
+def ids(ready):
+    return [stream_id for stream_id, _ in ready]
+
+
+def test_sequencer_releases_in_id_order():
+    sequencer = _Sequencer(10, settle=0.5)
+
+    assert ids(sequencer.receive(12, ("b", False), 0)) == []
+    assert ids(sequencer.receive(13, ("c", False), 0)) == []
+    assert sequencer.deadline() == 0.5
+    assert ids(sequencer.receive(11, ("a", False), 0.1)) == [11, 12, 13]
+    assert sequencer.deadline() is None
+    # Duplicates, as from catching up on messages already notified
+    assert sequencer.receive(12, ("b", False), 0.2) == []
+    assert sequencer.receive(14, ("d", False), 0.2) == [(14, ("d", False))]
+
+
+def test_sequencer_skips_a_settled_gap_and_still_takes_it_late():
+    sequencer = _Sequencer(10, settle=0.5)
+    sequencer.receive(13, ("c", False), 1.0)
+
+    assert sequencer.expire(1.4) == []
+    assert ids(sequencer.expire(1.5)) == [13]
+    assert sequencer.position == 13
+    assert sequencer.skipped_ids == [11, 12]
+
+    # A transaction that was slow to commit rather than rolled back
+    assert ids(sequencer.receive(12, ("b", False), 2.0)) == [12]
+    assert sequencer.receive(12, ("b", False), 2.1) == []
+    assert sequencer.skipped_ids == [11]
+
+    sequencer.expire(1.5 + SKIPPED_ID_MEMORY_SECONDS + 1)
+    assert sequencer.skipped_ids == []
+    assert sequencer.receive(11, ("a", False), 1000) == []
+
+
+def test_sequencer_settles_each_gap_from_its_own_arrival():
+    sequencer = _Sequencer(0, settle=0.5)
+    sequencer.receive(2, ("b", False), 0)
+    sequencer.receive(4, ("d", False), 0.4)
+
+    assert ids(sequencer.expire(0.5)) == [2]
+    assert sequencer.deadline() == 0.9
+    assert ids(sequencer.receive(3, ("c", False), 0.6)) == [3, 4]
+
+
+def test_sequencer_releases_ids_uncommitted_at_start():
+    sequencer = _Sequencer(20, settle=0.5)
+    sequencer.skip([18, 25], 0)
+
+    assert sequencer.skipped_ids == [18]
+    assert ids(sequencer.receive(18, ("a", False), 0.1)) == [18]
+    assert sequencer.receive(19, ("b", False), 0.1) == []
+
+
+def test_out_of_order_commits_are_delivered_in_id_order(schema):
+    received = []
+
+    async def scenario():
+        backend = PostgresBackend(channel="test_outbox")
+        await backend.start()
+        backend._sequencer.settle = 0.2
+        first, second, third = (database.SessionLocal() for _ in range(3))
+        try:
+            for session, number in ((first, 1), (second, 2), (third, 3)):
+                backend.stage_many(session, [{"type": "test.outbox", "number": number}])
+            third.commit()
+            second.commit()
+            first.rollback()
+
+            started = time.monotonic()
+            while len(received) < 2 and time.monotonic() - started < 5:
+                await asyncio.sleep(0.05)
+        finally:
+            for session in (first, second, third):
+                session.close()
+            await backend.stop()
+
+    def handler(data):
+        if data.get("type") == "test.outbox":
+            received.append(data)
+
+    pubsub.register_handler(handler)
+    try:
+        asyncio.run(scenario())
+    finally:
+        pubsub._handlers.remove(handler)
+
+    assert [data["number"] for data in received] == [2, 3]
+    assert received[1]["stream_id"] == received[0]["stream_id"] + 1
+
+
+def publish_failures():
+    return float(metrics.PUBLISH_FAILURES.render()[-1].rsplit(" ", 1)[1])
+
+
+def test_failed_publishes_raise_and_are_counted(monkeypatch):
+    backend = PostgresBackend(channel="test_failures")
+
+    async def unreachable():
+        raise OSError("database unreachable")
+
+    monkeypatch.setattr(backend, "_get_publish_pool", unreachable)
+    previous = pubsub._backend
+    pubsub.set_backend(backend)
+    before = publish_failures()
+
+    async def scenario():
+        with pytest.raises(OSError):
+            await pubsub.publish_many([{"type": "test.failure"}, {"type": "test.failure"}])
+        # Coalesced publishes each see their batch fail
+        results = await asyncio.gather(
+            pubsub.publish({"type": "test.failure"}),
+            pubsub.publish({"type": "test.failure"}),
+            return_exceptions=True
+        )
+        assert [type(result) for result in results] == [OSError, OSError]
+
+        # After a commit there is no caller to raise to, but the loss is counted
+        await pubsub.PubSubBackend.start(backend)
+        backend.publish_committed([{"type": "test.failure"}])
+        await asyncio.sleep(0.05)
+        await pubsub.PubSubBackend.stop(backend)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pubsub.set_backend(previous)
+
+    assert publish_failures() - before == 5
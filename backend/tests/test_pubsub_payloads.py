@@ -0,0 +1,104 @@
+import asyncio
+import json
+import time
+
+import database
+from routes import stream
+from services import pubsub
+from services.pubsub_memory import InProcessBackend
+from services.pubsub_postgres import MAX_NOTIFY_BYTES, PostgresBackend
+from tests.test_stream_socket import connect, next_of
+
+LARGE_NOTES = "x" * (MAX_NOTIFY_BYTES + 500)
+
+
+def run_backend(backend, scenario, kind):
+    """Run scenario(backend) on a started backend; returns the messages of type kind it delivered."""
+    received = []
+
+    def handler(data):
+        if data.get("type") in (kind, pubsub.RESYNC_EVENT):
+            received.append(data)
+
+    async def run():
+        await backend.start()
+        try:
+            await scenario(backend)
+            started = time.monotonic()
+            while not received and time.monotonic() - started < 5:
+                await asyncio.sleep(0.05)
+            # Anything else still on its way
+            await asyncio.sleep(0.2)
+        finally:
+            await backend.stop()
+
+    pubsub.register_handler(handler)
+    try:
+        asyncio.run(run())
+    finally:
+        pubsub._handlers.remove(handler)
+    return received
+
+
+def test_large_messages_spill_to_the_outbox_and_arrive_whole(schema):
+    payloads = [
+        {"type": "test.spill", "number": 1, "notes": LARGE_NOTES},
+        {"type": "test.spill", "number": 2, "notes": "short"},
+    ]
+    assert len(json.dumps(payloads[0])) > MAX_NOTIFY_BYTES
+
+    async def scenario(backend):
+        session = database.SessionLocal()
+        try:
+            backend.stage_many(session, payloads)
+            session.commit()
+        finally:
+            session.close()
+
+    received = run_backend(PostgresBackend(channel="test_spill"), scenario, "test.spill")
+
+    assert [data["number"] for data in received] == [1, 2]
+    assert received[0]["notes"] == LARGE_NOTES
+    assert received[1][pubsub.STREAM_ID_KEY] == received[0][pubsub.STREAM_ID_KEY] + 1
+
+
+def test_spilled_message_no_longer_in_the_outbox_resyncs(schema):
+    async def scenario(backend):
+        await backend._deliver(10 ** 9, ('{"stream_id": 1000000000, "spilled": true}', True))
+
+    received = run_backend(PostgresBackend(channel="test_spill"), scenario, "test.spill")
+
+    assert received == [{"type": pubsub.RESYNC_EVENT}]
+
+
+def test_memory_backend_carries_large_payloads_whole():
+    payload = {"type": "test.spill", "recipient_id": "r1", "notes": LARGE_NOTES}
+    queue = asyncio.Queue()
+
+    async def scenario(backend):
+        await stream.register_subscriber(queue, "user-1", ["r1"])
+        await backend.publish(payload)
+
+    added = stream.local_broadcast not in pubsub._handlers
+    pubsub.register_handler(stream.local_broadcast)
+    try:
+        received = run_backend(InProcessBackend(), scenario, "test.spill")
+    finally:
+        asyncio.run(stream.unregister_subscriber(queue))
+        if added:
+            pubsub._handlers.remove(stream.local_broadcast)
+
+    assert received[0]["notes"] == LARGE_NOTES
+    stream_id, message = queue.get_nowait()
+    assert stream_id == received[0][pubsub.STREAM_ID_KEY]
+    assert message == payload
+
+
+def test_large_events_reach_streams_whole(client, caregiver, recipients, create_event):
+    first = recipients[0]
+    with connect(client, caregiver, first) as socket:
+        socket.receive_json()
+        created = create_event(first, notes=LARGE_NOTES)
+
+        frame = next_of(socket, "event.created")
+        assert frame["event"] == created
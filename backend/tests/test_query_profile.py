@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+
+import database
+from config import get_settings
+from middleware.query_profile_middleware import QueryProfileMiddleware
+from services import metrics, query_profile
+
+
+@pytest.fixture
+def profiled_app(schema, monkeypatch):
+    """An app whose one route runs SELECT :n a given number of times, with DEBUG headers on."""
+    monkeypatch.setattr(get_settings(), "DEBUG", True)
+    monkeypatch.setattr(get_settings(), "SQL_REPEATED_STATEMENT_THRESHOLD", 3)
+    app = FastAPI()
+    app.add_middleware(QueryProfileMiddleware)
+
+    @app.get("/queries/{count}")
+    def run_queries(count: int, pause: float = 0):
+        db = database.SessionLocal()
+        try:
+            for number in range(count):
+                db.execute(text("SELECT :n"), {"n": number})
+                time.sleep(pause)
+        finally:
+            db.close()
+        return {"ran": count}
+
+    @app.get("/distinct")
+    def run_distinct():
+        db = database.SessionLocal()
+        try:
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+        finally:
+            db.close()
+        return {}
+
+    return app
+
+
+def get(app, *paths):
+    """Request paths concurrently; returns the responses in order."""
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get(path) for path in paths))
+
+    return asyncio.run(run())
+
+
+def test_profiles_only_statements_run_from_its_context(schema):
+    db = database.SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+        profile, token = query_profile.start()
+        try:
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+        finally:
+            query_profile.stop(token)
+        db.execute(text("SELECT 1"))
+    finally:
+        db.close()
+
+    assert profile.count == 3
+    assert profile.duplicates == 1
+    assert profile.repeated(2) == [("SELECT 1", 2)]
+    assert profile.seconds > 0
+
+
+def test_debug_headers_report_the_requests_statements(profiled_app):
+    repeated, distinct = get(profiled_app, "/queries/4", "/distinct")
+
+    assert repeated.headers["X-SQL-Queries"] == "4"
+    assert repeated.headers["X-SQL-Duplicates"] == "3"
+    assert float(repeated.headers["X-SQL-Time-Ms"]) > 0
+    assert distinct.headers["X-SQL-Queries"] == "2"
+    assert distinct.headers["X-SQL-Duplicates"] == "0"
+
+
+def test_concurrent_requests_keep_separate_profiles(profiled_app):
+    responses = get(profiled_app, "/queries/2?pause=0.02", "/queries/5?pause=0.01", "/queries/0")
+
+    assert [response.headers["X-SQL-Queries"] for response in responses] == ["2", "5", "0"]
+
+
+def test_repeated_statements_are_logged_from_the_threshold(profiled_app, caplog):
+    with caplog.at_level(logging.WARNING, logger="middleware.query_profile_middleware"):
+        get(profiled_app, "/queries/2")
+        assert caplog.records == []
+
+        get(profiled_app, "/queries/3")
+
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert message.startswith("GET /queries/{count} ran one statement 3 times, possibly an N+1 query")
+    assert message.endswith("SELECT %(n)s")
+
+
+def test_statement_counts_feed_the_queries_metric(profiled_app):
+    def observed():
+        return sum(
+            int(line.rsplit(" ", 1)[1]) for line in metrics.QUERIES_PER_REQUEST.render()
+            if line.startswith('db_queries_per_request_count{method="GET",route="/queries/{count}"}')
+        )
+
+    before = observed()
+    get(profiled_app, "/queries/1", "/queries/2")
+    assert observed() - before == 2
+
+
+def test_no_debug_headers_without_debug(client, admin_headers):
+    response = client.get("/api/auth/me", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert "X-SQL-Queries" not in response.headers
@@ -0,0 +1,99 @@
+import asyncio
+from collections import deque
+
+import pytest
+
+from routes import stream
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer(monkeypatch):
+    monkeypatch.setattr(stream, "_replay_buffer", deque(maxlen=stream._replay_buffer.maxlen))
+
+
+@pytest.fixture
+def streams():
+    """Open streams by name: an admin's, and users allowed r1, r2 or nothing."""
+    registrations = {
+        "admin": ("admin-user", None),
+        "first": ("user-1", ["r1"]),
+        "both": ("user-2", ["r1", "r2"]),
+        "second": ("user-3", ["r2"]),
+        "none": ("user-3", []),
+    }
+    queues = {name: asyncio.Queue() for name in registrations}
+
+    async def register():
+        for name, (user_id, allowed) in registrations.items():
+            await stream.register_subscriber(queues[name], user_id, allowed)
+
+    asyncio.run(register())
+    yield queues
+
+    async def unregister():
+        for queue in queues.values():
+            await stream.unregister_subscriber(queue)
+
+    asyncio.run(unregister())
+
+
+def receivers(queues, payload):
+    """Names of the streams local_broadcast queued payload for."""
+    asyncio.run(stream.local_broadcast(payload))
+    names = []
+    for name, queue in queues.items():
+        while not queue.empty():
+            queue.get_nowait()
+            names.append(name)
+    return sorted(names)
+
+
+def test_recipient_messages_reach_admins_and_allowed_streams(streams):
+    assert receivers(streams, {"type": "event.created", "recipient_id": "r1"}) == ["admin", "both", "first"]
+    assert receivers(streams, {"type": "event.created", "recipient_id": "r2"}) == ["admin", "both", "second"]
+    assert receivers(streams, {"type": "event.created", "recipient_id": "r3"}) == ["admin"]
+
+
+def test_messages_without_a_recipient_reach_every_stream(streams):
+    assert receivers(streams, {"type": "settings.updated"}) == ["admin", "both", "first", "none", "second"]
+
+
+def test_user_messages_reach_only_that_users_streams(streams):
+    assert receivers(streams, {"type": "access.changed", "user_id": "user-3"}) == ["none", "second"]
+    assert receivers(streams, {"type": "user.changed", "user_id": "user-1", "recipient_id": "r2"}) == ["first"]
+    assert receivers(streams, {"type": "access.changed", "user_id": "nobody"}) == []
+
+
+def test_worker_messages_reach_no_stream(streams):
+    assert receivers(streams, {"type": "settings.changed", "key": "timezone"}) == []
+
+
+def test_reregistering_replaces_the_index_entries(streams):
+    asyncio.run(stream.register_subscriber(streams["first"], "user-1", ["r2"]))
+
+    assert receivers(streams, {"type": "event.created", "recipient_id": "r1"}) == ["admin", "both"]
+    assert receivers(streams, {"type": "event.created", "recipient_id": "r2"}) == ["admin", "both", "first", "second"]
+
+    # An admin stream losing the role stops seeing every recipient
+    asyncio.run(stream.register_subscriber(streams["admin"], "admin-user", []))
+    assert receivers(streams, {"type": "event.created", "recipient_id": "r3"}) == []
+    assert streams["admin"] not in stream._all_recipient_subscribers
+
+
+def test_unregistering_removes_empty_index_entries(streams):
+    asyncio.run(stream.register_subscriber(streams["second"], "user-3", ["r9"]))
+    assert stream._recipient_subscribers["r9"] == {streams["second"]}
+
+    async def unregister(*names):
+        for name in names:
+            await stream.unregister_subscriber(streams[name])
+
+    asyncio.run(unregister("second", "none"))
+
+    assert "r9" not in stream._recipient_subscribers
+    assert "user-3" not in stream._user_subscribers
+    assert streams["second"] not in stream._subscribers
+    assert streams["second"] not in stream._registrations
+    assert stream._recipient_subscribers["r2"] == {streams["both"]}
+    # Unregistering twice is harmless
+    asyncio.run(unregister("second"))
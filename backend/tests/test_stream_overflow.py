@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from config import get_settings
+from routes import stream
+
+USER_ID = "user-1"
+
+
+def event(stream_id, recipient_id="r1"):
+    return {"type": "event.created", "recipient_id": recipient_id, "stream_id": stream_id}
+
+
+def access_changed(stream_id):
+    return {"type": "access.changed", "user_id": USER_ID, "stream_id": stream_id}
+
+
+def user_changed(stream_id):
+    return {"type": "user.changed", "user_id": USER_ID, "stream_id": stream_id}
+
+
+def broadcast(*payloads):
+    async def send():
+        for payload in payloads:
+            await stream.local_broadcast(payload)
+
+    asyncio.run(send())
+
+
+def queued(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return [(stream_id, message["type"]) for stream_id, message in items]
+
+
+@pytest.fixture
+def queue():
+    queue = asyncio.Queue(maxsize=3)
+    asyncio.run(stream.register_subscriber(queue, USER_ID, ["r1"]))
+    yield queue
+    asyncio.run(stream.unregister_subscriber(queue))
+    stream._replay_buffer.clear()
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    def set_policy(name):
+        monkeypatch.setattr(get_settings(), "SSE_QUEUE_OVERFLOW", name)
+
+    return set_policy
+
+
+def test_resync_discards_the_queue_but_keeps_access_changes(queue, policy):
+    policy("resync")
+    before = stream.get_stream_metrics()
+
+    broadcast(event(1), access_changed(2), event(3), event(4))
+
+    assert queued(queue) == [(2, "access.changed"), (4, "event.created")]
+    after = stream.get_stream_metrics()
+    assert after["messages_dropped"] - before["messages_dropped"] == 2
+    assert after["overflows"] - before["overflows"] == 1
+    assert stream.get_stream_stats(queue).dropped == 2
+
+
+def test_drop_oldest_skips_over_access_changes(queue, policy):
+    policy("drop_oldest")
+
+    broadcast(access_changed(1), event(2), event(3), event(4), event(5))
+
+    assert queued(queue) == [(1, "access.changed"), (4, "event.created"), (5, "event.created")]
+    assert stream.get_stream_stats(queue).dropped == 2
+
+
+@pytest.mark.parametrize("name", ["resync", "drop_oldest"])
+def test_repeated_user_events_collapse_when_nothing_else_can_go(queue, policy, name):
+    policy(name)
+
+    broadcast(access_changed(1), user_changed(2), access_changed(3), event(4))
+
+    assert queued(queue) == [(2, "user.changed"), (3, "access.changed"), (4, "event.created")]
+
+
+def test_overflow_owes_one_resync_notice(queue, policy):
+    policy("resync")
+    before = stream.get_stream_metrics()["resyncs_sent"]
+    broadcast(*(event(stream_id) for stream_id in range(1, 6)))
+    stats = stream.get_stream_stats(queue)
+
+    assert stream.get_stream_metrics()["streams_behind"] >= 1
+    notice = stream._take_overflow_notice(stats)
+    assert notice == {"type": "stream.resync", "reason": "overflow", "dropped": 3}
+    assert stream._take_overflow_notice(stats) is None
+    assert stream.get_stream_metrics()["resyncs_sent"] - before == 1
+
+
+def test_stream_stats_are_admin_only(client, admin_headers, caregiver_headers, policy):
+    policy("drop_oldest")
+    queue = asyncio.Queue(maxsize=2)
+    asyncio.run(stream.register_subscriber(queue, USER_ID, ["r1"]))
+    try:
+        broadcast(event(1), event(2), event(3))
+
+        assert client.get("/api/stream/stats", headers=caregiver_headers).status_code == 403
+        response = client.get("/api/stream/stats", headers=admin_headers)
+        assert response.status_code == 200, response.text
+        stats = response.json()
+        assert stats["overflow_policy"] == "drop_oldest"
+        assert {"user_id": USER_ID, "queued": 2, "max_queued": 2, "dropped": 1} in [
+            {key: entry[key] for key in ("user_id", "queued", "max_queued", "dropped")}
+            for entry in stats["streams"]
+        ]
+    finally:
+        asyncio.run(stream.unregister_subscriber(queue))
+        stream._replay_buffer.clear()
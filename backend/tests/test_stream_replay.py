@@ -0,0 +1,115 @@
+import asyncio
+from collections import deque
+
+import pytest
+
+from routes import stream
+from services import pubsub
+from services.pubsub_memory import InProcessBackend
+
+USER_ID = "user-1"
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer(monkeypatch):
+    monkeypatch.setattr(stream, "_replay_buffer", deque(maxlen=stream._replay_buffer.maxlen))
+
+
+def publish(*payloads):
+    """Send payloads through the memory backend to local_broadcast; returns them as delivered."""
+    delivered = []
+
+    def record(data):
+        delivered.append(data)
+
+    async def scenario():
+        backend = InProcessBackend()
+        await backend.start()
+        await backend.publish_many(list(payloads))
+        await backend.stop()
+
+    added = stream.local_broadcast not in pubsub._handlers
+    pubsub.register_handler(stream.local_broadcast)
+    pubsub.register_handler(record)
+    try:
+        asyncio.run(scenario())
+    finally:
+        pubsub._handlers.remove(record)
+        if added:
+            pubsub._handlers.remove(stream.local_broadcast)
+    return delivered
+
+
+def reconnect(last_event_id, allowed=("r1",)):
+    queue = asyncio.Queue()
+
+    async def register():
+        try:
+            return await stream.register_subscriber(
+                queue, USER_ID, None if allowed is None else list(allowed), last_event_id
+            )
+        finally:
+            await stream.unregister_subscriber(queue)
+
+    return asyncio.run(register())
+
+
+def numbers(replay):
+    return [message.get("number") for _, message in replay]
+
+
+MESSAGES = (
+    {"type": "event.created", "recipient_id": "r1", "number": 1},
+    {"type": "event.created", "recipient_id": "r2", "number": 2},
+    {"type": "event.created", "recipient_id": "r1", "number": 3},
+    {"type": "settings.updated", "number": 4},
+    {"type": "access.changed", "user_id": "someone-else", "number": 5},
+    {"type": "access.changed", "user_id": USER_ID, "number": 6},
+    {"type": "event.deleted", "recipient_id": "r2", "number": 7},
+)
+
+
+def test_reconnect_replays_exactly_the_missed_visible_messages():
+    delivered = publish(*MESSAGES)
+    first_id = delivered[0][pubsub.STREAM_ID_KEY]
+
+    replay = reconnect(str(first_id))
+
+    assert numbers(replay) == [3, 4, 6]
+    # With the ids they were first sent with
+    assert [stream_id for stream_id, _ in replay] == [
+        data[pubsub.STREAM_ID_KEY] for data in delivered if data["number"] in (3, 4, 6)
+    ]
+    assert all(pubsub.STREAM_ID_KEY not in message for _, message in replay)
+
+
+def test_admins_replay_every_recipient():
+    delivered = publish(*MESSAGES)
+
+    replay = reconnect(str(delivered[1][pubsub.STREAM_ID_KEY]), allowed=None)
+
+    assert numbers(replay) == [3, 4, 6, 7]
+
+
+def test_reconnect_after_the_latest_message_replays_nothing():
+    delivered = publish(*MESSAGES)
+
+    assert reconnect(str(delivered[-1][pubsub.STREAM_ID_KEY])) == []
+    assert reconnect(None) == []
+
+
+def test_ids_no_longer_buffered_need_a_resync(monkeypatch):
+    monkeypatch.setattr(stream, "_replay_buffer", deque(maxlen=3))
+    delivered = publish(*MESSAGES)
+
+    assert reconnect(str(delivered[0][pubsub.STREAM_ID_KEY])) is None
+    assert numbers(reconnect(str(delivered[4][pubsub.STREAM_ID_KEY]))) == [6]
+    assert reconnect("not-a-number") is None
+    assert reconnect(str(delivered[-1][pubsub.STREAM_ID_KEY] + 1)) is None
+
+
+def test_a_resync_empties_the_buffer():
+    delivered = publish(*MESSAGES)
+    asyncio.run(stream.local_broadcast({"type": pubsub.RESYNC_EVENT}))
+
+    assert reconnect(str(delivered[0][pubsub.STREAM_ID_KEY])) is None
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from services.auth_service import create_access_token
+
+
+def connect(client, user, *recipient_ids, **params):
+    query = [("token", create_access_token({"sub": str(user.id)}))]
+    query.extend(("recipient_id", recipient_id) for recipient_id in recipient_ids)
+    query.extend(params.items())
+    return client.websocket_connect("/api/ws?" + "&".join(f"{key}={value}" for key, value in query))
+
+
+def next_of(socket, *types):
+    """The next frame of one of types, skipping others."""
+    while True:
+        frame = socket.receive_json()
+        if frame["type"] in types:
+            return frame
+
+
+def test_socket_requires_a_valid_token(client, schema):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/api/ws?token=not-a-token"):
+            pass
+    assert closed.value.code == 1008
+
+
+def test_socket_subscribes_only_to_permitted_recipients(client, caregiver, recipients, create_event):
+    first, second = recipients
+    with connect(client, caregiver, first, second) as socket:
+        assert socket.receive_json() == {"type": "subscribed", "recipient_ids": [first], "denied": [second]}
+
+        create_event(second)
+        created = create_event(first)
+
+        frame = next_of(socket, "event.created")
+        assert frame["recipient_id"] == first
+        assert frame["event"]["id"] == created["id"]
+        assert isinstance(frame["stream_id"], int)
+
+
+def test_subscribe_and_unsubscribe_frames(client, admin, recipients, create_event):
+    first, second = recipients
+    with connect(client, admin) as socket:
+        assert socket.receive_json() == {"type": "subscribed", "recipient_ids": [], "denied": []}
+
+        socket.send_text(json.dumps({"type": "subscribe", "recipient_ids": [second]}))
+        assert socket.receive_json() == {"type": "subscribed", "recipient_ids": [second], "denied": []}
+        create_event(first)
+        create_event(second)
+        assert next_of(socket, "event.created")["recipient_id"] == second
+
+        socket.send_text(json.dumps({"type": "unsubscribe", "recipient_ids": [second]}))
+        assert next_of(socket, "subscribed") == {"type": "subscribed", "recipient_ids": [], "denied": []}
+
+        socket.send_text("subscribe me")
+        assert next_of(socket, "error")["detail"].startswith("Expected")
+
+
+def test_access_change_revokes_subscriptions(client, admin_headers, caregiver, recipients, create_event):
+    first, second = recipients
+    with connect(client, caregiver, first) as socket:
+        assert socket.receive_json()["recipient_ids"] == [first]
+
+        response = client.put(f"/api/auth/users/{caregiver.id}/recipients", json={"recipient_ids": []}, headers=admin_headers)
+        assert response.status_code == 200, response.text
+        assert next_of(socket, "access.changed")["user_id"] == str(caregiver.id)
+        assert socket.receive_json() == {"type": "subscribed", "recipient_ids": [], "denied": [first]}
+
+        create_event(first)
+        # The next access change arrives first: the event was not delivered
+        response = client.put(
+            f"/api/auth/users/{caregiver.id}/recipients", json={"recipient_ids": [second]}, headers=admin_headers
+        )
+        assert response.status_code == 200, response.text
+        assert socket.receive_json()["type"] == "access.changed"
+
+        # Newly granted recipients can be subscribed to
+        socket.send_text(json.dumps({"type": "subscribe", "recipient_ids": [first, second]}))
+        assert socket.receive_json() == {"type": "subscribed", "recipient_ids": [second], "denied": [first]}
+
+
+def test_deactivation_closes_the_socket(client, admin_headers, caregiver, recipients):
+    with connect(client, caregiver, recipients[0]) as socket:
+        socket.receive_json()
+
+        response = client.patch(f"/api/auth/users/{caregiver.id}", json={"is_active": False}, headers=admin_headers)
+        assert response.status_code == 200, response.text
+
+        assert next_of(socket, "access.changed")["user_id"] == str(caregiver.id)
+        with pytest.raises(WebSocketDisconnect) as closed:
+            socket.receive_json()
+        assert closed.value.code == 1008
+
+
+def test_unknown_last_event_id_gets_a_resync(client, caregiver, recipients):
+    with connect(client, caregiver, recipients[0], last_event_id="1") as socket:
+        assert socket.receive_json()["type"] == "subscribed"
+        assert socket.receive_json() == {"type": "stream.resync"}
@@ -103,6 +103,13 @@ export async function refreshSession() {
 	}
 }
 
+/**
+ * Generate a key for the Idempotency-Key header so retried writes are applied once
+ */
+export function generateIdempotencyKey() {
+	return `idem_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
+}
+
 /**
  * Check if we're online
  */
@@ -223,7 +230,9 @@ async function handleOfflineRequest(endpoint, method, options, offlineOptions) {
 		const queueItem = await offline.queueOfflineAction({
 			type: method === 'POST' ? 'create' : method === 'DELETE' ? 'delete' : 'update',
 			endpoint,
-			data
+			data,
+			tempId: method === 'POST' ? tempId : null,
+			idempotencyKey: options.headers?.['Idempotency-Key'] || null
 		});
 
 		// Return optimistic response for creates
@@ -442,6 +451,7 @@ export async function refreshAccessToken(refreshToken) {
 export async function createEvent(eventData) {
 	const result = await apiRequest('/events/', {
 		method: 'POST',
+		headers: { 'Idempotency-Key': generateIdempotencyKey() },
 		body: JSON.stringify(eventData)
 	}, false, {
 		queueIfOffline: true,
@@ -463,7 +473,7 @@ export async function createEvent(eventData) {
 
 /**
  * Get list of events (with offline cache support)
- * @param {object} params - { type, limit, offset }
+ * @param {object} params - { type, limit, offset, start, end, q, sort, recipient_id }
  * @returns {Promise<array>} Array of events
  */
 export async function getEvents(params = {}) {
@@ -475,6 +485,7 @@ export async function getEvents(params = {}) {
 	if (params.start) queryParams.append('start', params.start);
 	if (params.end) queryParams.append('end', params.end);
 	if (params.q) queryParams.append('q', params.q);
+	if (params.sort) queryParams.append('sort', params.sort);
 	if (params.recipient_id) queryParams.append('recipient_id', params.recipient_id);
 
 	const query = queryParams.toString();
@@ -512,6 +523,75 @@ export async function getEvents(params = {}) {
 	}
 }
 
+/**
+ * Get a page of events using keyset pagination
+ * @param {object} params - { type, limit, cursor, start, end, q, recipient_id }
+ * @returns {Promise<object>} { events, next_cursor }
+ */
+export async function getEventsPage(params = {}) {
+	const queryParams = new URLSearchParams();
+
+	if (params.type) queryParams.append('type', params.type);
+	if (params.limit) queryParams.append('limit', params.limit.toString());
+	if (params.cursor) queryParams.append('cursor', params.cursor);
+	if (params.start) queryParams.append('start', params.start);
+	if (params.end) queryParams.append('end', params.end);
+	if (params.q) queryParams.append('q', params.q);
+	if (params.recipient_id) queryParams.append('recipient_id', params.recipient_id);
+
+	const query = queryParams.toString();
+	return apiRequest(`/events/page${query ? '?' + query : ''}`);
+}
+
+/**
+ * Get events changed since a change feed position
+ * Omit since to get the current position without any changes.
+ * @param {object} params - { since, recipient_id, limit }
+ * @returns {Promise<object>} { events, deleted, next_since, has_more, resync_required }
+ */
+export async function getEventChanges(params = {}) {
+	const queryParams = new URLSearchParams();
+
+	if (params.since !== undefined && params.since !== null) queryParams.append('since', params.since.toString());
+	if (params.limit) queryParams.append('limit', params.limit.toString());
+	if (params.recipient_id) queryParams.append('recipient_id', params.recipient_id);
+
+	const query = queryParams.toString();
+	return apiRequest(`/events/changes${query ? '?' + query : ''}`);
+}
+
+/**
+ * Download the full event history as a file
+ * @param {object} params - { format: 'csv' | 'ndjson', type, start, end, q, recipient_id }
+ * @returns {Promise<Blob>} Export file contents
+ */
+export async function exportEvents(params = {}) {
+	const queryParams = new URLSearchParams();
+
+	if (params.format) queryParams.append('format', params.format);
+	if (params.type) queryParams.append('type', params.type);
+	if (params.start) queryParams.append('start', params.start);
+	if (params.end) queryParams.append('end', params.end);
+	if (params.q) queryParams.append('q', params.q);
+	if (params.recipient_id) queryParams.append('recipient_id', params.recipient_id);
+
+	const query = queryParams.toString();
+	const token = getStoredToken('access_token');
+	const response = await fetch(`${API_BASE}/events/export${query ? '?' + query : ''}`, {
+		headers: {
+			...(token ? { 'Authorization': `Bearer ${token}` } : {})
+		},
+		credentials: 'include'
+	});
+
+	if (!response.ok) {
+		const data = await response.json().catch(() => ({}));
+		throw new Error(data.detail || `HTTP ${response.status}`);
+	}
+
+	return response.blob();
+}
+
 /**
  * Get a specific event by ID
  * @param {string} eventId
@@ -590,6 +670,26 @@ export async function getEventStatsForRecipient(recipientId) {
 	});
 }
 
+/**
+ * Get event counts and feed volume per hour, day or week (with caching)
+ * @param {object} params - { bucket, start, end, tz, recipient_id }
+ * @returns {Promise<object>} { bucket, timezone, buckets: [{ start, counts, total, amount_ml }] }
+ */
+export async function getEventRollups(params = {}) {
+	const queryParams = new URLSearchParams();
+
+	if (params.bucket) queryParams.append('bucket', params.bucket);
+	if (params.start) queryParams.append('start', params.start);
+	if (params.end) queryParams.append('end', params.end);
+	if (params.tz) queryParams.append('tz', params.tz);
+	if (params.recipient_id) queryParams.append('recipient_id', params.recipient_id);
+
+	const query = queryParams.toString();
+	return apiRequest(`/events/rollups${query ? '?' + query : ''}`, {}, false, {
+		cacheKey: `event_rollups_${params.recipient_id || 'all'}_${params.bucket || 'day'}`
+	});
+}
+
 // ============================================================================
 // QUICK TEMPLATES (with offline caching)
 // ============================================================================
@@ -821,6 +921,7 @@ export async function getActiveContinuousFeed(recipientId) {
 export async function startContinuousFeed(data) {
 	return apiRequest('/feeds/continuous/start', {
 		method: 'POST',
+		headers: { 'Idempotency-Key': generateIdempotencyKey() },
 		body: JSON.stringify(data)
 	});
 }
@@ -828,6 +929,7 @@ export async function startContinuousFeed(data) {
 export async function stopContinuousFeed(recipientId, pumpTotalMl) {
 	return apiRequest('/feeds/continuous/stop', {
 		method: 'POST',
+		headers: { 'Idempotency-Key': generateIdempotencyKey() },
 		body: JSON.stringify({ recipient_id: recipientId, pump_total_ml: pumpTotalMl ?? null })
 	});
 }
@@ -893,7 +995,7 @@ export async function deleteRecipient(recipientId) {
  * @param {File} file - Image file to upload
  * @returns {Promise<object>} Photo metadata
  */
-export async function uploadPhoto(eventId, file) {
+export async function uploadPhoto(eventId, file, idempotencyKey = generateIdempotencyKey()) {
 	const url = `${API_BASE}/photos/`;
 	const token = getStoredToken('access_token');
 
@@ -904,6 +1006,7 @@ export async function uploadPhoto(eventId, file) {
 	const response = await fetch(url, {
 		method: 'POST',
 		headers: {
+			'Idempotency-Key': idempotencyKey,
 			...(token ? { 'Authorization': `Bearer ${token}` } : {})
 		},
 		credentials: 'include',
@@ -0,0 +1,322 @@
+// Live updates from the server.
+//
+// One tab per browser holds the connection and relays its messages to the
+// others over a BroadcastChannel. Tabs queue for a Web Lock; whoever holds
+// it is the leader, and when the leader's tab closes the browser releases
+// the lock and the next tab in line takes over, resuming from the last
+// message it saw. Browsers without BroadcastChannel or Web Locks keep one
+// connection per tab.
+//
+// The connection prefers a WebSocket on /ws subscribed to the recipients
+// the tabs are showing, so switching recipients sends subscribe/unsubscribe
+// frames over the open socket instead of reconnecting. Where WebSocket is
+// unavailable or keeps failing to connect (some proxies block it), it falls
+// back to the /stream EventSource, which carries every recipient the user
+// may see.
+import { getApiBase, refreshSession } from './api';
+
+// Failed WebSocket handshakes in a row before switching to EventSource
+const MAX_SOCKET_FAILURES = 2;
+const CHANNEL_NAME = 'care-docs-live-stream';
+const LEADER_LOCK_NAME = 'care-docs-live-stream-leader';
+
+/**
+ * Open a connection of this tab's own, reconnecting with backoff until closed
+ * @param {Object} options
+ * @param {string[]} options.recipientIds - Recipients to subscribe to initially
+ * @param {string|null} options.lastEventId - Resume after this message id
+ * @param {(message: Object, streamId: string|null) => void} options.onMessage - Called with each decoded message
+ * @returns {{ setRecipients: (recipientIds: string[]) => void, close: () => void }}
+ */
+function openConnection({ recipientIds = [], lastEventId = null, onMessage }) {
+	let transport = typeof WebSocket !== 'undefined' ? 'websocket' : 'eventsource';
+	let connection = null;
+	let closed = false;
+	let reconnectAttempts = 0;
+	let reconnectTimeout = null;
+	let socketFailures = 0;
+	let currentRecipientIds = new Set(recipientIds);
+	// Recipients the open socket is subscribed to
+	let subscribedRecipientIds = new Set();
+
+	function scheduleReconnect() {
+		if (closed) return;
+		// Exponential backoff: 1s, 2s, 4s, 8s, 16s, max 30s
+		const delay = Math.min(1000 * Math.pow(2, reconnectAttempts), 30000);
+		reconnectAttempts++;
+		reconnectTimeout = setTimeout(connect, delay);
+	}
+
+	function deliver(message, streamId) {
+		if (streamId) {
+			lastEventId = streamId;
+		}
+		try {
+			onMessage(message, streamId);
+		} catch (error) {
+			console.error('Stream message error:', error);
+		}
+	}
+
+	function syncSubscription() {
+		if (!(connection instanceof WebSocket) || connection.readyState !== WebSocket.OPEN) return;
+		const added = [...currentRecipientIds].filter((id) => !subscribedRecipientIds.has(id));
+		const removed = [...subscribedRecipientIds].filter((id) => !currentRecipientIds.has(id));
+		if (removed.length) {
+			connection.send(JSON.stringify({ type: 'unsubscribe', recipient_ids: removed }));
+		}
+		if (added.length) {
+			connection.send(JSON.stringify({ type: 'subscribe', recipient_ids: added }));
+		}
+		subscribedRecipientIds = new Set(currentRecipientIds);
+	}
+
+	function connectSocket(params) {
+		for (const recipientId of currentRecipientIds) {
+			params.append('recipient_id', recipientId);
+		}
+		const url = new URL(`${getApiBase()}/ws?${params}`, window.location.href);
+		url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+
+		const socket = new WebSocket(url);
+		let opened = false;
+		connection = socket;
+		subscribedRecipientIds = new Set(currentRecipientIds);
+
+		socket.onopen = () => {
+			opened = true;
+			socketFailures = 0;
+			reconnectAttempts = 0;
+			// The recipients may have changed while connecting
+			syncSubscription();
+		};
+
+		socket.onmessage = (event) => {
+			let data;
+			try {
+				data = JSON.parse(event.data);
+			} catch (error) {
+				console.error('Stream parse error:', error);
+				return;
+			}
+			const { stream_id: streamId, ...message } = data;
+			if (message.type === 'subscribed' || message.type === 'error') {
+				return;
+			}
+			deliver(message, streamId ? String(streamId) : null);
+		};
+
+		socket.onclose = () => {
+			if (connection !== socket) return;
+			connection = null;
+			if (!opened && ++socketFailures >= MAX_SOCKET_FAILURES) {
+				transport = 'eventsource';
+			}
+			scheduleReconnect();
+		};
+	}
+
+	function connectEventSource(params) {
+		const source = new EventSource(`${getApiBase()}/stream?${params}`);
+		connection = source;
+
+		source.onopen = () => {
+			reconnectAttempts = 0;
+		};
+
+		source.onmessage = (event) => {
+			let message;
+			try {
+				message = JSON.parse(event.data);
+			} catch (error) {
+				console.error('Stream parse error:', error);
+				return;
+			}
+			deliver(message, event.lastEventId || null);
+		};
+
+		source.onerror = () => {
+			source.close();
+			if (connection !== source) return;
+			connection = null;
+			scheduleReconnect();
+		};
+	}
+
+	async function connect() {
+		reconnectTimeout = null;
+		try {
+			await refreshSession();
+		} catch (error) {
+			// Token refresh is best-effort; the stream can still connect without it.
+		}
+		if (closed) return;
+
+		const token = typeof localStorage !== 'undefined' ? localStorage.getItem('access_token') : null;
+		const params = new URLSearchParams();
+		if (token) params.append('token', token);
+		// A new connection does not send Last-Event-ID, so resume explicitly
+		if (lastEventId) params.append('last_event_id', lastEventId);
+
+		if (transport === 'websocket') {
+			connectSocket(params);
+		} else {
+			connectEventSource(params);
+		}
+	}
+
+	connect();
+
+	return {
+		setRecipients(recipientIds) {
+			currentRecipientIds = new Set(recipientIds);
+			syncSubscription();
+		},
+		close() {
+			closed = true;
+			if (reconnectTimeout) {
+				clearTimeout(reconnectTimeout);
+			}
+			if (connection) {
+				const current = connection;
+				connection = null;
+				current.close();
+			}
+		}
+	};
+}
+
+/**
+ * Receive live updates in this tab, sharing one connection with the browser's other tabs
+ * @param {Object} options
+ * @param {string|null} options.recipientId - Recipient this tab shows
+ * @param {(data: Object) => void} options.onMessage - Called with each decoded message
+ * @returns {{ setRecipient: (recipientId: string|null) => void, close: () => void }}
+ */
+export function openLiveStream({ recipientId = null, onMessage }) {
+	let currentRecipientId = recipientId || null;
+
+	if (typeof BroadcastChannel === 'undefined' || typeof navigator === 'undefined' || !navigator.locks) {
+		const connection = openConnection({
+			recipientIds: currentRecipientId ? [currentRecipientId] : [],
+			onMessage
+		});
+		return {
+			setRecipient(recipientIdToWatch) {
+				currentRecipientId = recipientIdToWatch || null;
+				connection.setRecipients(currentRecipientId ? [currentRecipientId] : []);
+			},
+			close: connection.close
+		};
+	}
+
+	const tabId = typeof crypto !== 'undefined' && crypto.randomUUID
+		? crypto.randomUUID()
+		: `${Date.now()}-${Math.random().toString(36).substr(2, 9)}`;
+	const channel = new BroadcastChannel(CHANNEL_NAME);
+	const abortController = new AbortController();
+	// Recipient each other tab shows, so a new leader subscribes to all of them at once
+	const tabRecipients = new Map();
+	let lastEventId = null;
+	// Set while this tab is the leader
+	let connection = null;
+	let releaseLeadership = null;
+	let closed = false;
+
+	function watchedRecipients() {
+		const ids = new Set(tabRecipients.values());
+		ids.add(currentRecipientId);
+		ids.delete(null);
+		return [...ids];
+	}
+
+	function announce() {
+		channel.postMessage({ kind: 'recipient', tabId, recipientId: currentRecipientId });
+	}
+
+	function deliver(message) {
+		try {
+			onMessage(message);
+		} catch (error) {
+			console.error('Stream message error:', error);
+		}
+	}
+
+	function handlePageHide() {
+		channel.postMessage({ kind: 'bye', tabId });
+	}
+
+	channel.onmessage = ({ data }) => {
+		if (data.kind === 'message') {
+			if (data.streamId) {
+				lastEventId = data.streamId;
+			}
+			deliver(data.message);
+			return;
+		}
+		if (data.kind === 'leader') {
+			// A new leader is collecting recipients
+			announce();
+			return;
+		}
+		if (data.kind === 'recipient') {
+			tabRecipients.set(data.tabId, data.recipientId || null);
+		} else if (data.kind === 'bye') {
+			tabRecipients.delete(data.tabId);
+		}
+		if (connection) {
+			connection.setRecipients(watchedRecipients());
+		}
+	};
+
+	navigator.locks.request(LEADER_LOCK_NAME, { signal: abortController.signal }, () => {
+		if (closed) return;
+		connection = openConnection({
+			recipientIds: watchedRecipients(),
+			lastEventId,
+			onMessage(message, streamId) {
+				if (streamId) {
+					lastEventId = streamId;
+				}
+				channel.postMessage({ kind: 'message', message, streamId });
+				deliver(message);
+			}
+		});
+		channel.postMessage({ kind: 'leader' });
+		// Hold the lock, and the connection, until this tab closes
+		return new Promise((resolve) => {
+			releaseLeadership = resolve;
+		});
+	}).catch((error) => {
+		if (error.name !== 'AbortError') {
+			console.error('Live stream leader election failed:', error);
+		}
+	});
+
+	window.addEventListener('pagehide', handlePageHide);
+	announce();
+
+	return {
+		setRecipient(recipientIdToWatch) {
+			currentRecipientId = recipientIdToWatch || null;
+			if (connection) {
+				connection.setRecipients(watchedRecipients());
+			}
+			announce();
+		},
+		close() {
+			closed = true;
+			window.removeEventListener('pagehide', handlePageHide);
+			handlePageHide();
+			abortController.abort();
+			if (connection) {
+				connection.close();
+				connection = null;
+			}
+			if (releaseLeadership) {
+				releaseLeadership();
+			}
+			channel.close();
+		}
+	};
+}
@@ -81,7 +81,7 @@ function generateTempId() {
 
 /**
  * Add an event to the offline queue
- * @param {object} action - { type: 'create'|'update'|'delete', data, endpoint }
+ * @param {object} action - { type: 'create'|'update'|'delete', data, endpoint, tempId, idempotencyKey }
  */
 export async function queueOfflineAction(action) {
 	if (!pendingQueueStore) return null;
@@ -91,6 +91,8 @@ export async function queueOfflineAction(action) {
 		action: action.type, // 'create', 'update', 'delete'
 		endpoint: action.endpoint,
 		data: action.data,
+		clientId: action.tempId || null, // Temp ID handed out in the optimistic response
+		idempotencyKey: action.idempotencyKey || null,
 		timestamp: new Date().toISOString(),
 		retries: 0
 	};
@@ -232,6 +234,77 @@ export async function clearPendingQueue() {
 	await updatePendingCount();
 }
 
+// Maximum operations per POST /events/batch request (matches the server limit)
+const EVENT_BATCH_SIZE = 500;
+
+function isEventAction(action) {
+	return typeof action.endpoint === 'string' && action.endpoint.startsWith('/events/');
+}
+
+/**
+ * Convert a queued event action into a batch operation
+ */
+function toBatchOperation(action) {
+	const eventId = action.endpoint.replace(/^\/events\//, '').replace(/\/$/, '') || null;
+	return {
+		op: action.action,
+		client_id: action.action === 'create' ? action.clientId || action.id : null,
+		event_id: action.action === 'create' ? null : eventId,
+		data: action.action === 'delete' ? null : action.data
+	};
+}
+
+/**
+ * Take the next chunk of actions to send as one batch. Actions already sent
+ * together under a batch key (whose response was lost) are kept together so
+ * the retry matches the original request.
+ */
+function nextBatchChunk(actions, offset) {
+	const chunk = actions.slice(offset, offset + EVENT_BATCH_SIZE);
+	const existing = chunk[0].batchKey;
+	if (!existing) {
+		const end = chunk.findIndex((action) => action.batchKey);
+		return end === -1 ? chunk : chunk.slice(0, end);
+	}
+	const end = chunk.findIndex((action) => action.batchKey !== existing);
+	return end === -1 ? chunk : chunk.slice(0, end);
+}
+
+/**
+ * Get the Idempotency-Key for a batch of queued actions.
+ * A retry of the exact same chunk reuses the stored key, so a batch whose
+ * response was lost is not applied twice.
+ */
+async function getBatchKey(chunk) {
+	const existing = chunk[0].batchKey;
+	if (existing) {
+		return existing;
+	}
+	const batchKey = `batch_${generateTempId()}`;
+	for (const action of chunk) {
+		action.batchKey = batchKey;
+		await pendingQueueStore.setItem(action.id, action);
+	}
+	return batchKey;
+}
+
+/**
+ * Bump the retry count of a failed action, dropping it after 5 attempts
+ */
+async function recordSyncFailure(action) {
+	// Update retry count
+	action.retries = (action.retries || 0) + 1;
+
+	// If too many retries, remove from queue
+	if (action.retries >= 5) {
+		console.warn('Removing action after 5 failed retries:', action);
+		await removeFromQueue(action.id);
+	} else {
+		// Update the item with new retry count
+		await pendingQueueStore.setItem(action.id, action);
+	}
+}
+
 /**
  * Sync pending events with the server
  * This is called automatically when coming back online
@@ -253,7 +326,52 @@ export async function syncPendingEvents() {
 	let successCount = 0;
 	let errorCount = 0;
 
-	for (const action of pending) {
+	// Event writes are replayed through the batch endpoint in one round trip
+	const eventActions = pending.filter(isEventAction);
+	const otherActions = pending.filter((action) => !isEventAction(action));
+
+	let offset = 0;
+	while (offset < eventActions.length) {
+		const chunk = nextBatchChunk(eventActions, offset);
+		offset += chunk.length;
+		const batchKey = await getBatchKey(chunk);
+		try {
+			const response = await apiRequest('/events/batch', {
+				method: 'POST',
+				headers: { 'Idempotency-Key': batchKey },
+				body: JSON.stringify({ operations: chunk.map(toBatchOperation) })
+			});
+
+			for (const result of response.results || []) {
+				const action = chunk[result.index];
+				if (!action) continue;
+				if (result.status < 400) {
+					if (action.clientId && result.event_id && action.action === 'create') {
+						await updatePhotoEventId(action.clientId, result.event_id);
+					}
+					await removeFromQueue(action.id);
+					successCount++;
+				} else {
+					console.error('Failed to sync action:', action, result.error);
+					errorCount++;
+					// The batch was applied, so a retry of this item is a new request
+					delete action.batchKey;
+					await recordSyncFailure(action);
+				}
+			}
+		} catch (error) {
+			console.error('Failed to sync event batch:', error);
+			errorCount += chunk.length;
+			// The server rejects a reused key whose batch contents changed
+			const keyRejected = error?.message?.includes('Idempotency-Key');
+			for (const action of chunk) {
+				if (keyRejected) delete action.batchKey;
+				await recordSyncFailure(action);
+			}
+		}
+	}
+
+	for (const action of otherActions) {
 		try {
 			let method = 'POST';
 			if (action.action === 'update') method = 'PATCH';
@@ -261,6 +379,7 @@ export async function syncPendingEvents() {
 
 			const options = {
 				method,
+				...(action.idempotencyKey ? { headers: { 'Idempotency-Key': action.idempotencyKey } } : {}),
 				...(action.data && method !== 'DELETE' ? { body: JSON.stringify(action.data) } : {})
 			};
 
@@ -270,18 +389,7 @@ export async function syncPendingEvents() {
 		} catch (error) {
 			console.error('Failed to sync action:', action, error);
 			errorCount++;
-
-			// Update retry count
-			action.retries = (action.retries || 0) + 1;
-
-			// If too many retries, remove from queue
-			if (action.retries >= 5) {
-				console.warn('Removing action after 5 failed retries:', action);
-				await removeFromQueue(action.id);
-			} else {
-				// Update the item with new retry count
-				await pendingQueueStore.setItem(action.id, action);
-			}
+			await recordSyncFailure(action);
 		}
 	}
 
@@ -406,7 +514,7 @@ export async function syncPendingPhotos() {
 		try {
 			// Create a File from the blob
 			const file = new File([photo.blob], photo.filename, { type: 'image/jpeg' });
-			await uploadPhoto(photo.eventId, file);
+			await uploadPhoto(photo.eventId, file, photo.id);
 			await removePhotoFromQueue(photo.id);
 		} catch (error) {
 			console.error('Failed to upload photo:', photo, error);